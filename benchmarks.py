@@ -23,6 +23,7 @@ Requirements:
 
 Usage:
     $ python benchmarks.py --weights yolov5s.pt --img 640
+    $ python benchmarks.py --preprocess --img 640  # AutoShape pre-processing only, batches of 1, 8 and 32
 """
 
 import argparse
@@ -31,7 +32,9 @@ import sys
 import time
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import torch
 
 FILE = Path(__file__).resolve()
 ROOT = FILE.parents[0]  # YOLOv5 root directory
@@ -40,11 +43,13 @@ if str(ROOT) not in sys.path:
 # ROOT = ROOT.relative_to(Path.cwd())  # relative
 
 import export
+from models.common import BatchLetterbox
 from models.experimental import attempt_load
 from models.yolo import SegmentationModel
 from segment.val import run as val_seg
 from utils import notebook_init
-from utils.general import LOGGER, check_yaml, file_size, print_args
+from utils.dataloaders import letterbox
+from utils.general import LOGGER, check_yaml, file_size, make_divisible, print_args
 from utils.torch_utils import select_device
 from val import run as val_det
 
@@ -218,6 +223,67 @@ def test(
     return py
 
 
+def preprocess(
+    imgsz=640,  # inference size (pixels)
+    device="",  # cuda device, i.e. 0 or 0,1,2,3 or cpu
+    half=False,  # use FP16 half-precision inference
+    batches=(1, 8, 32),  # batch sizes to time
+    shape=(720, 1280),  # source frame (h, w), e.g. a 720p camera
+    n=20,  # timed iterations per batch size
+):
+    """
+    Times AutoShape pre-processing of a batch of frames: the per-image letterbox, stack and transpose path against
+    BatchLetterbox, which letterboxes on a thread pool straight into one reusable BCHW buffer and scales on the device.
+
+    Args:
+        imgsz (int): Inference size in pixels. Default is 640.
+        device (str): Device the batch is uploaded to, e.g. 'cpu' or '0'. Default is auto-select.
+        half (bool): Produce an FP16 batch. Default is False.
+        batches (tuple): Batch sizes to benchmark. Default is (1, 8, 32).
+        shape (tuple): (height, width) of the synthetic source frames. Default is (720, 1280).
+        n (int): Timed iterations per batch size, after one warm-up. Default is 20.
+
+    Returns:
+        pd.DataFrame: Milliseconds per batch for both paths and the speedup, one row per batch size.
+
+    Examples:
+        ```python
+        $ python benchmarks.py --preprocess --img 640 --device 0
+        ```
+    """
+    device = select_device(device)
+    dtype = torch.float16 if half else torch.float32
+    g = imgsz / max(shape)
+    shape1 = [make_divisible(int(x * g), 32) for x in shape]  # inference shape, as in AutoShape.forward()
+    y = []
+    for b in batches:
+        ims = [np.random.randint(0, 255, (*shape, 3), dtype=np.uint8) for _ in range(b)]
+        pre = BatchLetterbox()  # fresh per batch size, so both paths get the same single warm-up call
+
+        def legacy(ims=ims):
+            x = [letterbox(im, shape1, auto=False)[0] for im in ims]
+            x = np.ascontiguousarray(np.array(x).transpose((0, 3, 1, 2)))
+            return torch.from_numpy(x).to(device).to(dtype) / 255
+
+        t = []
+        for fn in legacy, lambda ims=ims, pre=pre: pre(ims, shape1, device, dtype):
+            fn()  # warm-up
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+            t0 = time.perf_counter()
+            for _ in range(n):
+                fn()
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+            t.append((time.perf_counter() - t0) / n * 1e3)
+        y.append([b, round(t[0], 2), round(t[1], 2), round(t[0] / t[1], 2)])
+
+    py = pd.DataFrame(y, columns=["Batch", "Legacy (ms)", "BatchLetterbox (ms)", "Speedup"])
+    LOGGER.info(f"\nPre-processing {shape[1]}x{shape[0]} frames to {shape1[1]}x{shape1[0]} on {device}")
+    LOGGER.info(str(py))
+    return py
+
+
 def parse_opt():
     """
     Parses command-line arguments for YOLOv5 model inference configuration.
@@ -251,6 +317,7 @@ def parse_opt():
     parser.add_argument("--test", action="store_true", help="test exports only")
     parser.add_argument("--pt-only", action="store_true", help="test PyTorch only")
     parser.add_argument("--hard-fail", nargs="?", const=True, default=False, help="Exception on error or < min metric")
+    parser.add_argument("--preprocess", action="store_true", help="benchmark AutoShape pre-processing only")
     opt = parser.parse_args()
     opt.data = check_yaml(opt.data)  # check YAML
     print_args(vars(opt))
@@ -286,7 +353,11 @@ def main(opt):
         $ python benchmarks.py --weights yolov5s.pt --img 640
         ```
     """
-    test(**vars(opt)) if opt.test else run(**vars(opt))
+    kwargs = vars(opt)
+    if kwargs.pop("preprocess"):
+        preprocess(opt.imgsz, opt.device, opt.half)
+        return
+    test(**kwargs) if opt.test else run(**kwargs)
 
 
 if __name__ == "__main__":
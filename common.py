@@ -5,11 +5,16 @@ import ast
 import contextlib
 import json
 import math
+import os
 import platform
+import queue
+import threading
 import warnings
 import zipfile
-from collections import OrderedDict, namedtuple
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 from copy import copy
+from functools import lru_cache
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -28,15 +33,13 @@ try:
 
     assert hasattr(ultralytics, "__version__")  # verify package is not directory
 except (ImportError, AssertionError):
-    import os
-
     os.system("pip install -U ultralytics")
     import ultralytics
 
 from ultralytics.utils.plotting import Annotator, colors, save_one_box
 
 from utils import TryExcept
-from utils.dataloaders import exif_transpose, letterbox
+from utils.dataloaders import exif_transpose
 from utils.general import (
     LOGGER,
     ROOT,
@@ -813,6 +816,89 @@ class DetectMultiBackend(nn.Module):
         return None, None
 
 
+LetterboxGeometry = namedtuple("LetterboxGeometry", ("resize", "top", "left", "ratio_pad"))
+
+
+@lru_cache(maxsize=128)
+def letterbox_geometry(shape0, shape1):
+    """
+    Returns the cached LetterboxGeometry of an (h, w, ...) image `shape0` letterboxed into (h, w) `shape1`.
+
+    `resize` is the (w, h) resize target, `top`/`left` the padding offsets as letterbox() rounds them, and `ratio_pad`
+    the ((gain, gain), (padw, padh)) inverse box transform to pass to scale_boxes().
+    """
+    h0, w0 = shape0[:2]
+    r = min(shape1[0] / h0, shape1[1] / w0)  # gain
+    w, h = int(round(w0 * r)), int(round(h0 * r))
+    top, left = int(round((shape1[0] - h) / 2 - 0.1)), int(round((shape1[1] - w) / 2 - 0.1))
+    pad = (shape1[1] - w0 * r) / 2, (shape1[0] - h0 * r) / 2  # as scale_boxes() computes it
+    return LetterboxGeometry((w, h), top, left, ((r, r), pad))
+
+
+@lru_cache(maxsize=128)
+def letterbox_shape(shapes, size, stride):
+    """Returns the cached (h, w) inference shape for a batch of (h, w) image `shapes` at (h, w) `size` and `stride`."""
+    shape1 = [[int(y * max(size) / max(s)) for y in s] for s in shapes]
+    return tuple(make_divisible(x, stride) for x in np.array(shape1).max(0))
+
+
+class BatchLetterbox:
+    """Letterboxes HWC uint8 images straight into one reusable uint8 BCHW buffer, resizing on a shared thread pool."""
+
+    pool = None  # ThreadPoolExecutor shared by all instances, created on the first multi-image batch
+    workers = min(8, os.cpu_count() or 1)  # cv2.resize and numpy copies release the GIL
+
+    def __init__(self, pin=True, color=114):
+        """Initializes an empty buffer; `pin` page-locks it for asynchronous host-to-CUDA copies."""
+        self.pin, self.color = pin, color
+        self.buffer = None  # uint8 (B, 3, H, W) numpy view of self._tensor
+        self._tensor = None
+        self._event = None  # CUDA event marking the end of the last copy out of the pinned buffer
+        self._geometry = []  # LetterboxGeometry last written to each slot; its border is still in place
+
+    def _alloc(self, shape, device):
+        """Returns a (B, 3, H, W) uint8 tensor, reusing the buffer if it is large enough."""
+        t = self._tensor
+        if t is None or t.shape[1:] != shape[1:] or t.shape[0] < shape[0]:
+            t = torch.empty(shape, dtype=torch.uint8)
+            if self.pin and device.type == "cuda":
+                t = t.pin_memory()
+            self._tensor, self.buffer = t, t.numpy()
+            self._geometry = [None] * shape[0]
+        elif self._event is not None:
+            self._event.synchronize()  # previous copy must finish before the buffer is overwritten
+        return t[: shape[0]]
+
+    def fill(self, i, im, shape):
+        """Letterboxes HWC `im` into slot `i` at (h, w) `shape`, with the geometry of letterbox(auto=False)."""
+        geometry = letterbox_geometry(im.shape[:2], shape)
+        (w, h), top, left = geometry[:3]
+        if (w, h) != im.shape[1::-1]:  # resize
+            im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+        b = self.buffer[i]
+        b[:, top : top + h, left : left + w] = im.transpose(2, 0, 1)  # HWC to CHW while copying
+        if self._geometry[i] != geometry:  # border is only rewritten when the geometry changes
+            b[:, :top] = b[:, top + h :] = self.color
+            b[:, top : top + h, :left] = b[:, top : top + h, left + w :] = self.color
+            self._geometry[i] = geometry
+
+    def __call__(self, ims, shape, device, dtype=torch.float32):
+        """Returns `ims` letterboxed to (h, w) `shape` as a (B, 3, h, w) `dtype` tensor on `device`, scaled to 0-1."""
+        shape = tuple(shape)
+        x = self._alloc((len(ims), 3, *shape), device)
+        if len(ims) > 1:
+            if BatchLetterbox.pool is None:
+                BatchLetterbox.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="letterbox")
+            list(self.pool.map(self.fill, range(len(ims)), ims, [shape] * len(ims)))
+        else:
+            self.fill(0, ims[0], shape)
+        if device.type == "cuda":
+            x = x.to(device, non_blocking=x.is_pinned())
+            self._event = torch.cuda.Event()
+            self._event.record()
+        return x.to(dtype).div_(255)  # uint8 to fp16/32 on the device
+
+
 class AutoShape(nn.Module):
     """AutoShape class for robust YOLOv5 inference with preprocessing, NMS, and support for various input formats."""
 
@@ -823,6 +909,7 @@ class AutoShape(nn.Module):
     classes = None  # (optional list) filter by class, i.e. = [0, 15, 16] for COCO persons, cats and dogs
     max_det = 1000  # maximum number of detections per image
     amp = False  # Automatic Mixed Precision (AMP) inference
+    slots = 2  # submit() batches in flight: one being pre-processed while the other runs on the model
 
     def __init__(self, model, verbose=True):
         """Initializes YOLOv5 model for inference, setting up attributes and preparing model for evaluation."""
@@ -833,6 +920,8 @@ class AutoShape(nn.Module):
         self.dmb = isinstance(model, DetectMultiBackend)  # DetectMultiBackend() instance
         self.pt = not self.dmb or model.pt  # PyTorch model
         self.model = model.eval()
+        self.preprocess = BatchLetterbox()  # reusable pre-process buffer
+        self._workers = None  # submit() threads and queues, started on first use
         if self.pt:
             m = self.model.model.model[-1] if self.dmb else self.model.model[-1]  # Detect()
             m.inplace = False  # Detect.inplace=False for safe multithread inference
@@ -871,38 +960,49 @@ class AutoShape(nn.Module):
 
         dt = (Profile(), Profile(), Profile())
         with dt[0]:
-            if isinstance(size, int):  # expand
-                size = (size, size)
-            p = next(self.model.parameters()) if self.pt else torch.empty(1, device=self.model.device)  # param
-            autocast = self.amp and (p.device.type != "cpu")  # Automatic Mixed Precision (AMP) inference
             if isinstance(ims, torch.Tensor):  # torch
-                with amp.autocast(autocast):
+                p = self._param()
+                with amp.autocast(self.amp and (p.device.type != "cpu")):
                     return self.model(ims.to(p.device).type_as(p), augment=augment)  # inference
+            batch = self._preprocess(ims, size, self.preprocess)
+        return self._predict(batch, dt, augment)
+
+    def _param(self):
+        """Returns a parameter (or an empty tensor for non-PyTorch backends) giving the model's device and dtype."""
+        return next(self.model.parameters()) if self.pt else torch.empty(1, device=self.model.device)
 
-            # Pre-process
-            n, ims = (len(ims), list(ims)) if isinstance(ims, (list, tuple)) else (1, [ims])  # number, list of images
-            shape0, shape1, files = [], [], []  # image and inference shapes, filenames
-            for i, im in enumerate(ims):
-                f = f"image{i}"  # filename
-                if isinstance(im, (str, Path)):  # filename or uri
-                    im, f = Image.open(requests.get(im, stream=True).raw if str(im).startswith("http") else im), im
-                    im = np.asarray(exif_transpose(im))
-                elif isinstance(im, Image.Image):  # PIL Image
-                    im, f = np.asarray(exif_transpose(im)), getattr(im, "filename", f) or f
-                files.append(Path(f).with_suffix(".jpg").name)
-                if im.shape[0] < 5:  # image in CHW
-                    im = im.transpose((1, 2, 0))  # reverse dataloader .transpose(2, 0, 1)
-                im = im[..., :3] if im.ndim == 3 else cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)  # enforce 3ch input
-                s = im.shape[:2]  # HWC
-                shape0.append(s)  # image shape
-                g = max(size) / max(s)  # gain
-                shape1.append([int(y * g) for y in s])
-                ims[i] = im if im.data.contiguous else np.ascontiguousarray(im)  # update
-            shape1 = [make_divisible(x, self.stride) for x in np.array(shape1).max(0)]  # inf shape
-            x = [letterbox(im, shape1, auto=False)[0] for im in ims]  # pad
-            x = np.ascontiguousarray(np.array(x).transpose((0, 3, 1, 2)))  # stack and BHWC to BCHW
-            x = torch.from_numpy(x).to(p.device).type_as(p) / 255  # uint8 to fp16/32
+    @smart_inference_mode()
+    def _preprocess(self, ims, size, letterbox):
+        """Loads and letterboxes `ims` into BatchLetterbox `letterbox`; returns (ims, files, shape0, shape1, x)."""
+        if isinstance(size, int):  # expand
+            size = (size, size)
+        p = self._param()
+        ims = list(ims) if isinstance(ims, (list, tuple)) else [ims]  # list of images
+        shape0, files = [], []  # image shapes, filenames
+        for i, im in enumerate(ims):
+            f = f"image{i}"  # filename
+            if isinstance(im, (str, Path)):  # filename or uri
+                im, f = Image.open(requests.get(im, stream=True).raw if str(im).startswith("http") else im), im
+                im = np.asarray(exif_transpose(im))
+            elif isinstance(im, Image.Image):  # PIL Image
+                im, f = np.asarray(exif_transpose(im)), getattr(im, "filename", f) or f
+            files.append(Path(f).with_suffix(".jpg").name)
+            if im.shape[0] < 5:  # image in CHW
+                im = im.transpose((1, 2, 0))  # reverse dataloader .transpose(2, 0, 1)
+            im = im[..., :3] if im.ndim == 3 else cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)  # enforce 3ch input
+            shape0.append(im.shape[:2])  # image shape HWC
+            ims[i] = im if im.data.contiguous else np.ascontiguousarray(im)  # update
+        stride = int(self.stride.max()) if isinstance(self.stride, torch.Tensor) else int(self.stride)
+        shape1 = letterbox_shape(tuple(shape0), tuple(size), stride)  # inf shape, cached per stream geometry
+        x = letterbox(ims, shape1, p.device, p.dtype)  # pad into one BCHW buffer, scale to 0-1 on device
+        return ims, files, shape0, shape1, x
 
+    @smart_inference_mode()
+    def _predict(self, batch, dt, augment=False):
+        """Runs inference and NMS on a `_preprocess()` batch and returns Detections in original image coordinates."""
+        ims, files, shape0, shape1, x = batch
+        n = len(ims)
+        autocast = self.amp and (x.device.type != "cpu")  # Automatic Mixed Precision (AMP) inference
         with amp.autocast(autocast):
             # Inference
             with dt[1]:
@@ -920,10 +1020,101 @@ class AutoShape(nn.Module):
                     max_det=self.max_det,
                 )  # NMS
                 for i in range(n):
-                    scale_boxes(shape1, y[i][:, :4], shape0[i])
+                    scale_boxes(shape1, y[i][:, :4], shape0[i], letterbox_geometry(shape0[i], shape1).ratio_pad)
 
             return Detections(ims, y, files, dt, self.names, x.shape)
 
+    def submit(self, ims, size=640, augment=False):
+        """
+        Queues `ims` for inference on background threads and returns a Future of its Detections.
+
+        Accepts the same inputs as forward() except torch tensors. One thread pre-processes the next batch while another
+        runs the model on the current one, so a stream loop calling submit() for frame N+1 before result() for frame N
+        keeps the model busy. Blocks while `slots` batches are already in flight. Submitted arrays are read on the
+        worker threads and must not be modified until their result is ready.
+
+        Example:
+            model.submit(cap.read()[1])
+            while cap.isOpened():
+                model.submit(cap.read()[1])  # pre-process frame N+1 ...
+                results = model.result()  # ... while frame N is inferred
+        """
+        if isinstance(ims, torch.Tensor):
+            raise TypeError("AutoShape.submit() takes images, call the model directly for preprocessed tensors")
+        if self._workers is None:
+            self._start_workers()
+        slots, pending, pre = self._workers[:3]
+        slots.acquire()
+        future = Future()
+        pending.append(future)
+        pre.put((future, ims, size, augment))
+        return future
+
+    def result(self, timeout=None):
+        """Returns the Detections of the oldest batch submitted with submit(), waiting up to `timeout` seconds."""
+        if self._workers is None or not self._workers[1]:
+            raise RuntimeError("no batch in flight, call AutoShape.submit() first")
+        pending = self._workers[1]
+        if not pending[0].cancelled():
+            pending[0].exception(timeout)  # raises TimeoutError and keeps the batch queued if it is not done yet
+        return pending.popleft().result()
+
+    def shutdown(self):
+        """Finishes the batches in flight and stops the submit() threads; submit() restarts them."""
+        if self._workers is not None:
+            self._workers[2].put(None)
+            for t in self._workers[4]:
+                t.join()
+            self._workers = None
+
+    def _start_workers(self):
+        """Starts the pre-process and inference threads behind submit()."""
+        pre, infer = queue.Queue(), queue.Queue()
+        threads = (
+            threading.Thread(target=self._pre_loop, args=(pre, infer), name="autoshape-pre", daemon=True),
+            threading.Thread(target=self._infer_loop, args=(infer,), name="autoshape-infer", daemon=True),
+        )
+        self._workers = threading.Semaphore(self.slots), deque(), pre, infer, threads
+        for t in threads:
+            t.start()
+
+    def _pre_loop(self, pre, infer):
+        """Pre-process thread: loads and letterboxes submitted batches into its own buffer."""
+        slots, letterbox = self._workers[0], BatchLetterbox()
+        while True:
+            job = pre.get()
+            if job is None:
+                infer.put(None)
+                break
+            future, ims, size, augment = job
+            if not future.set_running_or_notify_cancel():  # cancelled by the caller
+                slots.release()
+                continue
+            dt = (Profile(), Profile(), Profile())
+            try:
+                with dt[0]:
+                    batch = self._preprocess(ims, size, letterbox)
+            except Exception as e:
+                future.set_exception(e)
+                slots.release()
+                continue
+            infer.put((future, batch, dt, augment))
+
+    def _infer_loop(self, infer):
+        """Inference thread: runs the model and NMS on pre-processed batches and resolves their futures."""
+        slots = self._workers[0]
+        while True:
+            job = infer.get()
+            if job is None:
+                break
+            future, batch, dt, augment = job
+            try:
+                future.set_result(self._predict(batch, dt, augment))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                slots.release()
+
 
 class Detections:
     """Manages YOLOv5 detection results with methods for visualization, saving, cropping, and exporting detections."""
@@ -931,20 +1122,66 @@ class Detections:
     def __init__(self, ims, pred, files, times=(0, 0, 0), names=None, shape=None):
         """Initializes the YOLOv5 Detections class with image info, predictions, filenames, timing and normalization."""
         super().__init__()
-        d = pred[0].device  # device
-        gn = [torch.tensor([*(im.shape[i] for i in [1, 0, 1, 0]), 1, 1], device=d) for im in ims]  # normalizations
         self.ims = ims  # list of images as numpy arrays
         self.pred = pred  # list of tensors pred[0] = (xyxy, conf, cls)
         self.names = names  # class names
         self.files = files  # image filenames
         self.times = times  # profiling times
         self.xyxy = pred  # xyxy pixels
-        self.xywh = [xyxy2xywh(x) for x in pred]  # xywh pixels
-        self.xyxyn = [x / g for x, g in zip(self.xyxy, gn)]  # xyxy normalized
-        self.xywhn = [x / g for x, g in zip(self.xywh, gn)]  # xywh normalized
+        self._xywh = self._xyxyn = self._xywhn = None  # xywh pixels, xyxy and xywh normalized; computed on first use
+        self._cat = None  # (concatenated pred, per-image counts, per-row normalization gains)
         self.n = len(self.pred)  # number of images (batch size)
         self.t = tuple(x.t / self.n * 1e3 for x in times)  # timestamps (ms)
         self.s = tuple(shape)  # inference BCHW shape
+        self._columns = None  # DetectionColumns, built on first numpy() call
+
+    def _concat(self):
+        """Returns all predictions as one tensor with per-image row counts and per-row (w, h, w, h, 1, 1) gains."""
+        if self._cat is None:
+            x = self.pred[0] if self.n == 1 else torch.cat(list(self.pred))
+            counts = [len(p) for p in self.pred]
+            gn = torch.tensor([[*(im.shape[i] for i in [1, 0, 1, 0]), 1, 1] for im in self.ims], device=x.device)
+            self._cat = x, counts, gn.repeat_interleave(torch.tensor(counts, device=x.device), 0)
+        return self._cat
+
+    @property
+    def xywh(self):
+        """Returns xywh pixel boxes per image, converted for the whole batch in one op on first access."""
+        if self._xywh is None:
+            x, counts, _ = self._concat()
+            self._xywh = list(xyxy2xywh(x).split(counts))
+        return self._xywh
+
+    @xywh.setter
+    def xywh(self, value):
+        """Sets xywh, e.g. to DataFrames in pandas()."""
+        self._xywh = value
+
+    @property
+    def xyxyn(self):
+        """Returns normalized xyxy boxes per image, computed for the whole batch in one op on first access."""
+        if self._xyxyn is None:
+            x, counts, gn = self._concat()
+            self._xyxyn = list((x / gn).split(counts))
+        return self._xyxyn
+
+    @xyxyn.setter
+    def xyxyn(self, value):
+        """Sets xyxyn, e.g. to DataFrames in pandas()."""
+        self._xyxyn = value
+
+    @property
+    def xywhn(self):
+        """Returns normalized xywh boxes per image, computed for the whole batch in one op on first access."""
+        if self._xywhn is None:
+            x, counts, gn = self._concat()
+            self._xywhn = list((xyxy2xywh(x) / gn).split(counts))
+        return self._xywhn
+
+    @xywhn.setter
+    def xywhn(self, value):
+        """Sets xywhn, e.g. to DataFrames in pandas()."""
+        self._xywhn = value
 
     def _run(self, pprint=False, show=False, save=False, crop=False, render=False, labels=True, save_dir=Path("")):
         """Executes model predictions, displaying and/or saving outputs with optional crops and labels."""
@@ -1046,6 +1283,16 @@ class Detections:
             setattr(new, k, [pd.DataFrame(x, columns=c) for x in a])
         return new
 
+    def numpy(self):
+        """
+        Returns detections as a cached columnar DetectionColumns of NumPy views, without the pandas overhead.
+
+        Example: cols = results.numpy(); boxes, labels = cols[0][:, :4], cols.labels[cols.image == 0].
+        """
+        if self._columns is None:
+            self._columns = DetectionColumns(self.pred, self.names, [im.shape[:2] for im in self.ims])
+        return self._columns
+
     def tolist(self):
         """
         Converts a Detections object into a list of individual detection results for iteration.
@@ -1084,6 +1331,114 @@ class Detections:
         return f"YOLOv5 {self.__class__} instance\n" + self.__str__()
 
 
+_NAME_TABLES = OrderedDict()  # id(names) -> (names, ndarray of names by class id), most recent names objects last
+_NAME_TABLES_LOCK = threading.Lock()
+
+
+def name_table(names, maxsize=8):
+    """Returns class `names` (dict or list) as an ndarray indexed by class id, cached for the last `maxsize` objects."""
+    with _NAME_TABLES_LOCK:
+        entry = _NAME_TABLES.get(id(names))
+        if entry is not None and entry[0] is names:
+            _NAME_TABLES.move_to_end(id(names))
+            return entry[1]
+        table = [names[i] for i in range(len(names))] if isinstance(names, dict) else list(names)
+        table = np.array(table, dtype=object)
+        _NAME_TABLES[id(names)] = names, table  # keeps `names` alive, so its id is not reused while cached
+        if len(_NAME_TABLES) > maxsize:
+            _NAME_TABLES.popitem(last=False)
+        return table
+
+
+class DetectionColumns:
+    """Columnar NumPy view of a batch of detections: boxes, scores, class ids and names as flat arrays."""
+
+    def __init__(self, pred, names, shapes):
+        """Initializes from per-image (n, 6) predictions, class names and per-image (h, w) shapes; single CPU images
+        are wrapped without a copy.
+        """
+        counts = [len(x) for x in pred]
+        if len(pred) == 0:
+            x = np.zeros((0, 6), dtype=np.float32)
+        elif len(pred) == 1:
+            x = pred[0]
+        else:
+            x = torch.cat(list(pred)) if isinstance(pred[0], torch.Tensor) else np.concatenate(pred)
+        self.data = x.cpu().numpy() if isinstance(x, torch.Tensor) else np.asarray(x)  # (N, 6) xyxy, conf, cls
+        self.offsets = np.cumsum([0] + counts)  # rows of image i are data[offsets[i]:offsets[i + 1]]
+        self.shapes = np.asarray(shapes, dtype=np.float32).reshape(-1, 2)  # (n, 2) image h, w
+        self.names = names
+        self._cache = {}
+
+    def __len__(self):
+        """Returns the total number of detections in the batch."""
+        return len(self.data)
+
+    def __getitem__(self, i):
+        """Returns the (n, 6) view of the detections of image `i`."""
+        return self.data[self.offsets[i] : self.offsets[i + 1]]
+
+    def _cached(self, k, fn):
+        """Returns the cached value of format `k`, computing it with `fn()` on first access."""
+        if k not in self._cache:
+            self._cache[k] = fn()
+        return self._cache[k]
+
+    @property
+    def xyxy(self):
+        """Returns the (N, 4) xyxy pixel boxes as a view."""
+        return self.data[:, :4]
+
+    @property
+    def scores(self):
+        """Returns the (N,) confidences as a view."""
+        return self.data[:, 4]
+
+    @property
+    def classes(self):
+        """Returns the (N,) int64 class ids."""
+        return self._cached("classes", lambda: self.data[:, 5].astype(np.int64))
+
+    @property
+    def image(self):
+        """Returns the (N,) image index of every detection."""
+        return self._cached("image", lambda: np.repeat(np.arange(len(self.shapes)), np.diff(self.offsets)))
+
+    @property
+    def name_table(self):
+        """Returns the class names as an ndarray indexed by class id, built once per model names object."""
+        return name_table(self.names)
+
+    @property
+    def labels(self):
+        """Returns the (N,) class names of the detections."""
+        return self._cached("labels", lambda: self.name_table[self.classes])
+
+    @property
+    def gn(self):
+        """Returns the (N, 4) per-detection normalization gains (w, h, w, h)."""
+        return self._cached("gn", lambda: self.shapes[:, [1, 0, 1, 0]][self.image])
+
+    @property
+    def xywh(self):
+        """Returns the (N, 4) xywh pixel boxes."""
+        return self._cached("xywh", lambda: xyxy2xywh(self.xyxy))
+
+    @property
+    def xyxyn(self):
+        """Returns the (N, 4) normalized xyxy boxes."""
+        return self._cached("xyxyn", lambda: self.xyxy / self.gn)
+
+    @property
+    def xywhn(self):
+        """Returns the (N, 4) normalized xywh boxes."""
+        return self._cached("xywhn", lambda: self.xywh / self.gn)
+
+    def split(self, a):
+        """Splits a per-detection array such as `labels` or `xywhn` into a list of per-image views."""
+        return np.split(a, self.offsets[1:-1])
+
+
 class Proto(nn.Module):
     """YOLOv5 mask Proto module for segmentation models, performing convolutions and upsampling on input tensors."""
 
@@ -13,6 +13,7 @@ Usage - sources:
                                                      'path/*.jpg'                    # glob
                                                      'https://youtu.be/LNwODJXcvt4'  # YouTube
                                                      'rtsp://example.com/media.mp4'  # RTSP, RTMP, HTTP stream
+                                                     shm://trolley_cam               # trolley_shm frame ring
 
 Usage - formats:
     $ python detect.py --weights yolov5s.pt                 # PyTorch
@@ -45,7 +46,7 @@ ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
 
 from ultralytics.utils.plotting import Annotator, colors, save_one_box
 
-from models.common import DetectMultiBackend
+from models.common import DetectMultiBackend, letterbox_geometry
 from utils.dataloaders import IMG_FORMATS, VID_FORMATS, LoadImages, LoadScreenshots, LoadStreams
 from utils.general import (
     LOGGER,
@@ -154,6 +155,7 @@ def run(
     is_url = source.lower().startswith(("rtsp://", "rtmp://", "http://", "https://"))
     webcam = source.isnumeric() or source.endswith(".streams") or (is_url and not is_file)
     screenshot = source.lower().startswith("screen")
+    shared = source.lower().startswith("shm://")
     if is_url and is_file:
         source = check_file(source)  # download
 
@@ -175,6 +177,10 @@ def run(
         bs = len(dataset)
     elif screenshot:
         dataset = LoadScreenshots(source, img_size=imgsz, stride=stride, auto=pt)
+    elif shared:
+        from trolley_shm import LoadSharedFrames
+
+        dataset = LoadSharedFrames(source, img_size=imgsz, stride=stride, auto=pt)
     else:
         dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
     vid_path, vid_writer = [None] * bs, [None] * bs
@@ -244,7 +250,8 @@ def run(
             annotator = Annotator(im0, line_width=line_thickness, example=str(names))
             if len(det):
                 # Rescale boxes from img_size to im0 size
-                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+                ratio_pad = letterbox_geometry(im0.shape, tuple(im.shape[2:])).ratio_pad  # cached per frame shape
+                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape, ratio_pad).round()
 
                 # Print results
                 for c in det[:, 5].unique():
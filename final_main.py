@@ -1,15 +1,28 @@
 # === Part 1: Imports and Initialization ===
+from trolley_startup import StartupTimer, load_model
+
+startup = StartupTimer()  # import/model/subsystem breakdown, printed before the main loop
 import os
 import cv2
-import torch
 import time
 import numpy as np
 import pygame
-import pyttsx3
-import threading
-import speech_recognition as sr
 from datetime import datetime
-import random
+
+from trolley_capture import LatestFrameCapture
+from trolley_asr import VoiceListener
+from trolley_cart import CartTracker
+from trolley_catalog import Catalog
+from trolley_ledger import CartLedger, ledger_path
+from trolley_metrics import REGISTRY, start_exporter
+from trolley_motion import MotionGate
+from trolley_pipeline import TrolleyPipeline
+from trolley_roi import RoiDetector
+from trolley_server import InferenceClient
+from trolley_speech import PRIORITY_ALERT, SpeechQueue
+from trolley_ui import CartView, load_icons
+startup.mark("imports")
+exporter = start_exporter()  # TROLLEY_METRICS=<port> or <file> exports per-stage latencies
 
 # === ENVIRONMENT CACHE PATHS ===
 os.environ['TORCH_HOME'] = 'D:/smart_trolley_data/torch'
@@ -19,17 +32,22 @@ os.environ['PYTORCH_TRANSFORMERS_CACHE'] = 'D:/smart_trolley_data/pytorch_transf
 os.environ['PYTORCH_PRETRAINED_BERT_CACHE'] = 'D:/smart_trolley_data/bert'
 
 # === Load YOLOv5 Model ===
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s', force_reload=False)
-
-# === Product Prices ===
-item_prices = {
-    'teddy bear': 10.99, 'laptop': 999.99, 'cell phone': 599.99,
-    'bottle': 1.49, 'book': 15.75, 'cup': 2.99, 'clock': 8.49,
-    'backpack': 35.00, 'chips': 3.50, 'chocolate': 2.25,
-    'coldrink': 1.25, 'remote': 5.50
-}
-
-cart, detection_memory, disappear_memory = {}, {}, {}
+model = InferenceClient.from_env() or load_model('yolov5n.pt')  # bundled weights, local AutoShape
+startup.mark("model")
+
+# === Basket Region ===
+BASKET_ROIS = None  # e.g. [(0.25, 0.4, 0.75, 1.0)] as frame fractions or pixels; None = full frame
+INFER_SIZE = 640  # use 320 together with BASKET_ROIS for ~4x faster inference
+detector = RoiDetector(model, rois=BASKET_ROIS, size=INFER_SIZE)
+
+# === Product Catalog ===
+catalog = Catalog(model.names, app="final_main")  # prices, deals and suggestions by class id (catalog.csv)
+item_prices = catalog.prices
+
+tracker = CartTracker(model.names, items=catalog.items, add_frames=5, remove_frames=3)
+ledger = CartLedger(ledger_path(__file__), model.names, catalog.price)  # crash-safe event log, incremental total
+ledger.restore(tracker)  # recover the basket after a restart
+cart = tracker.cart  # live view: label -> count
 previous_purchases = ['teddy bear', 'chocolate']
 fun_tips = [
     "✨ Tip: Try scanning slowly for better accuracy.",
@@ -50,13 +68,10 @@ font = pygame.font.SysFont("arial", 28)
 clock = pygame.time.Clock()
 
 # === TTS Setup ===
-engine = pyttsx3.init()
-engine.setProperty('rate', 160)
-engine.say(greeting)
-engine.runAndWait()
+speech = SpeechQueue(rate=160).start()
+speech.say(greeting)
 
 # === Voice Assistant Setup ===
-recognizer = sr.Recognizer()
 checkout_triggered, animated_total, checkout_message_displayed = False, 0, False
 
 # === Product Icons ===
@@ -66,15 +81,10 @@ product_images = {
     'book': 'icons/book.png', 'cup': 'icons/cup.png',
     'clock': 'icons/clock.png', 'backpack': 'icons/bag.png',
     'chips': 'icons/chips.png', 'chocolate': 'icons/choco.png',
-    'coldrink': 'icons/coldrink.png', 'remote': 'icons/remote.png'
+    'cold drink': 'icons/coldrink.png', 'remote': 'icons/remote.png'
 }
 
-product_icons = {}
-for name, path in product_images.items():
-    try:
-        product_icons[name] = pygame.image.load(path)
-    except:
-        product_icons[name] = None
+product_icons = load_icons(product_images, size=(60, 60))  # scaled once, not per frame
 
 # === NLP Voice Response ===
 def simple_response(command):
@@ -94,8 +104,7 @@ def simple_response(command):
     elif "bye" in command:
         return "Goodbye! Happy shopping!"
     elif "total" in command:
-        total = sum(item_prices[label] * count for label, count in cart.items())
-        return f"Your total is ${total:.2f}"
+        return f"Your total is ${ledger.total:.2f}"
     elif "most expensive" in command:
         if cart:
             max_item = max(cart.items(), key=lambda x: item_prices[x[0]] * x[1])[0]
@@ -109,32 +118,11 @@ def simple_response(command):
     return "Sorry, I didn't catch that. Try saying hello, suggest, or ask about sales."
 
 # === Voice Thread ===
-def voice_loop():
-    try:
-        with sr.Microphone() as source:
-            recognizer.adjust_for_ambient_noise(source)
-            while True:
-                try:
-                    audio = recognizer.listen(source, timeout=5, phrase_time_limit=5)
-                    command = recognizer.recognize_google(audio)
-                    response = simple_response(command)
-                    engine.say(response)
-                    engine.runAndWait()
-                except sr.WaitTimeoutError:
-                    continue
-                except sr.UnknownValueError:
-                    continue
-                except sr.RequestError as e:
-                    print(f"Speech Recognition Error: {e}")
-    except Exception as e:
-        print(f"Voice assistant error: {e}")
-
-threading.Thread(target=voice_loop, daemon=True).start()
+listener = VoiceListener("auto", continuous=True).start()  # offline keyword spotting if available, built on its thread
 
 # === USB Webcam Setup ===
-cap = cv2.VideoCapture(0)  # USB webcam
-time.sleep(2)
-if not cap.isOpened():
+cap = LatestFrameCapture([0]).start()  # USB webcam, newest frame only
+if not cap.wait_ready(timeout=5):
     print("Error: Could not open webcam.")
     exit()
 
@@ -145,64 +133,49 @@ try:
 except:
     beep = checkout_sound = None
 
+# === Capture / Inference Pipeline ===
+gate = MotionGate(diff_thres=6, hist_thres=0.2, max_interval=2.0)  # skip inference while the basket is static
+pipeline = TrolleyPipeline(cap, detector, gate=gate).start()
+small_font = pygame.font.SysFont("arial", 16)
+view = CartView(screen, font, product_icons, small_font=small_font, tips=fun_tips, currency="$")
+total = 0
+startup.mark("subsystems")
+print(startup.report())
+
 # === Main Loop ===
 while True:
+    t_loop = time.perf_counter()
     pygame.event.pump()
-    screen.fill((30, 30, 30))
 
     try:
-        ret, frame = cap.read()
-        if not ret or frame is None:
-            print("[Frame Error] Unable to read from webcam")
-            continue
-
-        result = model(frame)
-        detected_labels = [x for x in result.names.values() if x in item_prices]
-
-        for label in detected_labels:
-            detection_memory[label] = detection_memory.get(label, 0) + 1
-            disappear_memory[label] = 0
-            if detection_memory[label] >= 5:
-                cart[label] = cart.get(label, 0) + 1
-                detection_memory[label] = 0
-
-        for label in list(cart):
-            if label not in detected_labels:
-                disappear_memory[label] = disappear_memory.get(label, 0) + 1
-                if disappear_memory[label] >= 3:
-                    del cart[label]
+        for intent in listener.poll():  # recognized on the listener thread
+            speech.say(simple_response(intent.text))
+
+        packet = pipeline.poll()  # newest finished detection, None if the model is still busy
+        if packet is not None:
+            pred = packet.result.pred[0]
+            with REGISTRY.time("cart"):
+                events = ledger.apply(tracker.update(pred), pred)
+            for _, label, delta in events:
+                if delta < 0:
                     if beep: beep.play()
-                    engine.say(f"Alert: {label} removed!")
-                    engine.runAndWait()
-
-        # Draw UI
-        y = 60
-        total = 0
-        for label, count in cart.items():
-            icon = product_icons.get(label)
-            if icon:
-                screen.blit(pygame.transform.scale(icon, (60, 60)), (20, y))
-            text = font.render(f"{label} x{count} - ${item_prices[label]*count:.2f}", True, (255, 255, 255))
-            screen.blit(text, (100, y+10))
-            y += 80
-            total += item_prices[label] * count
+                    speech.announce(label, "removed!", PRIORITY_ALERT, prefix="Alert: ")
+
+        total = ledger.total
 
         # Animate total
         if animated_total < total:
             animated_total += min(5, total - animated_total)
         elif animated_total > total:
             animated_total -= min(5, animated_total - total)
-        screen.blit(font.render(f"Total: ${animated_total:.2f}", True, (0, 255, 0)), (500, 20))
 
-        # Greeting and Tip
-        screen.blit(font.render(greeting, True, (255, 255, 0)), (20, 10))
-        screen.blit(font.render(random.choice(fun_tips), True, (200, 200, 255)), (20, 520))
+        # Draw UI: only regions whose content changed are repainted and pushed to the display
+        view.draw(cart, item_prices, animated_total, greeting=greeting, status=pipeline.status_line())
 
         # Checkout Display
         if checkout_triggered and not checkout_message_displayed:
             items_str = ', '.join([f"{k} x{v}" for k, v in cart.items()])
-            engine.say(f"You bought: {items_str}. Total amount is {total:.2f} dollars. Thank you for shopping!")
-            engine.runAndWait()
+            speech.say(f"You bought: {items_str}. Total amount is {total:.2f} dollars. Thank you for shopping!", PRIORITY_ALERT)
             if checkout_sound: checkout_sound.play()
             screen.fill((0, 100, 0))
             screen.blit(font.render("Checkout Complete!", True, (255, 255, 255)), (250, 250))
@@ -210,10 +183,12 @@ while True:
             pygame.display.flip()
             time.sleep(4)
             checkout_message_displayed = True
-            cart.clear()
+            tracker.clear()
+            ledger.checkout()
             checkout_triggered = False
+            view.invalidate()
 
-        pygame.display.update()
+        pipeline.tick(time.perf_counter() - t_loop)
         clock.tick(60)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -223,5 +198,12 @@ while True:
         print(f"Frame error: {e}")
         continue
 
+pipeline.stop()
+listener.stop()
+speech.stop()
+ledger.close()
+if exporter is not None:
+    exporter.stop()
+print(f"[Pipeline] {pipeline.summary()}")
 cap.release()
 pygame.quit()
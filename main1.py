@@ -1,47 +1,47 @@
 # === PART 1: Imports and Initialization ===
+from trolley_startup import StartupTimer, load_model
+
+startup = StartupTimer()  # import/model/subsystem breakdown, printed before the loop
 import cv2
-import torch
 import numpy as np
 import time
-import pyttsx3
 import random
 import threading
-from collections import defaultdict, Counter
-import speech_recognition as sr
-import qrcode
-from deepface import DeepFace
-import os
-import pygame
+
+from trolley_asr import VoiceListener
+from trolley_cart import CartTracker
+from trolley_catalog import Catalog
+from trolley_emotion import EmotionWorker
+from trolley_ledger import CartLedger, ledger_path
+from trolley_motion import MotionGate
+from trolley_metrics import REGISTRY, start_exporter
+from trolley_overlay import FrameOverlay
+from trolley_pipeline import StageStats
+from trolley_qr import QrCheckout
+from trolley_roi import RoiDetector
+from trolley_server import InferenceClient
+from trolley_speech import SpeechQueue
+from trolley_tracker import TrackedCart
+startup.mark("imports")
+exporter = start_exporter()  # TROLLEY_METRICS=<port> or <file> exports per-stage latencies
 
 # Initialize voice engine
-engine = pyttsx3.init()
+speech = SpeechQueue().start()
 def speak(text):
-    threading.Thread(target=lambda: engine.say(text) or engine.runAndWait()).start()
+    speech.say(text)
 
 # Load YOLOv5
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
+model = InferenceClient.from_env() or load_model('yolov5n.pt')  # bundled weights, local AutoShape
 model.conf = 0.5  # Confidence threshold
+startup.mark("model")
 
-# Prices and Product Metadata
-ITEM_PRICES = {
-    'bottle': 20, 'cell phone': 300, 'laptop': 1000,
-    'clock': 150, 'teddy bear': 250, 'book': 100,
-    'chips': 50, 'cup': 40, 'remote': 60
-}
-
-HOT_DEALS = {
-    'chips': 'Buy 1 Get 1 Free!',
-    'bottle': '20% off today!',
-    'teddy bear': 'Special discount for kids!',
-    'laptop': 'Flat ₹500 off for students!'
-}
+# Basket region: only these crops of the 1280x720 frame are sent to the detector
+BASKET_ROIS = None  # e.g. [(320, 288, 960, 720)] in pixels or frame fractions; None = full frame
+INFER_SIZE = 640  # use 320 together with BASKET_ROIS for ~4x faster inference
+detector = RoiDetector(model, rois=BASKET_ROIS, size=INFER_SIZE)
 
-SUGGESTIONS = {
-    'laptop': ['mouse', 'keyboard'],
-    'chips': ['cola', 'cookies'],
-    'bottle': ['cup', 'juice'],
-    'book': ['pen', 'marker']
-}
+# Prices, deals and suggestions indexed by model class id (catalog.csv)
+catalog = Catalog(model.names, app="main1")
 
 EMOTION_SUGGESTIONS = {
     'happy': 'You seem happy! How about some chocolates?',
@@ -52,45 +52,59 @@ EMOTION_SUGGESTIONS = {
     'fear': 'Everything’s safe here. Want a cup of coffee?'
 }
 
-# Initialize cart and tracking structures
-cart = Counter()
-last_seen = defaultdict(lambda: time.time())
-detection_timers = {}
+# Initialize cart and tracking structures: count physical objects, so clearing the cart ignores items still in view
+tracker = TrackedCart(
+    CartTracker(model.names, items=catalog.items, conf=0.5, add_frames=1, remove_frames=1, add_secs=2, remove_secs=5)
+)
+ledger = CartLedger(ledger_path(__file__), model.names, catalog.price)  # crash-safe event log, incremental total
+ledger.restore(tracker)  # recover the basket after a restart
+cart = tracker.cart  # live view: item -> count
+PERSON = tracker.ids.get('person', -1)
+gate = MotionGate(diff_thres=6, hist_thres=0.2, max_interval=2.0)  # skip inference while the basket is static
+pred = np.zeros((0, 6), dtype=np.float32)  # last detections, reused for skipped frames
+emotions = EmotionWorker(duty=0.1, min_interval=2.0, preload=False).start()  # DeepFace loads on first face
 emotion = "neutral"
-frame_count = 0
-prev_frame_time = time.time()
+loop_stats = StageStats("frame")  # whole-iteration latency and smoothed FPS, also exported
 
 # === Beep Sound Fallback ===
-pygame.mixer.init()
-beep_available = True
-try:
-    pygame.mixer.music.load("beep.mp3")
-except:
-    beep_available = False
-    print("⚠️ beep.mp3 not found. Beep sound disabled.")
+beep = None  # pygame.mixer.music once loaded on the first beep, False if unavailable
 
 def play_beep():
-    if beep_available:
-        pygame.mixer.music.play()
+    global beep
+    if beep is None:
+        try:
+            import pygame
+
+            pygame.mixer.init()
+            pygame.mixer.music.load("beep.mp3")
+            beep = pygame.mixer.music
+        except Exception:
+            beep = False
+            print("⚠️ beep.mp3 not found. Beep sound disabled.")
+    if beep:
+        beep.play()
 
 # === PART 2: Utility Functions ===
-def calculate_total(cart):
-    return sum(ITEM_PRICES.get(item, 0) * count for item, count in cart.items())
-
-def generate_qr(cart):
-    data = "\n".join([f"{item}: {count} x ₹{ITEM_PRICES.get(item, 0)}" for item, count in cart.items()])
-    total = calculate_total(cart)
-    qr = qrcode.make(f"Smart Trolley Checkout:\n{data}\nTotal: ₹{total}\nPay at counter or scan UPI.")
-    qr.save("checkout_qr.png")
-
-def detect_emotion(frame):
-    try:
-        result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-        return result[0]['dominant_emotion']
-    except:
-        return "neutral"
+overlay = FrameOverlay(alpha=0.85, bg=(30, 30, 30))  # headless when no display is attached
+qr_checkout = QrCheckout(debounce=5.0).start()  # renders in memory on a worker thread, cached per cart
+
+def generate_qr():
+    # False if this cart's QR was already requested in the last few seconds
+    return qr_checkout.request(ledger.lines(), ledger.total)
+
+def checkout():
+    # Explicit confirmation ('c' key or voice) completes the sale: QR receipt, logged checkout, next basket empty
+    if not ledger.lines():
+        speak("Your cart is empty.")
+        return False
+    generate_qr()
+    tracker.clear()  # objects still in view are not re-added
+    ledger.checkout()
+    return True
 
 def show_fake_map(suggestions):
+    if overlay.headless:
+        return
     canvas = np.zeros((400, 600, 3), dtype=np.uint8)
     cv2.putText(canvas, "Store Map", (200, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
     y = 100
@@ -100,39 +114,39 @@ def show_fake_map(suggestions):
     cv2.imshow("Fake Store Map", canvas)
 
 def show_hot_deals():
+    if overlay.headless:
+        return
     canvas = np.zeros((400, 600, 3), dtype=np.uint8)
     cv2.putText(canvas, "🔥 HOT DEALS TODAY 🔥", (100, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 100, 255), 2)
     y = 100
-    for item, deal in HOT_DEALS.items():
+    for item, deal in catalog.deals.items():
         cv2.putText(canvas, f"{item.title()}: {deal}", (50, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
         y += 40
     cv2.imshow("Hot Deals", canvas)
 
 def draw_cart_ui(frame, cart, emotion):
     h, w, _ = frame.shape
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (0, 0), (w, 160), (30, 30, 30), -1)
+    overlay.shade(frame, 0, 160)  # blend only the header rows, in place
 
-    total = calculate_total(cart)
+    total = f"{ledger.total:g}"
     y_offset = 30
-    for i, (item, count) in enumerate(cart.items()):
-        price = ITEM_PRICES.get(item, 0)
-        text = f"{item}: {count} x ₹{price}"
-        cv2.putText(overlay, text, (10, y_offset + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    for i, (item, count, price, _) in enumerate(ledger.lines()):
+        text = f"{item}: {count} x ₹{price:g}"
+        overlay.text(frame, text, (10, y_offset + i * 25), 0.7, (0, 255, 0), 2)
 
-    cv2.putText(overlay, f"Total: ₹{total}", (10, y_offset + len(cart) * 25 + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-    cv2.putText(overlay, f"Emotion: {emotion}", (w - 250, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-    
-    return cv2.addWeighted(overlay, 0.85, frame, 0.15, 0)
+    overlay.text(frame, f"Total: ₹{total}", (10, y_offset + len(cart) * 25 + 20), 0.8, (0, 255, 255), 2)
+    overlay.text(frame, f"Emotion: {emotion}", (w - 250, 30), 0.7, (255, 255, 0), 2)
+
+    return frame
 
 def process_command(command):
     command = command.lower()
     if "total" in command:
-        speak(f"Your total is ₹{calculate_total(cart)}")
+        speak(f"Your total is ₹{ledger.total:g}")
     elif "suggest" in command:
         for item in cart:
-            if item in SUGGESTIONS:
-                suggest = ', '.join(SUGGESTIONS[item])
+            if catalog.suggest(item):
+                suggest = ', '.join(catalog.suggest(item))
                 speak(f"Since you have {item}, you might like {suggest}")
                 return
         speak("No suggestions available right now.")
@@ -140,115 +154,112 @@ def process_command(command):
         show_hot_deals()
         speak("Here are today’s hot deals!")
     elif "map" in command:
-        sample = random.sample(list(ITEM_PRICES.keys()), 4)
+        sample = random.sample(catalog.items, min(4, len(catalog.items)))
         show_fake_map(sample)
         speak("Here's a map showing item locations.")
     elif "checkout" in command or "pay" in command:
-        generate_qr(cart)
-        speak("Generating QR code for payment.")
-        if os.path.exists("checkout_qr.png"):
-            qr_img = cv2.imread("checkout_qr.png")
-            cv2.imshow("Scan to Pay", qr_img)
-        else:
-            speak("Sorry, QR code image not found.")
+        if checkout():
+            speak("Generating QR code for payment.")
     elif "thank" in command:
         speak("You're welcome! Happy shopping!")
 
+listener = VoiceListener("auto").start()  # push-to-talk, recognizer built and run in the background
+
 def voice_assistant():
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        speak("Listening for your command.")
-        try:
-            audio = r.listen(source, timeout=4)
-            command = r.recognize_google(audio)
-            print("Command:", command)
-            process_command(command)
-        except:
+    speak("Listening for your command.")
+    listener.request()
+
+def handle_intents():
+    for intent in listener.poll():
+        if not intent.text:
             speak("Sorry, I didn’t catch that.")
+            continue
+        print("Command:", intent.text)
+        process_command(intent.text)
 
 # === PART 3: Real-Time Detection Loop ===
+startup.mark("subsystems")
+print(startup.report())
 cap = cv2.VideoCapture('0')  # <-- replace with your IP
 
 while True:
-    ret, frame = cap.read()
+    t_loop = time.perf_counter()
+    with REGISTRY.time("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    frame = cv2.resize(frame, (1280, 720))
-    detections = model(frame)
-    results = detections.pandas().xyxy[0]
-
-    current_items = []
-    for _, row in results.iterrows():
-        label = row['name']
-        conf = row['confidence']
-        if conf > 0.5 and label in ITEM_PRICES:
-            current_items.append(label)
-
-    if frame_count % 60 == 0:
-        emotion = detect_emotion(frame)
-    frame_count += 1
-
-    for item in current_items:
-        if item not in detection_timers:
-            detection_timers[item] = time.time()
-        elif time.time() - detection_timers[item] >= 2:
-            cart[item] += 1
-            last_seen[item] = time.time()
-            detection_timers[item] = time.time() + 5
-
-    for item in list(cart.keys()):
-        if time.time() - last_seen[item] > 5:
-            if cart[item] > 0:
-                cart[item] -= 1
-                last_seen[item] = time.time()
-                threading.Thread(target=play_beep).start()
-
-    # Gesture-based checkout
-    people = [row for _, row in results.iterrows() if row['name'] == 'person']
-    if len(people) >= 2:
-        generate_qr(cart)
-        speak("Detected checkout gesture. Here is your QR code.")
-        if os.path.exists("checkout_qr.png"):
-            qr_img = cv2.imread("checkout_qr.png")
+    with REGISTRY.time("preprocess"):
+        frame = cv2.resize(frame, (1280, 720))
+    fresh = gate(frame)
+    if fresh:
+        with REGISTRY.time("inference"):
+            detections = detector(frame)
+        REGISTRY.observe_detections(detections)
+        pred = detections.pred[0].cpu().numpy()  # (n, 6) xyxy, conf, cls
+
+    emotions.submit(frame, pred[pred[:, 5] == PERSON, :4])  # face crop from the person boxes, non-blocking
+    emotion = emotions.emotion
+
+    with REGISTRY.time("cart"):
+        events = ledger.apply(tracker.update(pred), tracker.tracks)
+    for _, item, delta in events:
+        if delta < 0:
+            threading.Thread(target=play_beep).start()
+
+    # Gesture only previews the payment QR, the sale needs an explicit checkout; skipped frames reuse stale pred
+    people = (pred[:, 5] == PERSON).sum() if fresh else 0
+    if people >= 2 and ledger.lines() and generate_qr():
+        speak("Detected checkout gesture. Here is your QR code. Say checkout or press C to pay.")
+
+    handle_intents()
+    qr_img = qr_checkout.poll()
+    t_render = time.perf_counter()
+
+    if not overlay.headless:  # nothing to draw without a display
+        for *xyxy, conf, cls in pred:
+            if conf < 0.5: continue
+            label = model.names[int(cls)]
+            x1, y1, x2, y2 = map(int, xyxy)
+            color = (0, 255, 0) if catalog.sold[int(cls)] else (100, 100, 100)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            overlay.text(frame, f"{label}", (x1, y1 - 10), 0.7, color, 2)
+
+        if qr_img is not None:
             cv2.imshow("Scan to Pay", qr_img)
 
-    for _, row in results.iterrows():
-        if row['confidence'] < 0.5: continue
-        label = row['name']
-        x1, y1, x2, y2 = map(int, [row['xmin'], row['ymin'], row['xmax'], row['ymax']])
-        color = (0, 255, 0) if label in ITEM_PRICES else (100, 100, 100)
-        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-        cv2.putText(frame, f"{label}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-
-    frame = draw_cart_ui(frame, cart, emotion)
-    fps = int(1.0 / (time.time() - prev_frame_time))
-    prev_frame_time = time.time()
-    cv2.putText(frame, f"FPS: {fps}", (1100, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        frame = draw_cart_ui(frame, cart, emotion)
+        overlay.text(frame, f"FPS: {loop_stats.rate:.0f}", (1100, 40), 0.7, (0, 255, 255), 2)
+        overlay.text(frame, f"Skip: {gate.skip_ratio:.0%}", (1100, 70), 0.7, (0, 255, 255), 2)
 
-    cv2.imshow("Smart Trolley", frame)
-
-    key = cv2.waitKey(1)
+    key = overlay.show("Smart Trolley", frame)
+    t = time.perf_counter()
+    REGISTRY.stage("render").observe(t - t_render)
+    loop_stats.update(t - t_loop)
     if key == ord('q'):
         break
     elif key == ord('r'):
-        cart.clear()
+        tracker.clear()
+        ledger.void()
         speak("Cart reset.")
     elif key == ord('v'):
         voice_assistant()
     elif key == ord('m'):
-        show_fake_map(random.sample(list(ITEM_PRICES.keys()), 4))
+        show_fake_map(random.sample(catalog.items, min(4, len(catalog.items))))
     elif key == ord('d'):
         show_hot_deals()
     elif key == ord('c'):
-        generate_qr(cart)
-        speak("QR Code generated for checkout.")
-        if os.path.exists("checkout_qr.png"):
-            qr_img = cv2.imread("checkout_qr.png")
-            cv2.imshow("Scan to Pay", qr_img)
+        if checkout():
+            speak("QR Code generated for checkout.")
 
 cap.release()
 cv2.destroyAllWindows()
+emotions.stop()
+qr_checkout.stop()
+ledger.close()
+if exporter is not None:
+    exporter.stop()
 
 # === PART 4: Greeting ===
 speak("Welcome to Smart Trolley! You can ask me to show deals, map, or checkout anytime.")
+speech.stop()
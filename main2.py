@@ -1,141 +1,149 @@
+from trolley_startup import StartupTimer, load_model
+
+startup = StartupTimer()  # import/model/subsystem breakdown, printed before the loop
 import cv2
-import torch
-import time
 import random
-import pyttsx3
-import speech_recognition as sr
+from collections import deque
+
+from trolley_capture import LatestFrameCapture
+from trolley_cart import CartTracker
+from trolley_catalog import Catalog
+from trolley_ledger import CartLedger, ledger_path
+from trolley_metrics import REGISTRY, start_exporter
+from trolley_overlay import FrameOverlay
+from trolley_server import InferenceClient
+from trolley_speech import PRIORITY_ALERT, SpeechQueue
+from trolley_tracker import TrackedCart
+startup.mark("imports")
+exporter = start_exporter()  # TROLLEY_METRICS=<port> or <file> exports per-stage latencies
 
 # Load YOLOv5
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s', verbose=False)
-
-# Product prices
-product_prices = {
-    "teddy bear": 20,
-    "laptop": 1000,
-    "chips": 10,
-    "colddrink": 15,
-    "bottle": 12,
-    "clock": 30,
-    "chocolate": 5,
-    "mobile phone": 800,
-}
-
-cart = {}
-last_seen = {}
-removed_time = {}
+model = InferenceClient.from_env() or load_model('yolov5n.pt')  # bundled weights, local AutoShape
+startup.mark("model")
+
+# Product prices indexed by model class id (catalog.csv)
+catalog = Catalog(model.names, app="main2")
+
+# Count physical objects entering/leaving the basket, not labels
+BASKET_REGION = None  # (x1, y1, x2, y2) in pixels, None = whole frame
+tracker = TrackedCart(CartTracker(model.names, items=catalog.items, conf=0.5), region=BASKET_REGION)
+ledger = CartLedger(ledger_path(__file__), model.names, catalog.price)  # crash-safe event log, incremental total
+ledger.restore(tracker)  # recover the basket after a restart
+cart = tracker.cart  # live view: item -> qty
 
 # Camera settings
 IP_CAM_URL = "http://192.168.137.135:8080/video"
 FALLBACK_CAM_INDEX = 0
 
 # Voice setup
-engine = pyttsx3.init()
-r = sr.Recognizer()
+speech = SpeechQueue(echo=True).start()
 
 def speak(text):
-    print("[Assistant]:", text)
-    engine.say(text)
-    engine.runAndWait()
+    speech.say(text)
 
 def get_video_capture():
-    print("[INFO] Trying IP camera...")
-    cap = cv2.VideoCapture(IP_CAM_URL)
-    time.sleep(2)
-    ret, frame = cap.read()
-    if ret:
-        print("[SUCCESS] IP camera connected.")
+    print("[INFO] Trying IP camera, then webcam...")
+    cap = LatestFrameCapture([IP_CAM_URL, FALLBACK_CAM_INDEX]).start()  # keeps only the newest frame
+    if cap.wait_ready(timeout=10):
+        print(f"[SUCCESS] Camera connected: {cap.source}")
         return cap
-    else:
-        print("[FAILED] Switching to webcam.")
-        cap = cv2.VideoCapture(FALLBACK_CAM_INDEX)
-        time.sleep(2)
-        ret, frame = cap.read()
-        if ret:
-            print("[SUCCESS] Webcam connected.")
-            return cap
-        else:
-            print("[ERROR] No camera available.")
-            return None
+    print("[ERROR] No camera available.")
+    cap.release()
+    return None
 
 def update_cart(item):
-    cart[item] = cart.get(item, 0) + 1
-    speak(f"{item} added to cart")
+    speech.announce(item, "added to cart")
 
 def remove_item(item):
-    if item in cart:
-        cart[item] -= 1
-        if cart[item] <= 0:
-            del cart[item]
-        speak(f"{item} removed from cart")
+    speech.announce(item, "removed from cart", PRIORITY_ALERT)
+
+overlay = FrameOverlay()  # cached text sprites; headless when no display is attached
 
 def display_cart(frame):
     y = 30
-    total = 0
-    for item, qty in cart.items():
-        price = product_prices.get(item, 0)
-        total += price * qty
-        line = f"{item} x{qty} = ₹{price * qty}"
-        cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+    for item, qty, price, amount in ledger.lines():
+        line = f"{item} x{qty} = ₹{amount:g}"
+        overlay.text(frame, line, (10, y), 0.6, (0, 255, 255), 2)
         y += 25
-    cv2.putText(frame, f"Total: ₹{total}", (10, y + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-
-def run_detection(frame):
-    global last_seen, removed_time
-    results = model(frame)
-    detections = results.pandas().xyxy[0]
-    current = set()
-
-    for _, row in detections.iterrows():
-        label = row['name']
-        if label in product_prices:
-            current.add(label)
-            x1, y1, x2, y2 = map(int, [row['xmin'], row['ymin'], row['xmax'], row['ymax']])
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(frame, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-            now = time.time()
-            if label not in last_seen:
-                last_seen[label] = now
-            elif now - last_seen[label] >= 2:
-                update_cart(label)
-                last_seen[label] = now  # reset to avoid repeated addition
-
-    # Handle disappearance
-    now = time.time()
-    for label in list(last_seen.keys()):
-        if label not in current:
-            if label not in removed_time:
-                removed_time[label] = now
-            elif now - removed_time[label] >= 3:
-                remove_item(label)
-                removed_time.pop(label)
-                last_seen.pop(label)
-        else:
-            removed_time[label] = now  # Reset removal timer
-
-    display_cart(frame)
+    overlay.text(frame, f"Total: ₹{ledger.total:g}", (10, y + 20), 0.8, (0, 255, 0), 2)
+
+# common.AutoShape (load_model) pre-processes frame N+1 on its own thread while frame N runs on the model;
+# InferenceClient and a hub-loaded AutoShape have no submit() and run synchronously
+submit = getattr(model, "submit", None)
+in_flight = deque()  # frames submitted but not yet collected
+print(f"[INFO] Inference: {'pipelined, ' + str(model.slots) + ' frames in flight' if submit else 'synchronous'}")
+
+def detect(frame):
+    # Returns (frame, results) of the oldest frame in flight, or (None, None) while the pipeline fills up
+    if submit is None:
+        with REGISTRY.time("inference"):
+            return frame, model(frame)
+    submit(frame)
+    in_flight.append(frame)
+    if len(in_flight) < model.slots:
+        return None, None
+    with REGISTRY.time("inference"):
+        return in_flight.popleft(), model.result()
+
+def run_detection(frame, results):
+    REGISTRY.observe_detections(results)
+    pred = results.pred[0].cpu().numpy()  # (n, 6) xyxy, conf, cls
+
+    # One add per object entering the basket, one remove per object leaving it
+    with REGISTRY.time("cart"):
+        events = ledger.apply(tracker.update(pred), tracker.tracks)
+    for _, label, delta in events:
+        handler = update_cart if delta > 0 else remove_item
+        for _ in range(abs(delta)):
+            handler(label)
+
+    if overlay.headless:
+        return
+    with REGISTRY.time("render"):
+        for *xyxy, conf, cls in pred:
+            label = model.names[int(cls)]
+            if catalog.sold[int(cls)]:
+                x1, y1, x2, y2 = map(int, xyxy)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                overlay.text(frame, label, (x1, y1 - 5), 0.6, (0, 255, 0), 2)
+
+        display_cart(frame)
 
 # ------------------ MAIN ------------------
 speak("Welcome to Smart Trolley!")
 cap = get_video_capture()
+startup.mark("subsystems")
+print(startup.report())
 
 if cap is None:
     speak("Sorry, no camera available.")
+    speech.stop()
     exit()
 
 while True:
-    ret, frame = cap.read()
+    with REGISTRY.time("capture"):
+        ret, frame = cap.read()
     if not ret:
-        print("[ERROR] Failed to read frame.")
-        break
+        print("[WARN] No new frame, camera reconnecting...")
+        if not overlay.headless and cv2.waitKey(1) == ord('q'):  # keep the window responsive while reconnecting
+            break
+        continue
 
-    run_detection(frame)
-    cv2.imshow("Smart Trolley", frame)
-    key = cv2.waitKey(1)
+    frame, results = detect(frame)
+    if frame is None:
+        continue
+    run_detection(frame, results)
+    key = overlay.show("Smart Trolley", frame)
 
     if key == ord('q'):
         break
 
 cap.release()
+if submit is not None:
+    model.shutdown()
 cv2.destroyAllWindows()
+ledger.close()
+if exporter is not None:
+    exporter.stop()
 speak("Thank you for using Smart Trolley!")
+speech.stop()
@@ -1,103 +1,114 @@
+from trolley_startup import StartupTimer, load_model
+
+startup = StartupTimer()  # import/model/subsystem breakdown, printed before the loop
 import cv2
-import torch
-import time
-import requests
-from PIL import Image
-from io import BytesIO
 import numpy as np
-import pyttsx3
-import speech_recognition as sr
 import random
 
+from trolley_asr import VoiceListener
+from trolley_capture import LatestFrameCapture
+from trolley_cart import CartTracker
+from trolley_catalog import Catalog
+from trolley_fusion import CameraFusion, MultiCameraDetector, MultiViewCart
+from trolley_ledger import CartLedger, ledger_path
+from trolley_metrics import REGISTRY, start_exporter
+from trolley_overlay import FrameOverlay
+from trolley_server import InferenceClient
+from trolley_speech import PRIORITY_ALERT, SpeechQueue
+from trolley_tracker import TrackedCart
+startup.mark("imports")
+exporter = start_exporter()  # TROLLEY_METRICS=<port> or <file> exports per-stage latencies
+
 # === CONFIGURATION ===
 CUSTOM_MODEL_PATH = "runs/train/exp/weights/best.pt"  # ← update path to your model
 IP_CAM_URL = "http://192.168.137.135:8080/video"      # ← your phone IP camera
 FALLBACK_CAM_INDEX = 0
-
-product_prices = {
-    "chips": 10,
-    "colddrink": 15,
-    "teddy bear": 20,
-    "bottle": 12,
-    "clock": 30,
-    "chocolate": 5,
-    "mobile phone": 800,
-    "laptop": 1000,
-}
+CAMERAS = [[IP_CAM_URL, FALLBACK_CAM_INDEX]]  # one source list per camera, e.g. append [1] for a side camera
+HOMOGRAPHIES = None  # per-camera 3x3 maps into camera 0's image for cross-camera NMS; None = per-camera tracking
+DATA_YAML = "data.yaml"  # classes the custom model was trained on
 
 # === SETUP ===
-model = torch.hub.load('ultralytics/yolov5', 'custom', path=CUSTOM_MODEL_PATH)
-engine = pyttsx3.init()
-r = sr.Recognizer()
-
-cart = {}
-last_detection_time = {}
-last_removed_time = {}
+model = InferenceClient.from_env() or load_model(CUSTOM_MODEL_PATH)  # offline, see trolley_startup
+startup.mark("model")
+speech = SpeechQueue(echo=True).start()
+listener = VoiceListener("auto").start()  # push-to-talk, recognizer built and run in the background
+catalog = Catalog(model.names, data=DATA_YAML, app="main3")  # prices by class id, checked against the training classes
+
+# Count physical objects entering/leaving the basket, not labels
+BASKET_REGIONS = [None] * len(CAMERAS)  # per camera (x1, y1, x2, y2) in that camera's pixels, None = whole frame
+base = CartTracker(model.names, items=catalog.items, conf=0.5)
+if HOMOGRAPHIES is None:  # uncalibrated: track in each camera's own pixels, cart holds the per-class max count
+    fusion, tracker = None, MultiViewCart(base, len(CAMERAS), regions=BASKET_REGIONS)
+else:  # calibrated: boxes projected into camera 0, items seen twice counted once
+    fusion, tracker = CameraFusion(len(CAMERAS), HOMOGRAPHIES), TrackedCart(base, region=BASKET_REGIONS[0])
+ledger = CartLedger(ledger_path(__file__), model.names, catalog.price)  # crash-safe event log, incremental total
+ledger.restore(tracker)  # recover the basket after a restart
+cart = tracker.cart  # live view: item -> qty
 
 def speak(msg):
-    print("[Assistant]:", msg)
-    engine.say(msg)
-    engine.runAndWait()
+    speech.say(msg)
 
 def get_video_capture():
-    cap = cv2.VideoCapture(IP_CAM_URL)
-    time.sleep(2)
-    if cap.isOpened():
-        print("[INFO] IP Camera connected.")
-        return cap
-    cap = cv2.VideoCapture(FALLBACK_CAM_INDEX)
-    if cap.isOpened():
-        print("[INFO] Fallback webcam connected.")
-        return cap
+    caps = [LatestFrameCapture(sources).start() for sources in CAMERAS]  # each keeps only its newest frame
+    if caps[0].wait_ready(timeout=10):
+        for i, cap in enumerate(caps):
+            ready = cap.wait_ready(timeout=0 if i == 0 else 5)
+            print(f"[INFO] Camera {i} connected: {cap.source}" if ready else f"[WARN] Camera {i} not streaming yet")
+        return MultiCameraDetector(model, caps)  # all cameras in one batched forward pass
+    for cap in caps:
+        cap.release()
     return None
 
 def update_cart(item):
-    cart[item] = cart.get(item, 0) + 1
-    speak(f"{item} added to cart.")
+    speech.announce(item, "added to cart.")
 
 def remove_item(item):
-    if item in cart:
-        cart[item] -= 1
-        if cart[item] <= 0:
-            del cart[item]
-        speak(f"{item} removed from cart.")
+    speech.announce(item, "removed from cart.", PRIORITY_ALERT)
+
+overlay = FrameOverlay()  # cached text sprites; headless when no display is attached
 
 def display_cart(frame):
     y = 30
-    total = 0
-    for item, qty in cart.items():
-        price = product_prices.get(item, 0)
-        total += qty * price
-        text = f"{item} x{qty} = ₹{qty*price}"
-        cv2.putText(frame, text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,0), 2)
+    for item, qty, price, amount in ledger.lines():
+        text = f"{item} x{qty} = ₹{amount:g}"
+        overlay.text(frame, text, (10, y), 0.6, (255,255,0), 2)
         y += 25
-    cv2.putText(frame, f"Total: ₹{total}", (10, y+10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,255,0), 2)
+    overlay.text(frame, f"Total: ₹{ledger.total:g}", (10, y+10), 0.7, (0,255,0), 2)
 
 def show_checkout(frame):
-    cv2.putText(frame, "Scan QR to Checkout!", (200, 250), cv2.FONT_HERSHEY_SIMPLEX, 1.1, (0, 255, 255), 3)
+    overlay.text(frame, "Scan QR to Checkout!", (200, 250), 1.1, (0, 255, 255), 3)
+
+def complete_checkout():
+    # The shopper is sent to pay: log the sale so a restart does not recover this basket, start the next one empty
+    if not ledger.lines():
+        speak("Your cart is empty.")
+        return
+    tracker.clear()
+    _, total = ledger.checkout()
+    speak(f"Your total is ₹{total:g}.")
 
 def suggest_items():
-    all_items = list(product_prices.keys())
-    suggestions = random.sample(all_items, 3)
+    all_items = catalog.items
+    suggestions = random.sample(all_items, min(3, len(all_items)))
     speak("You might also like: " + ", ".join(suggestions))
 
 def listen_command():
-    with sr.Microphone() as source:
-        r.adjust_for_ambient_noise(source)
-        speak("Listening...")
-        try:
-            audio = r.listen(source, timeout=4)
-            cmd = r.recognize_google(audio).lower()
-            print("Heard:", cmd)
-            return cmd
-        except:
+    speak("Listening...")
+    listener.request()
+
+def poll_commands():
+    cmds = []
+    for intent in listener.poll():
+        if not intent.text:
             speak("Sorry, I didn’t catch that.")
-            return ""
+            continue
+        print("Heard:", intent.text)
+        cmds.append(intent.text.lower())
+    return cmds
 
 def handle_voice(cmd):
     if "total" in cmd:
-        total = sum(product_prices.get(i, 0) * q for i, q in cart.items())
-        speak(f"Your total is ₹{total}")
+        speak(f"Your total is ₹{ledger.total:g}")
     elif "suggest" in cmd or "recommend" in cmd:
         suggest_items()
     elif "checkout" in cmd:
@@ -107,72 +118,82 @@ def handle_voice(cmd):
         speak("Trending items: chips, chocolate, and teddy bear.")
     return False
 
-def run_detection(frame):
-    results = model(frame)
-    detections = results.pandas().xyxy[0]
-    detected_now = []
-
-    for _, row in detections.iterrows():
-        label = row['name']
-        if label in product_prices:
-            x1, y1, x2, y2 = map(int, [row['xmin'], row['ymin'], row['xmax'], row['ymax']])
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
-            cv2.putText(frame, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
-
-            detected_now.append(label)
-            now = time.time()
-            if label not in last_detection_time:
-                last_detection_time[label] = now
-            elif now - last_detection_time[label] >= 2:
-                update_cart(label)
-                last_detection_time[label] = now
-
-    now = time.time()
-    for label in list(last_detection_time.keys()):
-        if label not in detected_now:
-            if label not in last_removed_time:
-                last_removed_time[label] = now
-            elif now - last_removed_time[label] >= 3:
-                remove_item(label)
-                del last_detection_time[label]
-                del last_removed_time[label]
-        else:
-            last_removed_time[label] = now
-
-    display_cart(frame)
+def run_detection(frames, preds):
+    if fusion is None:
+        pred = [p if f is not None else None for f, p in zip(frames, preds)]  # None = stale camera, keeps its tracks
+    else:
+        pred = fusion(preds)  # (n, 6) xyxy, conf, cls in camera 0's pixels
+
+    # One add per object entering the basket, one remove per object leaving it
+    with REGISTRY.time("cart"):
+        events = ledger.apply(tracker.update(pred), tracker.tracks)
+    for _, label, delta in events:
+        handler = update_cart if delta > 0 else remove_item
+        for _ in range(abs(delta)):
+            handler(label)
+
+    if overlay.headless:
+        return
+    with REGISTRY.time("render"):
+        for frame, p in zip(frames, preds):
+            if frame is None:
+                continue
+            for *xyxy, conf, cls in p:
+                label = model.names[int(cls)]
+                if catalog.sold[int(cls)]:
+                    x1, y1, x2, y2 = map(int, xyxy)
+                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
+                    overlay.text(frame, label, (x1, y1-10), 0.6, (0,255,0), 2)
+
+        display_cart(frames[0])
 
 # === MAIN ===
 speak("Welcome to Smart Trolley!")
-cap = get_video_capture()
+detector = get_video_capture()
+startup.mark("subsystems")
+print(startup.report())
 
-if cap is None:
+if detector is None:
     speak("No camera available. Please reconnect and restart.")
+    speech.stop()
     exit()
 
 checkout = False
 while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("[ERROR] Frame not received.")
-        break
-
-    run_detection(frame)
+    frames, preds = detector()
+    frame = frames[0]
+    if frame is None:
+        print("[WARN] Frame not received, camera reconnecting...")
+        if not overlay.headless and cv2.waitKey(1) == ord('q'):  # keep the window responsive while reconnecting
+            break
+        continue
+
+    run_detection(frames, preds)
+    for cmd in poll_commands():
+        if handle_voice(cmd):
+            checkout = True
+            complete_checkout()
     if checkout:
         show_checkout(frame)
 
-    cv2.imshow("Smart Trolley", frame)
-    key = cv2.waitKey(1)
+    for i, other in enumerate(frames[1:], 1):
+        if other is not None and not overlay.headless:
+            cv2.imshow(f"Smart Trolley camera {i}", other)
+    key = overlay.show("Smart Trolley", frame)
 
     if key == ord('q'):
         break
     elif key == ord('v'):
-        cmd = listen_command()
-        if handle_voice(cmd):
-            checkout = True
+        listen_command()
     elif key == ord('c'):
         checkout = True
         speak("Checkout started. Please scan the QR.")
+        complete_checkout()
 
-cap.release()
+detector.release()
 cv2.destroyAllWindows()
+ledger.close()
+if exporter is not None:
+    exporter.stop()
 speak("Thanks for shopping with Smart Trolley!")
+speech.stop()
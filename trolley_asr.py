@@ -0,0 +1,232 @@
+"""
+Pluggable, background speech recognition for the smart-trolley voice assistant.
+
+`recognize_google` needs a network round trip per utterance, fails offline, and blocks whatever thread calls it. Here
+recognition runs on a `VoiceListener` thread that posts parsed `Intent`s to a queue the main loop polls without
+blocking. Backends are interchangeable: `OfflineBackend` streams microphone audio into a local Vosk model restricted to
+the assistant's small command vocabulary (keyword spotting, bounded local latency), `GoogleBackend` keeps the previous
+online behaviour, and `make_backend("auto")` prefers the offline one when its model is installed.
+
+Usage:
+    listener = VoiceListener(make_backend("auto"), continuous=True).start()
+    while True:
+        for intent in listener.poll():
+            print(intent.name, intent.text)
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+LOGGER = logging.getLogger("smart_trolley")
+
+VOSK_MODEL = Path(__file__).resolve().parent / "models" / "vosk-model-small-en-us"  # offline model directory
+
+# Intent -> trigger phrases, in matching priority order (mirrors the assistant command handlers)
+INTENTS = {
+    "how_are_you": ("how are you",),
+    "most_expensive": ("most expensive",),
+    "greet": ("hello", "hi"),
+    "suggest": ("suggest", "recommend", "cool"),
+    "sale": ("sale", "discount"),
+    "deals": ("deals", "hot"),
+    "checkout": ("checkout", "check out", "pay"),
+    "total": ("total",),
+    "trending": ("trending",),
+    "mood": ("bored", "sad"),
+    "map": ("map",),
+    "thanks": ("thank", "thanks"),
+    "bye": ("bye", "goodbye"),
+}
+
+
+@dataclass
+class Intent:
+    """A recognized command: intent name (None if no keyword matched), raw text and wall-clock time."""
+
+    name: str
+    text: str
+    t: float = field(default_factory=time.time)
+
+
+class IntentParser:
+    """Keyword-spotting intent parser over a small command vocabulary."""
+
+    def __init__(self, intents=None):
+        """Initializes the parser from an {intent: phrases} mapping, defaulting to INTENTS."""
+        self.intents = intents or INTENTS
+
+    @property
+    def vocabulary(self):
+        """Returns the sorted list of words the commands are built from, e.g. for a recognizer grammar."""
+        return sorted({w for phrases in self.intents.values() for p in phrases for w in p.split()})
+
+    def parse(self, text):
+        """Returns the first intent whose phrase occurs in `text` as whole words, else None."""
+        padded = f" {' '.join(text.lower().split())} "
+        for name, phrases in self.intents.items():
+            if any(f" {p} " in padded for p in phrases):
+                return name
+        return None
+
+
+class GoogleBackend:
+    """Online Google Web Speech recognition through speech_recognition (previous behaviour)."""
+
+    streaming = False
+
+    def __init__(self, timeout=5, phrase_time_limit=5):
+        """Initializes the backend with listen() timeouts in seconds."""
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.timeout, self.phrase_time_limit = timeout, phrase_time_limit
+
+    def listen(self, source):
+        """Records one phrase from `source` and returns its transcript, or '' if nothing was understood."""
+        try:
+            audio = self.recognizer.listen(source, timeout=self.timeout, phrase_time_limit=self.phrase_time_limit)
+            return self.recognizer.recognize_google(audio)
+        except (self.sr.WaitTimeoutError, self.sr.UnknownValueError):
+            return ""
+        except self.sr.RequestError as e:
+            LOGGER.warning(f"[ASR] Google speech recognition error: {e}")
+            return ""
+
+
+class OfflineBackend:
+    """Local streaming Vosk recognition constrained to the command vocabulary."""
+
+    streaming = True
+
+    def __init__(self, model_path=VOSK_MODEL, vocabulary=None, sample_rate=16000):
+        """Loads the Vosk model at `model_path`; `vocabulary` restricts decoding to those words (keyword spotting)."""
+        import vosk  # optional dependency: pip install vosk
+
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(str(model_path))
+        self.sample_rate = sample_rate
+        grammar = [json.dumps(list(vocabulary) + ["[unk]"])] if vocabulary else []
+        self.rec = vosk.KaldiRecognizer(self.model, sample_rate, *grammar)
+
+    def feed(self, chunk):
+        """Feeds raw 16-bit mono PCM; returns the transcript when an utterance ends, else None."""
+        if self.rec.AcceptWaveform(chunk):
+            text = json.loads(self.rec.Result()).get("text", "")
+            return text.replace("[unk]", "").strip() or None
+        return None
+
+
+def make_backend(name="auto", vocabulary=None, model_path=VOSK_MODEL):
+    """Returns 'offline', 'google' or, for 'auto', the offline backend if vosk and its model are available."""
+    if name in ("offline", "auto"):
+        try:
+            return OfflineBackend(model_path, vocabulary or IntentParser().vocabulary)
+        except Exception as e:
+            if name == "offline":
+                raise
+            LOGGER.warning(f"[ASR] offline recognizer unavailable ({e}), falling back to Google")
+    return GoogleBackend()
+
+
+class VoiceListener:
+    """Background recognition thread posting Intents to a queue; push-to-talk or always listening."""
+
+    def __init__(self, backend, parser=None, continuous=False, utterance_timeout=5.0, chunk=4000):
+        """
+        Initializes the listener.
+
+        Args:
+            backend (GoogleBackend | OfflineBackend | str): backend instance, or a `make_backend()` name such as
+                'auto' to build it on the listener thread instead of delaying start-up.
+            parser (IntentParser | None): intent parser, default keyword table.
+            continuous (bool): listen all the time; otherwise only after `request()` (push-to-talk).
+            utterance_timeout (float): seconds a push-to-talk request waits for speech.
+            chunk (int): audio frames read per streaming step.
+        """
+        self.backend, self.parser = backend, parser or IntentParser()
+        self.continuous, self.utterance_timeout, self.chunk = continuous, utterance_timeout, chunk
+        self.intents = queue.Queue()
+        self.recognized = self.unknown = 0  # counters
+        self._armed = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the listener thread; returns self for chaining."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="trolley-asr", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the listener thread after its current read."""
+        self._running = False
+        self._armed.set()
+
+    def request(self):
+        """Push-to-talk: listen for one utterance in the background."""
+        self._armed.set()
+
+    def poll(self):
+        """Returns all Intents recognized since the last call, never blocking."""
+        out = []
+        while True:
+            try:
+                out.append(self.intents.get_nowait())
+            except queue.Empty:
+                return out
+
+    def _post(self, text):
+        """Parses `text` and queues the resulting Intent."""
+        text = text.strip()
+        if not text:
+            self.unknown += 1
+            if not self.continuous:
+                self.intents.put(Intent(None, ""))  # let push-to-talk callers report a miss
+            return
+        self.recognized += 1
+        self.intents.put(Intent(self.parser.parse(text), text))
+
+    def _run(self):
+        """Listener loop: opens the microphone once and recognizes utterances until stopped."""
+        import speech_recognition as sr
+
+        if isinstance(self.backend, str):  # deferred: loading vosk models or the mic stack happens off the main thread
+            try:
+                self.backend = make_backend(self.backend, self.parser.vocabulary)
+            except Exception as e:
+                LOGGER.warning(f"[ASR] recognizer unavailable, voice commands disabled: {e}")
+                return
+        rate = getattr(self.backend, "sample_rate", None)
+        try:
+            with sr.Microphone(sample_rate=rate, chunk_size=self.chunk) as source:
+                if not self.backend.streaming:
+                    self.backend.recognizer.adjust_for_ambient_noise(source)
+                while self._running:
+                    if not self.continuous:
+                        self._armed.wait()
+                        self._armed.clear()
+                        if not self._running:
+                            break
+                    self._listen_once(source)
+        except Exception as e:
+            LOGGER.warning(f"[ASR] voice listener stopped: {e}")
+
+    def _listen_once(self, source):
+        """Recognizes one utterance (or, in continuous mode, one streaming step) from `source`."""
+        if not self.backend.streaming:
+            self._post(self.backend.listen(source))
+            return
+        deadline = time.monotonic() + self.utterance_timeout
+        while self._running and (self.continuous or time.monotonic() < deadline):
+            text = self.backend.feed(source.stream.read(self.chunk))
+            if text is not None:
+                self._post(text)
+                return
+        self._post("")
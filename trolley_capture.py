@@ -0,0 +1,159 @@
+"""
+Threaded low-latency camera grabber for the smart-trolley apps.
+
+OpenCV buffers MJPEG/RTSP/HTTP frames internally, so a loop that reads slower than the camera delivers processes
+frames that are seconds old. `LatestFrameCapture` drains the camera on a background thread and keeps only the newest
+frame, reconnects automatically when the stream stalls, and falls back through a list of sources (e.g. the phone IP
+camera first, then the USB webcam) without ever blocking the caller for longer than its read timeout.
+
+Usage:
+    cap = LatestFrameCapture(["http://192.168.137.135:8080/video", 0]).start()
+    ok, frame = cap.read()  # newest frame, waits at most `timeout` seconds for one
+    print(cap.frame_age, cap.dropped, cap.source)
+"""
+
+import logging
+import threading
+import time
+
+import cv2
+
+LOGGER = logging.getLogger("smart_trolley")
+
+
+class LatestFrameCapture:
+    """Background camera reader that keeps only the latest frame and fails over between sources."""
+
+    def __init__(self, sources, stall_timeout=3.0, reconnect_delay=1.0, open_timeout=5.0):
+        """
+        Initializes the grabber.
+
+        Args:
+            sources (list): camera sources in order of preference, e.g. [IP_CAM_URL, 0]; each is tried on reconnect.
+            stall_timeout (float): seconds without a frame after which the stream is reopened.
+            reconnect_delay (float): seconds to wait after all sources failed before trying again.
+            open_timeout (float): seconds OpenCV may spend opening or reading a network stream.
+        """
+        self.sources = list(sources) if isinstance(sources, (list, tuple)) else [sources]
+        self.stall_timeout, self.reconnect_delay, self.open_timeout = stall_timeout, reconnect_delay, open_timeout
+        self.source = None  # source currently streaming
+        self.frame, self.t_frame, self.index = None, 0.0, 0  # latest frame, its monotonic timestamp and number
+        self.grabbed = self.dropped = self.failures = self.reconnects = 0  # counters
+        self._read_index = 0  # index of the last frame handed out by read()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the grabber thread; returns self for chaining."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="trolley-camera", daemon=True)
+        self._thread.start()
+        return self
+
+    def _open(self, source):
+        """Opens `source` with a minimal internal buffer; returns the capture or None."""
+        cap = cv2.VideoCapture(source)
+        ms = int(self.open_timeout * 1e3)
+        props = ("CAP_PROP_BUFFERSIZE", 1), ("CAP_PROP_OPEN_TIMEOUT_MSEC", ms), ("CAP_PROP_READ_TIMEOUT_MSEC", ms)
+        for prop, value in props:
+            if hasattr(cv2, prop):  # not available in older OpenCV builds
+                cap.set(getattr(cv2, prop), value)
+        ok, frame = cap.read() if cap.isOpened() else (False, None)
+        if not ok:
+            cap.release()
+            return None
+        self._publish(frame)
+        return cap
+
+    def _connect(self):
+        """Tries every source in order of preference until one delivers a frame; returns the capture or None."""
+        for source in self.sources:
+            if not self._running:
+                return None
+            LOGGER.info(f"[Camera] trying {source}...")
+            cap = self._open(source)
+            if cap is not None:
+                LOGGER.info(f"[Camera] connected to {source}")
+                self.source = source
+                return cap
+            LOGGER.warning(f"[Camera] {source} unavailable")
+        return None
+
+    def _publish(self, frame):
+        """Replaces the latest frame, counting the previous one as dropped if nobody read it."""
+        with self._cond:
+            if self.index > self._read_index:
+                self.dropped += 1
+            self.frame, self.t_frame = frame, time.monotonic()
+            self.index += 1
+            self.grabbed += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        """Grabber loop: (re)connects and keeps draining the active source."""
+        cap = None
+        while self._running:
+            if cap is None:
+                cap = self._connect()
+                if cap is None:
+                    self.source = None
+                    time.sleep(self.reconnect_delay)
+                    continue
+            ok, frame = cap.read()
+            if ok and frame is not None:
+                self._publish(frame)
+                continue
+            self.failures += 1
+            if time.monotonic() - self.t_frame > self.stall_timeout:
+                LOGGER.warning(f"[Camera] {self.source} stalled, reconnecting")
+                cap.release()
+                cap, self.source = None, None
+                self.reconnects += 1
+            else:
+                time.sleep(0.01)
+        if cap is not None:
+            cap.release()
+
+    def read(self, timeout=1.0):
+        """Returns (True, frame) with a frame newer than the last one read, or (False, None) after `timeout` s."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.index > self._read_index or not self._running, timeout):
+                return False, None
+            if self.index <= self._read_index:
+                return False, None
+            self._read_index = self.index
+            return True, self.frame
+
+    def wait_ready(self, timeout=10.0):
+        """Blocks until the first frame arrived or `timeout` seconds passed; returns True if a camera is streaming."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.index > 0, timeout)
+
+    def isOpened(self):
+        """Returns True while a source is connected, mirroring cv2.VideoCapture.isOpened()."""
+        return self.source is not None
+
+    @property
+    def frame_age(self):
+        """Returns the age in seconds of the latest frame, or inf if none arrived yet."""
+        return time.monotonic() - self.t_frame if self.index else float("inf")
+
+    def release(self):
+        """Stops the grabber thread and releases the camera."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(self.open_timeout + 1)
+
+    def as_dict(self):
+        """Returns the grabber counters as a plain dict."""
+        return {
+            "source": self.source,
+            "grabbed": self.grabbed,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "reconnects": self.reconnects,
+            "frame_age_ms": round(self.frame_age * 1e3, 1) if self.index else None,
+        }
@@ -0,0 +1,181 @@
+"""
+Vectorized detection-to-cart state machine shared by the smart-trolley apps.
+
+`CartTracker` consumes raw YOLOv5 predictions (`Detections.pred[i]`, an (n, 6) tensor or ndarray of
+xyxy, conf, cls) and keeps per-class cart quantities with add/remove hysteresis. All bookkeeping is done with NumPy over
+class-id arrays and only touches the classes seen this frame or still in flight, so per-frame cost does not grow with
+the number of catalog items.
+
+Usage:
+    tracker = CartTracker(model.names, items=prices, add_frames=5, remove_frames=3)
+    for cls, name, delta in tracker.update(results.pred[0]):
+        ...  # delta > 0 added, delta < 0 removed
+    tracker.cart  # {'bottle': 2, ...}
+
+Benchmark:
+    $ python trolley_cart.py --nc 80 1000 10000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def to_numpy(pred):
+    """Returns predictions as an (n, 6) float ndarray from a Detections object, torch tensor or array-like."""
+    if hasattr(pred, "pred"):  # Detections
+        pred = pred.pred[0]
+    if hasattr(pred, "cpu"):  # torch.Tensor
+        pred = pred.detach().cpu().numpy()
+    pred = np.asarray(pred, dtype=np.float32)
+    return pred.reshape(-1, 6) if pred.size else np.zeros((0, 6), dtype=np.float32)
+
+
+class CartTracker:
+    """Per-class cart quantities driven by detection counts, with frame- and time-based add/remove hysteresis."""
+
+    def __init__(self, names, items=None, conf=0.5, add_frames=5, remove_frames=3, add_secs=0.0, remove_secs=0.0):
+        """
+        Initializes the tracker.
+
+        Args:
+            names (dict | list): model class names, e.g. `model.names`.
+            items (iterable | None): names that can go in the cart (e.g. a price dict); None tracks every class.
+            conf (float): minimum detection confidence.
+            add_frames (int): consecutive frames a higher count must be seen before items are added.
+            remove_frames (int): consecutive frames a lower count must be seen before items are removed.
+            add_secs (float): additionally, seconds a higher count must persist before items are added.
+            remove_secs (float): additionally, seconds a lower count must persist before items are removed.
+        """
+        self.names = [names[i] for i in range(len(names))] if isinstance(names, dict) else list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        nc = len(self.names)
+        self.tracked = np.zeros(nc, dtype=bool)  # classes that may go in the cart
+        self.tracked[[self.ids[k] for k in (self.names if items is None else items) if k in self.ids]] = True
+        self.conf = conf
+        self.add_frames, self.remove_frames = max(add_frames, 1), max(remove_frames, 1)
+        self.add_secs, self.remove_secs = add_secs, remove_secs
+        self.qty = np.zeros(nc, dtype=np.int32)  # items in cart per class
+        self.up = np.zeros(nc, dtype=np.int32)  # consecutive frames with more detections than qty
+        self.down = np.zeros(nc, dtype=np.int32)  # consecutive frames with fewer detections than qty
+        self.t_up = np.zeros(nc)  # time the current 'up' streak started
+        self.t_down = np.zeros(nc)  # time the current 'down' streak started
+        self.active = np.zeros(0, dtype=np.int64)  # classes with qty > 0 or a running streak
+        self.cart = {}  # name -> qty, kept in sync incrementally
+
+    def observe(self, pred):
+        """Returns (class_ids, counts) of tracked classes in `pred` above the confidence threshold."""
+        p = to_numpy(pred)
+        c = p[p[:, 4] >= self.conf, 5].astype(np.int64)
+        c = c[(c >= 0) & (c < len(self.tracked))]
+        return np.unique(c[self.tracked[c]], return_counts=True)
+
+    def update(self, pred, now=None):
+        """
+        Advances the state machine by one frame of predictions.
+
+        Returns a list of (class_id, name, delta) events; delta > 0 for additions, < 0 for removals.
+        """
+        now = time.monotonic() if now is None else now
+        obs, n = self.observe(pred)
+        idx = np.union1d(obs, self.active)  # only classes that can change this frame
+        if not idx.size:
+            return []
+        o = np.zeros(idx.size, dtype=np.int32)
+        o[np.searchsorted(idx, obs)] = n
+        q = self.qty[idx]
+        gt, lt = o > q, o < q
+
+        up = np.where(gt, self.up[idx] + 1, 0)
+        down = np.where(lt, self.down[idx] + 1, 0)
+        t_up = np.where(up == 1, now, self.t_up[idx])
+        t_down = np.where(down == 1, now, self.t_down[idx])
+        fire = (gt & (up >= self.add_frames) & (now - t_up >= self.add_secs)) | (
+            lt & (down >= self.remove_frames) & (now - t_down >= self.remove_secs)
+        )
+        up[fire] = down[fire] = 0
+
+        self.up[idx], self.down[idx], self.t_up[idx], self.t_down[idx] = up, down, t_up, t_down
+        self.active = idx[(o > 0) | (q > 0) | (up > 0) | (down > 0)]
+        if not fire.any():
+            return []
+        ids, delta = idx[fire], (o - q)[fire]
+        self.qty[ids] += delta
+        return [self._apply(int(i), int(d)) for i, d in zip(ids, delta)]
+
+    def _apply(self, i, delta):
+        """Mirrors a quantity change of class `i` into `self.cart` and returns the corresponding event tuple."""
+        name = self.names[i]
+        if self.qty[i] > 0:
+            self.cart[name] = int(self.qty[i])
+        else:
+            self.cart.pop(name, None)
+        return i, name, delta
+
+    def change(self, i, delta):
+        """Adjusts the quantity of class id `i` by `delta` (clamped at zero); returns the applied event tuple."""
+        delta = max(int(delta), -int(self.qty[i]))
+        self.qty[i] += delta
+        self.up[i] = self.down[i] = 0
+        if self.qty[i] > 0:
+            self.active = np.union1d(self.active, [i])  # let update() see it leave the basket
+        return self._apply(i, delta)
+
+    def restore(self, qty):
+        """Sets the cart to the per-class quantities `qty` (e.g. recovered from a CartLedger) without events."""
+        for i in np.flatnonzero(np.asarray(qty)):
+            self.change(int(i), int(qty[i]) - int(self.qty[i]))
+
+    def remove(self, name, n=1):
+        """Removes up to `n` items of `name` from the cart manually; returns the number removed."""
+        i = self.ids[name]
+        n = int(min(n, self.qty[i]))
+        if n:
+            self.qty[i] -= n
+            self.up[i] = self.down[i] = 0
+            self._apply(i, -n)
+        return n
+
+    def clear(self):
+        """Empties the cart and resets all hysteresis state, e.g. after checkout."""
+        self.qty[:] = self.up[:] = self.down[:] = 0
+        self.active = np.zeros(0, dtype=np.int64)
+        self.cart.clear()
+
+
+def benchmark(nc_list=(80, 1000, 10000), frames=5000, ndet=8, seed=0):
+    """Prints per-frame update cost of CartTracker for several catalog sizes with a fixed number of detections."""
+    rng = np.random.default_rng(seed)
+    for nc in nc_list:
+        tracker = CartTracker([f"sku{i}" for i in range(nc)], add_frames=3, remove_frames=3)
+        hot = rng.choice(nc, size=min(12, nc), replace=False)  # classes that actually appear in the basket
+        preds = []
+        for _ in range(256):
+            k = rng.integers(0, ndet + 1)
+            p = np.zeros((k, 6), dtype=np.float32)
+            p[:, :4] = rng.uniform(0, 640, (k, 4))
+            p[:, 4] = rng.uniform(0.3, 1.0, k)
+            p[:, 5] = rng.choice(hot, k)
+            preds.append(p)
+        for p in preds:  # warmup
+            tracker.update(p)
+        t = time.perf_counter()
+        for i in range(frames):
+            tracker.update(preds[i % len(preds)], now=i / 30)
+        dt = (time.perf_counter() - t) / frames
+        print(f"nc={nc:6d}  {dt * 1e6:7.1f} us/frame  ({frames} frames, <= {ndet} detections/frame)")
+
+
+def parse_opt():
+    """Parses command line arguments for the CartTracker microbenchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nc", type=int, nargs="+", default=[80, 1000, 10000], help="catalog sizes to benchmark")
+    parser.add_argument("--frames", type=int, default=5000, help="frames per catalog size")
+    parser.add_argument("--ndet", type=int, default=8, help="maximum detections per frame")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    benchmark(opt.nc, opt.frames, opt.ndet)
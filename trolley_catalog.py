@@ -0,0 +1,170 @@
+"""
+Indexed product catalog for the smart-trolley apps.
+
+Prices, deals and suggestions used to be hard-coded separately in each script, with spellings such as 'colddrink' that
+never match the model's class names. `Catalog` loads one CSV file of SKUs (columns: sku, name, price, deal,
+suggestions, aliases) and joins it to the model's class list once, into dense arrays indexed by class id. Per-frame
+lookups are then plain integer indexing such as `catalog.price[cls]` or `catalog.sold[cls]`. Names are matched after
+normalization (case, spaces, underscores) and through the aliases column. The class list can be validated against a
+dataset YAML such as data.yaml. Each app keeps its own price list in an optional `price_<app>` column: a blank cell
+uses the shared `price`, and '-' means the app does not sell that product.
+
+Usage:
+    catalog = Catalog(model.names, data="data.yaml", app="main3")  # prices from the price_main3 column
+    tracker = CartTracker(model.names, items=catalog.items)
+    amount = catalog.price[pred[:, 5].astype(int)].sum()
+
+    $ python trolley_catalog.py --data data.yaml  # check the catalog against the dataset classes
+"""
+
+import argparse
+import csv
+import logging
+from pathlib import Path
+
+import numpy as np
+
+LOGGER = logging.getLogger("smart_trolley")
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]
+CATALOG = ROOT / "catalog.csv"
+
+
+def normalize(name):
+    """Returns a canonical form of a product or class name: lowercase, single spaces, no underscores."""
+    return " ".join(str(name).lower().replace("_", " ").split())
+
+
+def load_names(data):
+    """Returns the class names list from a dataset YAML (list or {id: name} form)."""
+    import yaml
+
+    with open(data, errors="ignore") as f:
+        names = yaml.safe_load(f)["names"]
+    return [names[i] for i in range(len(names))] if isinstance(names, dict) else list(names)
+
+
+class Catalog:
+    """SKU table joined to model class ids: dense price/deal/suggestion arrays and a sold mask."""
+
+    def __init__(self, names, path=CATALOG, data=None, strict=False, app=None):
+        """
+        Loads the catalog and indexes it by class id.
+
+        Args:
+            names (dict | list): model class names, e.g. `model.names`.
+            path (str | Path): catalog CSV file.
+            data (str | Path | None): dataset YAML to validate the class names against, e.g. 'data.yaml'.
+            strict (bool): raise ValueError instead of logging warnings on validation problems.
+            app (str | None): app whose `price_<app>` column overrides the shared prices, e.g. 'main1'.
+        """
+        self.names = [names[i] for i in range(len(names))] if isinstance(names, dict) else list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.path, self.strict, self.app = Path(path), strict, app
+        nc = len(self.names)
+        self.sku = np.full(nc, -1, dtype=np.int64)  # SKU per class, -1 if not sold
+        self.price = np.zeros(nc, dtype=np.float64)  # unit price per class, 0 if not sold
+        self.deal = np.full(nc, "", dtype=object)  # deal text per class
+        self.suggestions = np.empty(nc, dtype=object)  # tuple of suggested product names per class
+        self.suggestions[:] = [()] * nc
+        self.listed = np.zeros(nc, dtype=bool)  # classes with a catalog row, even if this app does not sell them
+        self.rows = self._load()
+        index = {}  # normalized name or alias -> row
+        for row in self.rows:
+            for key in [row["name"], *row["aliases"]]:
+                index.setdefault(normalize(key), row)
+        for i, name in enumerate(self.names):
+            row = index.get(normalize(name))
+            self.listed[i] = row is not None
+            if row is not None and row["price"] is not None:
+                self.sku[i], self.price[i], self.deal[i] = row["sku"], row["price"], row["deal"]
+                self.suggestions[i] = row["suggestions"]
+        self.sold = self.sku >= 0  # classes that are products
+        if data is not None:
+            self.validate(data)
+
+    def _load(self):
+        """Reads the CSV rows into dicts with parsed fields; price is None for products the app does not sell."""
+        rows = []
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                price = (r.get(f"price_{self.app}") or "").strip() if self.app else ""
+                rows.append(
+                    {
+                        "sku": int(r["sku"]),
+                        "name": r["name"].strip(),
+                        "price": None if price == "-" else float(price or r["price"]),
+                        "deal": (r.get("deal") or "").strip(),
+                        "suggestions": tuple(s.strip() for s in (r.get("suggestions") or "").split(";") if s.strip()),
+                        "aliases": [a.strip() for a in (r.get("aliases") or "").split(";") if a.strip()],
+                    }
+                )
+        return rows
+
+    def _problem(self, msg):
+        """Raises or logs a validation problem depending on `strict`."""
+        if self.strict:
+            raise ValueError(msg)
+        LOGGER.warning(f"[Catalog] {msg}")
+
+    def validate(self, data):
+        """Checks the model names against dataset YAML `data` and that every dataset class has a SKU; returns ok."""
+        expected = load_names(data)
+        ok = True
+        if [normalize(n) for n in expected] != [normalize(n) for n in self.names]:
+            self._problem(f"model classes {self.names} do not match {data} names {expected}")
+            ok = False
+        missing = [n for n in expected if n in self.ids and not self.listed[self.ids[n]]]  # '-' rows are deliberate
+        if missing:
+            self._problem(f"classes without a SKU in {self.path.name}: {missing}")
+            ok = False
+        return ok
+
+    @property
+    def items(self):
+        """Returns the names of the classes that are products, e.g. for `CartTracker(items=...)`."""
+        return [self.names[i] for i in np.flatnonzero(self.sold)]
+
+    @property
+    def prices(self):
+        """Returns {name: price} for the classes that are products."""
+        return {self.names[i]: float(self.price[i]) for i in np.flatnonzero(self.sold)}
+
+    @property
+    def deals(self):
+        """Returns {name: deal} for the products that currently have a deal."""
+        return {self.names[i]: self.deal[i] for i in np.flatnonzero(self.sold) if self.deal[i]}
+
+    def suggest(self, name):
+        """Returns the suggestions for product `name`, () if there are none."""
+        i = self.ids.get(name)
+        return self.suggestions[i] if i is not None else ()
+
+    def __len__(self):
+        """Returns the number of SKUs in the file."""
+        return len(self.rows)
+
+
+def parse_opt():
+    """Parses command line arguments for the catalog check."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalog", type=str, default=CATALOG, help="catalog CSV")
+    parser.add_argument("--data", type=str, default=ROOT / "data.yaml", help="dataset.yaml path")
+    parser.add_argument("--app", type=str, default=None, help="use the price_<app> column, e.g. main3")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    opt = parse_opt()
+    catalog = Catalog(load_names(opt.data), opt.catalog, app=opt.app)
+    LOGGER.info(f"{len(catalog)} SKUs, {catalog.sold.sum()}/{len(catalog.names)} classes sold")
+    for name, price in catalog.prices.items():
+        LOGGER.info(f"  {name:<20} {price:>10.2f}  {catalog.deal[catalog.ids[name]]}")
+    unlisted = [n for n in catalog.names if not catalog.listed[catalog.ids[n]]]
+    if unlisted:
+        LOGGER.warning(f"classes without a SKU: {unlisted}")
+    unsold = [n for n in catalog.names if catalog.listed[catalog.ids[n]] and not catalog.sold[catalog.ids[n]]]
+    if unsold:
+        LOGGER.info(f"not sold by {opt.app}: {unsold}")
@@ -0,0 +1,152 @@
+"""
+Throttled, asynchronous emotion analysis for the smart-trolley apps.
+
+`DeepFace.analyze` on a full frame stalls the detection loop for hundreds of milliseconds, and the first call also loads
+the model. `EmotionWorker` loads DeepFace once on its own thread (at startup, or on first use with `preload=False`),
+analyzes a small face crop taken from the YOLO `person` boxes the loop already has, and exposes the latest result
+without ever blocking. Its cadence adapts to how long an analysis takes and to the system load, so it uses at most a
+fixed share of the CPU.
+
+Usage:
+    emotions = EmotionWorker().start()
+    emotions.submit(frame, person_boxes)  # cheap, ignored while not due
+    label = emotions.emotion
+"""
+
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+import psutil
+
+LOGGER = logging.getLogger("smart_trolley")
+
+
+class EmotionWorker:
+    """Background DeepFace emotion analysis on downscaled face crops with adaptive cadence."""
+
+    def __init__(self, duty=0.1, min_interval=1.0, max_interval=10.0, crop_size=160, default="neutral", preload=True):
+        """
+        Initializes the worker.
+
+        Args:
+            duty (float): target fraction of wall time spent analyzing; interval = analysis time / duty.
+            min_interval (float): minimum seconds between two analyses.
+            max_interval (float): maximum seconds between two analyses, however slow or busy the machine is.
+            crop_size (int): longest side in pixels of the face crop sent to DeepFace.
+            default (str): emotion reported until the first result arrives or when no face is found.
+            preload (bool): import DeepFace as soon as the thread starts; False defers it to the first submit().
+        """
+        self.duty, self.min_interval, self.max_interval = duty, min_interval, max_interval
+        self.crop_size = crop_size
+        self.emotion = default  # latest dominant emotion
+        self.preload = preload
+        self.ready = False  # True once DeepFace is loaded
+        self.disabled = False  # True if DeepFace failed to load
+        self.interval = min_interval  # current seconds between analyses
+        self.t_analyze = 0.0  # duration of the last analysis (s)
+        self.analyzed = self.skipped = self.errors = 0  # counters
+        self._t_next = 0.0
+        self._pending = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the worker thread, which loads DeepFace now or on first use; returns self for chaining."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="trolley-emotion", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the worker thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def due(self):
+        """Returns True if the worker is idle, loaded (or loading on demand) and the next analysis is due."""
+        loaded = self.ready or not (self.preload or self.disabled)
+        return loaded and self._pending is None and time.monotonic() >= self._t_next
+
+    def crop(self, frame, boxes=None):
+        """Returns a downscaled face crop: the head region of the largest person box, or the frame centre."""
+        h, w = frame.shape[:2]
+        boxes = np.asarray(boxes if boxes is not None else [], dtype=np.float32).reshape(-1, 4)
+        if len(boxes):
+            x1, y1, x2, y2 = boxes[np.argmax((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]))]
+            y2 = y1 + 0.4 * (y2 - y1)  # head and shoulders
+        else:
+            x1, y1, x2, y2 = 0.25 * w, 0.0, 0.75 * w, 0.6 * h
+        x1, y1 = max(int(x1), 0), max(int(y1), 0)
+        x2, y2 = min(int(x2), w), min(int(y2), h)
+        im = frame[y1:y2, x1:x2]
+        if not im.size:
+            return None
+        g = self.crop_size / max(im.shape[:2])
+        return cv2.resize(im, None, fx=g, fy=g, interpolation=cv2.INTER_AREA) if g < 1 else im.copy()
+
+    def submit(self, frame, boxes=None):
+        """Queues a crop of `frame` for analysis if one is due; returns True if queued. Never blocks."""
+        if not self.due():
+            self.skipped += 1
+            return False
+        im = self.crop(frame, boxes)
+        if im is None:
+            return False
+        with self._cond:
+            self._pending = im
+            self._cond.notify()
+        return True
+
+    def _load(self):
+        """Imports DeepFace and runs one warm-up analysis so the model is resident."""
+        from deepface import DeepFace
+
+        DeepFace.analyze(np.zeros((48, 48, 3), dtype=np.uint8), actions=["emotion"], enforce_detection=False)
+        return DeepFace
+
+    def _next_interval(self):
+        """Returns the seconds to wait before the next analysis given its cost and the current system load."""
+        interval = self.t_analyze / self.duty
+        load = psutil.cpu_percent() / 100  # system-wide CPU use since the previous call, also works on Windows
+        interval *= max(1.0, load / 0.7)  # back off when the CPU is saturated
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _run(self):
+        """Worker loop: loads DeepFace, then analyzes pending crops one at a time."""
+        if not self.preload:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self._running)
+                if not self._running:
+                    return
+        t = time.perf_counter()
+        try:
+            deepface = self._load()
+        except Exception as e:
+            LOGGER.warning(f"[Emotion] DeepFace unavailable, emotion analysis disabled: {e}")
+            self.disabled, self._pending = True, None
+            return
+        LOGGER.info(f"[Emotion] DeepFace loaded in {time.perf_counter() - t:.1f}s")
+        self.ready = True
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self._running)
+                if not self._running:
+                    break
+                im = self._pending
+            t = time.perf_counter()
+            try:
+                result = deepface.analyze(im, actions=["emotion"], enforce_detection=False)
+                self.emotion = result[0]["dominant_emotion"]
+                self.analyzed += 1
+            except Exception:
+                self.errors += 1
+            self.t_analyze = time.perf_counter() - t
+            self.interval = self._next_interval()
+            self._t_next = time.monotonic() + self.interval
+            with self._cond:
+                self._pending = None
@@ -0,0 +1,249 @@
+"""
+Multi-camera smart-trolley detection: one batched forward pass for N cameras and one fused cart.
+
+A trolley with a top and a side camera would otherwise need one full detection loop per camera: N sequential model
+calls and N carts that double-count every item both cameras see. `MultiCameraDetector` stacks the newest frame of every
+camera into a single AutoShape batch, which letterboxes and infers all of them in one forward pass.
+
+Boxes of different cameras live in different pixel spaces, so they are only merged when calibrated. With per-camera
+homographies into the reference camera's image, `CameraFusion` projects every box there and keeps each object seen by
+several cameras once (cross-camera NMS), for the usual TrackedCart. Without calibration, `MultiViewCart` tracks and
+counts objects per camera in that camera's own pixels and fuses only the counts: the cart holds, per class, the most
+objects any camera has counted in its basket region.
+
+Usage:
+    caps = [LatestFrameCapture(s).start() for s in ([IP_CAM_URL, 0], [1])]
+    detector = MultiCameraDetector(model, caps)
+    frames, preds = detector()  # newest frames and their (n, 6) predictions, None/empty for stale cameras
+
+    tracker = MultiViewCart(CartTracker(model.names, items=catalog.items), len(caps))  # uncalibrated
+    events = tracker.update([p if f is not None else None for f, p in zip(frames, preds)])
+
+    fusion = CameraFusion(len(caps), [np.eye(3), H_side_to_top])  # calibrated
+    events = TrackedCart(CartTracker(model.names, items=catalog.items)).update(fusion(preds))
+"""
+
+import time
+
+import numpy as np
+
+from trolley_cart import to_numpy
+from trolley_metrics import REGISTRY
+from trolley_tracker import BasketCounter, ObjectTracker, box_iou
+
+
+def project_boxes(boxes, H):
+    """Returns the axis-aligned (n, 4) xyxy bounds of `boxes` after mapping their corners through homography H."""
+    x1, y1, x2, y2 = boxes.T
+    corners = np.stack([np.stack([x1, y1]), np.stack([x2, y1]), np.stack([x2, y2]), np.stack([x1, y2])])  # (4, 2, n)
+    pts = np.concatenate([corners, np.ones((4, 1, len(boxes)))], 1)  # homogeneous (4, 3, n)
+    p = np.einsum("ij,kjn->kin", H, pts)
+    xy = p[:, :2] / p[:, 2:3]
+    return np.concatenate([xy.min(0), xy.max(0)]).T
+
+
+class CameraFusion:
+    """Merges per-camera (n, 6) predictions into one de-duplicated array in the reference camera's pixels."""
+
+    def __init__(self, cameras, homographies=None, iou_thres=0.3, conf=0.25):
+        """
+        Initializes the fusion.
+
+        Args:
+            cameras (int): number of cameras.
+            homographies (list | None): per-camera 3x3 arrays mapping image pixels into the reference camera's image
+                (identity for the reference). Required for more than one camera; use MultiViewCart without them.
+            iou_thres (float): IoU of projected same-class boxes of different cameras above which they are one object.
+            conf (float): detections below this confidence are dropped before fusion.
+        """
+        if homographies is None and cameras > 1:
+            raise ValueError("CameraFusion needs homographies to merge boxes of several cameras, use MultiViewCart")
+        self.cameras, self.iou_thres, self.conf = cameras, iou_thres, conf
+        self.H = None if homographies is None else np.asarray(homographies, dtype=np.float64).reshape(cameras, 3, 3)
+        self.frames = self.duplicates = 0  # counters
+        self.source = np.zeros(0, dtype=np.int64)  # camera index of each fused detection of the last frame
+
+    def __call__(self, preds):
+        """Returns the fused (n, 6) xyxy, conf, cls predictions for one list of per-camera predictions."""
+        preds = [np.zeros((0, 6)) if p is None else np.asarray(p, dtype=np.float64).reshape(-1, 6) for p in preds]
+        cam = np.concatenate([np.full(len(p), i) for i, p in enumerate(preds)]).astype(np.int64)
+        p = np.concatenate(preds)
+        keep = p[:, 4] >= self.conf
+        p, cam = p[keep], cam[keep]
+        self.frames += 1
+        if self.cameras > 1 and len(p):
+            keep = self._nms(p, cam)
+            self.duplicates += int(len(p) - keep.sum())
+            p, cam = p[keep], cam[keep]
+        self.source = cam
+        return p
+
+    def _nms(self, p, cam):
+        """Projects boxes into the reference camera and suppresses same-class boxes of other cameras, one-to-one."""
+        boxes = p[:, :4].copy()
+        for i in range(self.cameras):
+            m = cam == i
+            if m.any():
+                boxes[m] = project_boxes(boxes[m], self.H[i])
+        p[:, :4] = boxes
+        order = np.argsort(-p[:, 4], kind="stable")
+        iou = box_iou(boxes, boxes)
+        iou[p[:, 5][:, None] != p[:, 5][None]] = 0  # same class only
+        iou[cam[:, None] == cam[None]] = 0  # one camera never sees the same object twice
+        keep, done = np.zeros(len(p), dtype=bool), np.zeros(len(p), dtype=bool)
+        for i in order:
+            if done[i]:
+                continue
+            keep[i] = done[i] = True
+            for k in range(self.cameras):  # absorb the best-matching detection of every other camera
+                j = np.flatnonzero((cam == k) & ~done & (iou[i] > self.iou_thres))
+                if len(j):
+                    done[j[iou[i, j].argmax()]] = True
+        return keep
+
+    def as_dict(self):
+        """Returns the fusion counters as a plain dict."""
+        return {"cameras": self.cameras, "frames": self.frames, "duplicates": self.duplicates}
+
+
+class MultiViewCart:
+    """Drop-in replacement for TrackedCart over uncalibrated cameras: per-camera tracking, per-class fused counts."""
+
+    def __init__(self, base, cameras, regions=None, exit_frames=15, **kwargs):
+        """
+        Initializes one tracker and basket counter per camera.
+
+        Args:
+            base (CartTracker): cart whose quantities follow the fused counts.
+            cameras (int): number of cameras.
+            regions (list | None): per-camera basket area as xyxy in that camera's pixels, None entries count anywhere.
+            exit_frames (int): consecutive frames a counted object must be seen outside its region to be removed.
+            kwargs: ObjectTracker arguments shared by all cameras.
+        """
+        regions = [None] * cameras if regions is None else list(regions)
+        self.base, self.cameras = base, cameras
+        self.objects = [ObjectTracker(**{"high_thres": base.conf, **kwargs}) for _ in range(cameras)]
+        self.counters = [BasketCounter(r, exit_frames) for r in regions]
+        self.counted = np.zeros((cameras, len(base.tracked)), dtype=np.int64)  # objects in each camera's basket
+        self.fused = np.zeros(len(base.tracked), dtype=np.int64)  # per-class max over cameras, last step
+        self.views = [np.zeros((0, 7))] * cameras  # confirmed tracks per camera, in that camera's pixels
+
+    @property
+    def cart(self):
+        """Returns the live name -> qty dict of the wrapped CartTracker."""
+        return self.base.cart
+
+    @property
+    def ids(self):
+        """Returns the name -> class id mapping of the wrapped CartTracker."""
+        return self.base.ids
+
+    @property
+    def tracks(self):
+        """Returns the confirmed tracks of all cameras as one (k, 7) array, e.g. for CartLedger.apply()."""
+        return np.concatenate(self.views)
+
+    def update(self, preds, now=None):
+        """
+        Tracks one step of per-camera predictions and returns (class_id, name, delta) cart events like CartTracker.
+
+        `preds` holds one (n, 6) array per camera; None marks a stale camera, whose tracks and counts are kept as they
+        are rather than treated as an empty view.
+        """
+        for i, pred in enumerate(preds):
+            if pred is None:
+                continue
+            p = to_numpy(pred)
+            c = p[:, 5].astype(np.int64)
+            p = p[(c >= 0) & (c < len(self.base.tracked))]
+            p = p[self.base.tracked[p[:, 5].astype(np.int64)]]  # only catalog items
+            self.views[i] = self.objects[i].update(p)
+            for _, c, d in self.counters[i].update(self.views[i], self.objects[i].removed):
+                self.counted[i, c] = max(self.counted[i, c] + d, 0)
+        fused = self.counted.max(0)
+        delta, self.fused = fused - self.fused, fused
+        return [self.base.change(int(c), int(delta[c])) for c in np.flatnonzero(delta)]
+
+    def restore(self, qty):
+        """Puts recovered quantities back in the cart; camera 0 adopts matching objects instead of re-adding them."""
+        self.base.restore(qty)
+        self.counted[:] = 0
+        self.counted[0] = self.fused = np.asarray(qty, dtype=np.int64)
+        self.counters[0].adopt = {int(i): int(qty[i]) for i in np.flatnonzero(qty)}
+
+    def clear(self):
+        """Empties the cart without re-adding the objects that are currently in view of any camera."""
+        self.base.clear()
+        self.counted[:] = self.fused[:] = 0
+        for counter, tracks in zip(self.counters, self.views):
+            counter.reset(tracks)
+
+
+class MultiCameraDetector:
+    """Reads the newest frame of every camera and runs them through the model as one batch."""
+
+    def __init__(self, model, caps, size=640, max_age=1.0, timeout=1.0):
+        """
+        Initializes the detector.
+
+        Args:
+            model: YOLOv5 AutoShape model or InferenceClient; called once per step with a list of frames.
+            caps (list): LatestFrameCapture-like readers, one per camera; caps[0] paces the loop.
+            size (int): inference size.
+            max_age (float): seconds after which a camera's latest frame is stale and left out of the batch.
+            timeout (float): seconds to wait for a new frame from caps[0].
+        """
+        self.model, self.caps, self.size, self.max_age, self.timeout = model, list(caps), size, max_age, timeout
+        self.batches = self.stale = self.reused = 0  # counters
+        self.t_infer = 0.0  # seconds of the last batched forward pass
+        self._index = [0] * len(self.caps)  # frame number of each camera's last inferred frame
+        self._preds = [np.zeros((0, 6), dtype=np.float32) for _ in self.caps]  # and its predictions
+
+    def read(self):
+        """Returns the newest frame of each camera, None for stale ones; all None if caps[0] produced no new frame."""
+        ok, frame = self.caps[0].read(self.timeout)
+        if not ok:
+            return [None] * len(self.caps)
+        frames, self._latest = [frame], [self.caps[0].index]
+        for cap in self.caps[1:]:
+            self._latest.append(cap.index)  # before the frame: a race can only cause one extra inference
+            fresh = cap.frame_age <= self.max_age
+            self.stale += not fresh
+            frames.append(cap.frame if fresh else None)
+        return frames
+
+    def __call__(self):
+        """Returns (frames, preds): newest frames and per-camera (n, 6) numpy predictions, batched in one call."""
+        with REGISTRY.time("capture"):
+            frames = self.read()
+        if frames[0] is None:
+            return frames, [np.zeros((0, 6), dtype=np.float32) for _ in frames]
+        # Only frames that changed since the last step are inferred, slower cameras reuse their last predictions
+        index = self._latest
+        new = [i for i, f in enumerate(frames) if f is not None and (i == 0 or index[i] != self._index[i])]
+        self.reused += sum(f is not None for f in frames) - len(new)
+        t = time.perf_counter()
+        results = self.model([frames[i] for i in new], size=self.size)
+        self.t_infer = time.perf_counter() - t
+        self.batches += 1
+        REGISTRY.stage("inference").observe(self.t_infer)
+        REGISTRY.observe_detections(results)
+        for i, p in zip(new, results.pred):
+            self._index[i], self._preds[i] = index[i], p.cpu().numpy() if hasattr(p, "cpu") else np.asarray(p)
+        preds = [p if f is not None else np.zeros((0, 6), dtype=np.float32) for f, p in zip(frames, self._preds)]
+        return frames, preds
+
+    def release(self):
+        """Releases all cameras."""
+        for cap in self.caps:
+            cap.release()
+
+    def as_dict(self):
+        """Returns the detector counters as a plain dict."""
+        return {
+            "batches": self.batches,
+            "stale": self.stale,
+            "reused": self.reused,
+            "infer_ms": round(self.t_infer * 1e3, 1),
+            "cameras": [cap.as_dict() for cap in self.caps],
+        }
@@ -0,0 +1,237 @@
+"""
+Event-sourced, crash-safe cart ledger for the smart-trolley apps.
+
+The cart dict only lives in memory, so a crash loses the basket, and the totals are re-summed over the price table
+every frame. `CartLedger` appends every cart change to a log of fixed-width binary records: add, remove or checkout,
+plus timestamp, class id, quantity delta, track id, confidence and the unit price at that moment. Quantities and the
+total are updated incrementally as each event is recorded. On restart, the records since the last checkout are
+replayed in one vectorized pass, so recovery is instant however long the log is. Records store class ids, so the header
+carries a hash of the model's class names and a ledger written for another model is refused rather than replayed.
+
+Usage:
+    ledger = CartLedger(ledger_path(__file__), model.names, prices)  # main3.py -> main3.ledger next to the script
+    ledger.restore(tracker)  # put the recovered basket back into the CartTracker
+    ledger.apply(tracker.update(pred), pred)
+    ledger.total, ledger.cart
+    receipt = ledger.checkout()
+
+    $ python trolley_ledger.py cart.ledger  # print the log
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+LOGGER = logging.getLogger("smart_trolley")
+
+ROOT = Path(__file__).resolve().parents[0]  # repository root, default ledger directory
+
+ADD, REMOVE, CHECKOUT, VOID = 1, 2, 3, 4
+OPS = {ADD: "add", REMOVE: "remove", CHECKOUT: "checkout", VOID: "void"}
+MAGIC = b"TROLLEDG\x02\x00\x00\x00"  # file signature and format version, 12 bytes
+RECORD = np.dtype(
+    [
+        ("t", "<f8"),  # wall-clock time (s)
+        ("op", "u1"),  # ADD, REMOVE, CHECKOUT or VOID
+        ("_", "u1"),  # reserved
+        ("cls", "<u2"),  # class id
+        ("delta", "<i4"),  # quantity change (0 for checkout)
+        ("track", "<i4"),  # track id, -1 if unknown
+        ("conf", "<f4"),  # detection confidence, 0 if unknown
+        ("price", "<f8"),  # unit price when recorded
+    ]
+)  # 32 bytes per record
+HEADER = len(MAGIC) + 4 + 8  # signature + record size + class names hash
+
+
+def names_hash(names):
+    """Returns the 8-byte digest of the ordered class names that record class ids refer to."""
+    return hashlib.blake2b("\n".join(map(str, names)).encode(), digest_size=8).digest()
+
+
+def ledger_path(app):
+    """Returns the ledger file of app script `app`, e.g. main3.py -> <repo>/main3.ledger, so apps never share one."""
+    return ROOT / f"{Path(app).stem}.ledger"
+
+
+class CartLedger:
+    """Append-only binary event log of cart changes with incrementally maintained quantities and total."""
+
+    def __init__(self, path=None, names=(), prices=None, fsync=False):
+        """
+        Opens the ledger at `path`, creating it if needed, and recovers the basket since the last checkout.
+
+        Args:
+            path (str | Path | None): log file; None keeps the ledger in memory only.
+            names (dict | list): model class names, e.g. `model.names`.
+            prices (dict | np.ndarray | None): name -> unit price, or a per-class price array such as `Catalog.price`.
+            fsync (bool): fsync after every record, surviving power loss rather than just a process crash.
+        """
+        self.names = [names[i] for i in range(len(names))] if isinstance(names, dict) else list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        if isinstance(prices, np.ndarray):
+            self.price = prices.astype(np.float64)
+        else:
+            self.price = np.array([float((prices or {}).get(n, 0)) for n in self.names], dtype=np.float64)
+        self.qty = np.zeros(len(self.names), dtype=np.int64)
+        self.cart = {}  # name -> qty, kept in sync incrementally
+        self.total = 0.0
+        self.recorded = self.checkouts = 0  # counters
+        self.path, self.fsync, self._fd = path and Path(path), fsync, None
+        if self.path is not None:
+            self._open()
+
+    def _open(self):
+        """Opens the log for appending, validating or writing its header, and replays the open basket."""
+        new = not self.path.exists() or self.path.stat().st_size < HEADER
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+        if new:
+            os.ftruncate(self._fd, 0)
+            os.write(self._fd, MAGIC + np.uint32(RECORD.itemsize).tobytes() + names_hash(self.names))
+            return
+        with open(self.path, "rb") as f:
+            head = f.read(HEADER)
+        itemsize = int(np.frombuffer(head[len(MAGIC) : len(MAGIC) + 4], "<u4")[0])
+        if head[: len(MAGIC)] != MAGIC or itemsize != RECORD.itemsize:
+            self.close()
+            raise ValueError(f"{self.path} is not a cart ledger of this version")
+        if head[HEADER - 8 :] != names_hash(self.names):
+            self.close()
+            raise ValueError(f"{self.path} was written for a model with other class names, use another ledger path")
+        size = self.path.stat().st_size
+        torn = (size - HEADER) % RECORD.itemsize
+        if torn:  # partial record from a crash mid-write
+            LOGGER.warning(f"[Ledger] dropping {torn} bytes of a torn record in {self.path}")
+            os.ftruncate(self._fd, size - torn)
+        t = time.perf_counter()
+        self._replay(self.read(self.path))
+        LOGGER.info(f"[Ledger] recovered {self.qty.sum()} items in {(time.perf_counter() - t) * 1e3:.1f}ms")
+
+    @staticmethod
+    def read(path):
+        """Returns all complete records of the log at `path` as a memory-mapped structured array."""
+        n = (Path(path).stat().st_size - HEADER) // RECORD.itemsize
+        if n <= 0:
+            return np.zeros(0, RECORD)
+        return np.memmap(path, RECORD, mode="r", offset=HEADER, shape=(n,))
+
+    def _replay(self, records):
+        """Rebuilds quantities and total from the records after the last checkout or void."""
+        self.checkouts = int((records["op"] == CHECKOUT).sum())
+        ends = np.flatnonzero(records["op"] >= CHECKOUT)
+        r = records[ends[-1] + 1 :] if len(ends) else records
+        r = r[r["cls"] < len(self.qty)]
+        np.add.at(self.qty, r["cls"], r["delta"])
+        np.maximum(self.qty, 0, out=self.qty)
+        self.total = float(self.qty @ self.price)
+        self.cart.update({self.names[i]: int(self.qty[i]) for i in np.flatnonzero(self.qty)})
+
+    def _append(self, op, cls=0, delta=0, track=-1, conf=0.0, t=None):
+        """Writes one record with a single append so a crash never leaves a half-updated file behind."""
+        rec = np.zeros(1, RECORD)
+        rec[0] = (time.time() if t is None else t, op, 0, cls, delta, track, conf, self.price[cls] if delta else 0)
+        if self._fd is not None:
+            os.write(self._fd, rec.tobytes())
+            if self.fsync:
+                os.fsync(self._fd)
+        self.recorded += 1
+
+    def record(self, cls, delta, track=-1, conf=0.0, t=None):
+        """Logs a quantity change of class id `cls` and updates cart and total; returns the applied delta."""
+        delta = max(int(delta), -int(self.qty[cls]))
+        if not delta:
+            return 0
+        self._append(ADD if delta > 0 else REMOVE, cls, delta, track, conf, t)
+        self.qty[cls] += delta
+        self.total += delta * self.price[cls]
+        name = self.names[cls]
+        if self.qty[cls]:
+            self.cart[name] = int(self.qty[cls])
+        else:
+            self.cart.pop(name, None)
+        return delta
+
+    def apply(self, events, dets=None):
+        """
+        Logs (class_id, name, delta) events from CartTracker/TrackedCart.update(); returns the events.
+
+        `dets` is the frame's (n, 6) predictions or (k, 7) tracks, used to attach the best confidence and, for tracks,
+        the track id of each event's class.
+        """
+        d = None if dets is None else np.asarray(dets.cpu() if hasattr(dets, "cpu") else dets, dtype=np.float64)
+        for cls, _, delta in events:
+            track, conf = -1, 0.0
+            if d is not None and len(d):
+                m = d[d[:, -1] == cls]
+                if len(m):
+                    best = m[m[:, -2].argmax()]
+                    conf, track = best[-2], int(best[4]) if d.shape[1] == 7 else -1
+            self.record(cls, delta, track, conf)
+        return events
+
+    def restore(self, tracker):
+        """Seeds a CartTracker or TrackedCart with the recovered quantities."""
+        tracker.restore(self.qty)
+
+    def lines(self):
+        """Returns [(name, qty, unit_price, amount)] for the current basket."""
+        prices = ((n, q, float(self.price[self.ids[n]])) for n, q in self.cart.items())
+        return [(n, q, p, q * p) for n, q, p in prices]
+
+    def checkout(self):
+        """Logs a checkout, empties the basket and returns its receipt as (lines, total)."""
+        receipt = self.lines(), self.total
+        self._append(CHECKOUT)
+        self._empty()
+        self.checkouts += 1
+        return receipt
+
+    def void(self):
+        """Logs that the basket was emptied without a sale, e.g. a manual cart reset."""
+        self._append(VOID)
+        self._empty()
+
+    def _empty(self):
+        """Resets quantities, cart and total."""
+        self.qty[:] = 0
+        self.cart.clear()
+        self.total = 0.0
+
+    def close(self):
+        """Closes the log file."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def as_dict(self):
+        """Returns the ledger state as a plain dict."""
+        return {"items": int(self.qty.sum()), "total": round(self.total, 2), "recorded": self.recorded}
+
+
+def dump(path, names=None):
+    """Prints every record of the log at `path`."""
+    for r in CartLedger.read(path):
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["t"]))
+        if r["op"] >= CHECKOUT:
+            print(f"{when}  {OPS[r['op']]}")
+            continue
+        name = names[r["cls"]] if names else int(r["cls"])
+        item = f"{name} x{abs(r['delta'])} @ {r['price']:.2f}"
+        print(f"{when}  {OPS[r['op']]:<6} {item} track={r['track']} conf={r['conf']:.2f}")
+
+
+def parse_opt():
+    """Parses command line arguments for the ledger dump."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=str, help="ledger file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    dump(opt.path)
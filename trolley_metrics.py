@@ -0,0 +1,325 @@
+"""
+Lightweight runtime metrics for the smart-trolley apps: counters, gauges and fixed-bucket latency histograms.
+
+A frame-to-frame FPS print cannot tell whether a slow trolley is waiting on the camera, the model, the cart logic, the
+speech engine or the UI. Every stage records into the process-wide `REGISTRY`. Counters and gauges are a float under a
+lock, and a histogram observation is one `bisect` into fixed buckets, so recording is cheap enough for every frame.
+`REGISTRY.render()` returns the Prometheus text exposition format. `start_exporter()` serves it over HTTP
+(`/metrics`) for a Prometheus scrape, or appends periodic JSON snapshots to a size-rotated log file.
+
+Usage:
+    from trolley_metrics import REGISTRY, start_exporter
+
+    start_exporter()  # TROLLEY_METRICS=9108 serves http://localhost:9108/metrics, =metrics.log writes a rotating file
+    start_exporter("0.0.0.0:9108")  # opt-in: serve to other hosts, e.g. a Prometheus server on the network
+    with REGISTRY.time("cart"):
+        events = tracker.update(pred)
+    REGISTRY.observe_detections(results)  # pre-process / inference / NMS times from Detections.t
+    REGISTRY.counter("trolley_cart_events_total", "Cart add/remove events").inc(len(events))
+
+    $ curl -s localhost:9108/metrics | grep trolley_stage_seconds
+"""
+
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOGGER = logging.getLogger("smart_trolley")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # seconds
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(self):
+        """Initializes the counter at zero."""
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1.0):
+        """Adds `n` (>= 0)."""
+        with self._lock:
+            self.value += n
+
+    def samples(self, name, labels):
+        """Returns the exposition lines of this counter."""
+        return [f"{name}{_labels(labels)} {self.value:g}"]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. a queue depth or a frame age."""
+
+    kind = "gauge"
+
+    def set(self, value):
+        """Sets the gauge to `value`."""
+        self.value = float(value)
+
+    def dec(self, n=1.0):
+        """Subtracts `n`."""
+        self.inc(-n)
+
+
+class Histogram:
+    """Distribution of observations over fixed cumulative buckets, e.g. stage latencies in seconds."""
+
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """Initializes empty buckets with the given sorted upper bounds; +Inf is implicit."""
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # per bucket, last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Records one observation."""
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket containing quantile `q`, inf if it is beyond the last bucket."""
+        if not self.count:
+            return 0.0
+        rank, acc = q * self.count, 0
+        for le, n in zip(self.buckets + (float("inf"),), self.counts):
+            acc += n
+            if acc >= rank:
+                return le
+        return float("inf")
+
+    def samples(self, name, labels):
+        """Returns the exposition lines of this histogram: cumulative buckets, sum and count."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines, acc = [], 0
+        for le, n in zip(self.buckets + (float("inf"),), counts):
+            acc += n
+            le = "+Inf" if le == float("inf") else f"{le:g}"
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {acc}")
+        lines += [f"{name}_sum{_labels(labels)} {total:g}", f"{name}_count{_labels(labels)} {count}"]
+        return lines
+
+
+def _labels(labels):
+    """Returns a Prometheus label set such as {stage="inference"}, or '' without labels."""
+    if not labels:
+        return ""
+    escape = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+    return "{" + ",".join(f'{k}="{str(v).translate(escape)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Named, labelled metrics created on first use and rendered together."""
+
+    def __init__(self, prefix=""):
+        """Initializes an empty registry; `prefix` is prepended to every metric name."""
+        self.prefix = prefix
+        self._metrics = {}  # name -> (kind, help, {labels tuple: metric})
+        self._collectors = []  # callables run before each render, e.g. to sample queue depths into gauges
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        """Returns the metric `name` with `labels`, creating it on first use."""
+        name = self.prefix + name
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            kind, _, series = self._metrics.setdefault(name, (cls.kind, help, {}))
+            if kind != cls.kind:
+                raise ValueError(f"metric '{name}' is a {kind}, not a {cls.kind}")
+            m = series.get(key)
+            if m is None:
+                m = series[key] = cls(**kwargs)
+        return m
+
+    def counter(self, name, help="", **labels):
+        """Returns the Counter `name` with `labels`."""
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", **labels):
+        """Returns the Gauge `name` with `labels`."""
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS, **labels):
+        """Returns the Histogram `name` with `labels`; `buckets` only applies when it is created."""
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def stage(self, stage):
+        """Returns the latency histogram of pipeline stage `stage`, e.g. 'capture', 'inference', 'cart', 'render'."""
+        return self.histogram("trolley_stage_seconds", "Per-stage processing time", stage=stage)
+
+    @contextmanager
+    def time(self, stage):
+        """Context manager observing the duration of its body into the `stage` latency histogram."""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage(stage).observe(time.perf_counter() - t)
+
+    def observe_detections(self, results):
+        """Records the pre-process, inference and NMS times (ms per image) of a Detections object."""
+        t = getattr(results, "t", None)
+        if t is None or len(t) < 3:
+            return
+        for phase, ms in zip(("preprocess", "inference", "nms"), t):
+            self.histogram("trolley_model_seconds", "Per-image YOLOv5 time by phase", phase=phase).observe(ms / 1e3)
+
+    def collector(self, fn):
+        """Registers `fn()` to run before every render; returns `fn` so it can be used as a decorator."""
+        self._collectors.append(fn)
+        return fn
+
+    def collect(self):
+        """Runs the registered collectors, logging rather than raising their errors."""
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception as e:
+                LOGGER.warning(f"[Metrics] collector {getattr(fn, '__name__', fn)} failed: {e}")
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        self.collect()
+        lines = []
+        with self._lock:
+            metrics = [(name, kind, help, list(series.items())) for name, (kind, help, series) in self._metrics.items()]
+        for name, kind, help, series in sorted(metrics):
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, m in series:
+                lines += m.samples(name, dict(key))
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        """Returns a JSON-friendly snapshot: values for counters/gauges, count/sum/p50/p95 for histograms."""
+        self.collect()
+        d = {}
+        with self._lock:
+            metrics = [(name, list(series.items())) for name, (_, _, series) in self._metrics.items()]
+        for name, series in metrics:
+            for key, m in series:
+                k = name + _labels(dict(key))
+                if isinstance(m, Histogram):
+                    p50, p95 = m.quantile(0.5), m.quantile(0.95)
+                    d[k] = {"count": m.count, "sum": round(m.sum, 6), "p50": p50, "p95": p95}
+                else:
+                    d[k] = m.value
+        return d
+
+
+REGISTRY = MetricsRegistry()  # process-wide default registry
+
+
+class MetricsServer:
+    """Serves a registry at http://<host>:<port>/metrics in Prometheus text format on a daemon thread."""
+
+    def __init__(self, registry=REGISTRY, port=9108, host="localhost"):
+        """Initializes the server; nothing listens until `start()`. host='0.0.0.0' allows remote scrapes."""
+        self.registry, self.address = registry, (host, port)
+        self.scrapes = 0  # counter
+        self._httpd = None
+
+    def start(self):
+        """Binds the port and starts serving; returns self for chaining."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = server.registry.render().encode()
+                server.scrapes += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # no per-scrape stderr lines
+
+        self._httpd = ThreadingHTTPServer(self.address, Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="trolley-metrics", daemon=True).start()
+        LOGGER.info(f"[Metrics] serving http://{self.address[0]}:{self._httpd.server_port}/metrics")
+        return self
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+
+class MetricsFile:
+    """Appends a JSON snapshot of a registry every `interval` seconds to a size-rotated file."""
+
+    def __init__(self, path="metrics.log", registry=REGISTRY, interval=10.0, max_bytes=5 << 20, backups=3):
+        """Initializes the writer; `max_bytes` and `backups` control rotation like RotatingFileHandler."""
+        self.registry, self.interval = registry, interval
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        self.written = 0  # counter
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        """Writes one snapshot line now."""
+        line = json.dumps({"t": round(time.time(), 3), **self.registry.as_dict()})
+        self.handler.emit(logging.makeLogRecord({"msg": line, "levelno": logging.INFO, "levelname": "INFO"}))
+        self.written += 1
+
+    def start(self):
+        """Starts the writer thread; returns self for chaining."""
+        self._thread = threading.Thread(target=self._run, name="trolley-metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        """Writer loop."""
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        """Writes a final snapshot and closes the file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+        self.write()
+        self.handler.close()
+
+
+def start_exporter(spec=None, registry=REGISTRY):
+    """
+    Starts the exporter selected by `spec` or the TROLLEY_METRICS environment variable.
+
+    A port number (e.g. '9108') starts a MetricsServer on localhost, 'host:port' (e.g. '0.0.0.0:9108') one on that
+    interface, and anything else is used as the MetricsFile path. Returns the started exporter, or None if metrics
+    export is not configured or the exporter could not start.
+    """
+    spec = os.getenv("TROLLEY_METRICS", "") if spec is None else str(spec)
+    if not spec:
+        return None
+    host, _, port = spec.rpartition(":")
+    try:
+        if port.isdigit():
+            return MetricsServer(registry, int(port), host or "localhost").start()
+        return MetricsFile(spec, registry).start()
+    except OSError as e:
+        LOGGER.warning(f"[Metrics] exporter '{spec}' unavailable: {e}")
+        return None
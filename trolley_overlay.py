@@ -0,0 +1,107 @@
+"""
+Low-overhead OpenCV overlay drawing for the smart-trolley camera windows, with a headless mode.
+
+Shading the cart header by copying the whole frame and alpha-blending all 1280x720 pixels with `cv2.addWeighted`, and
+rasterizing every cart line with `cv2.putText` each frame, costs far more than the pixels that actually change.
+`FrameOverlay` blends only the header rows in place and blits text from a cache of pre-rendered sprites keyed by
+(text, scale, thickness), so unchanged cart lines cost one masked copy. When no display is attached (or
+TROLLEY_HEADLESS=1), `headless` is True and callers skip drawing and windows entirely.
+
+Usage:
+    overlay = FrameOverlay()
+    if not overlay.headless:
+        overlay.shade(frame, 0, 160)
+        overlay.text(frame, "Total: 120", (10, 30), 0.8, (0, 255, 255), 2)
+    key = overlay.show("Smart Trolley", frame)
+"""
+
+import os
+import sys
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def has_display():
+    """Returns True if windows can be shown: TROLLEY_HEADLESS unset and, on Linux, an X11/Wayland display present."""
+    if os.getenv("TROLLEY_HEADLESS", "0").lower() not in ("0", "", "false"):
+        return False
+    if sys.platform.startswith("linux"):
+        return bool(os.getenv("DISPLAY") or os.getenv("WAYLAND_DISPLAY"))
+    return True
+
+
+class FrameOverlay:
+    """In-place header shading and cached text sprites for BGR frames; a no-op when headless."""
+
+    def __init__(self, alpha=0.85, bg=(30, 30, 30), font=cv2.FONT_HERSHEY_SIMPLEX, headless=None, maxsize=256):
+        """
+        Initializes the compositor.
+
+        Args:
+            alpha (float): opacity of the shaded header background.
+            bg (tuple): BGR colour of the header background.
+            font (int): OpenCV Hershey font for all text.
+            headless (bool | None): skip all drawing and windows; None detects it with `has_display()`.
+            maxsize (int): text sprites kept in the LRU cache.
+        """
+        self.alpha, self.bg, self.font, self.maxsize = alpha, tuple(bg), font, maxsize
+        self.headless = not has_display() if headless is None else headless
+        self.hits = self.misses = 0  # sprite cache counters
+        self._sprites = OrderedDict()  # (text, scale, thickness) -> (mask, ascent, pad)
+        self._blocks = {}  # roi shape -> solid background block
+
+    def shade(self, frame, y0, y1, x0=0, x1=None):
+        """Blends the background colour over frame[y0:y1, x0:x1] in place; other pixels are untouched."""
+        if self.headless:
+            return frame
+        roi = frame[y0:y1, x0:x1]
+        if not roi.size:
+            return frame
+        block = self._blocks.get(roi.shape)
+        if block is None:
+            block = self._blocks[roi.shape] = np.full(roi.shape, self.bg, dtype=roi.dtype)
+        if roi.flags.c_contiguous:  # full-width rows: OpenCV writes straight into the frame
+            cv2.addWeighted(roi, 1 - self.alpha, block, self.alpha, 0, dst=roi)
+        else:
+            roi[:] = cv2.addWeighted(roi, 1 - self.alpha, block, self.alpha, 0)
+        return frame
+
+    def _sprite(self, text, scale, thickness):
+        """Returns the cached (mask, ascent, pad) for `text`, rasterizing it once on a miss."""
+        key = (text, scale, thickness)
+        s = self._sprites.get(key)
+        if s is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return s
+        self.misses += 1
+        (w, h), baseline = cv2.getTextSize(text, self.font, scale, thickness)
+        pad = thickness
+        mask = np.zeros((h + baseline + 2 * pad, w + 2 * pad), dtype=np.uint8)
+        cv2.putText(mask, text, (pad, h + pad), self.font, scale, 255, thickness)
+        s = self._sprites[key] = mask.astype(bool), h + pad, pad
+        if len(self._sprites) > self.maxsize:
+            self._sprites.popitem(last=False)
+        return s
+
+    def text(self, frame, text, org, scale=0.7, color=(255, 255, 255), thickness=2):
+        """Draws `text` with its baseline-left corner at `org`, like cv2.putText, from a cached sprite."""
+        if self.headless or not text:
+            return frame
+        mask, ascent, pad = self._sprite(text, scale, thickness)
+        x, y = int(org[0]) - pad, int(org[1]) - ascent
+        h, w = frame.shape[:2]
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + mask.shape[1], w), min(y + mask.shape[0], h)
+        if x0 < x1 and y0 < y1:
+            m = mask[y0 - y : y1 - y, x0 - x : x1 - x]
+            frame[y0:y1, x0:x1][m] = color
+        return frame
+
+    def show(self, window, frame, delay=1):
+        """Shows `frame` and returns cv2.waitKey(delay); returns -1 without touching any window when headless."""
+        if self.headless:
+            return -1
+        cv2.imshow(window, frame)
+        return cv2.waitKey(delay)
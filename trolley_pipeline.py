@@ -0,0 +1,251 @@
+"""
+Staged capture -> inference -> render pipeline for the smart-trolley apps.
+
+The camera, the detector and the UI run at different rates. Running them in one loop makes every frame pay camera
+latency plus inference time plus UI time, so here each stage gets its own thread and the stages are joined by bounded
+drop-oldest queues: a slow stage never builds a backlog, it simply works on the newest item available.
+
+Usage:
+    pipeline = TrolleyPipeline(cap, model).start()
+    while True:
+        packet = pipeline.poll()  # non-blocking, None if no new result
+        ...
+        clock.tick(60)
+    pipeline.stop()
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from trolley_metrics import REGISTRY
+
+LOGGER = logging.getLogger("smart_trolley")
+
+
+class DropOldestQueue:
+    """Bounded thread-safe queue that discards the oldest item instead of blocking the producer when full."""
+
+    def __init__(self, maxsize=1):
+        """Initializes the queue with capacity `maxsize` and zeroed drop counter."""
+        self.maxsize = maxsize
+        self.dropped = 0  # items discarded because the consumer was too slow
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        """Appends `item`, evicting the oldest entry if the queue is full; never blocks."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Removes and returns the oldest item, waiting up to `timeout` seconds; returns None on timeout or close."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def get_nowait(self):
+        """Returns the oldest item or None if the queue is empty."""
+        with self._cond:
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        """Wakes up all waiting consumers; subsequent `get()` calls return immediately."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        """Returns the current queue depth."""
+        return len(self._items)
+
+
+class StageStats:
+    """Latency and throughput counters for one pipeline stage."""
+
+    def __init__(self, name, alpha=0.1):
+        """Initializes counters for stage `name`; `alpha` is the smoothing factor of the moving averages."""
+        self.name = name
+        self.alpha = alpha
+        self.count = 0  # processed items
+        self.errors = 0  # failed items
+        self.last = 0.0  # last latency (s)
+        self.mean = 0.0  # exponential moving average latency (s)
+        self.max = 0.0  # worst latency seen (s)
+        self.rate = 0.0  # exponential moving average throughput (items/s)
+        self._t_prev = None
+        self.hist = REGISTRY.stage(name)  # exported latency distribution
+
+    def update(self, dt):
+        """Records one processed item that took `dt` seconds."""
+        now = time.perf_counter()
+        if self._t_prev is not None and now > self._t_prev:
+            r = 1.0 / (now - self._t_prev)
+            self.rate = r if self.count <= 1 else self.rate + self.alpha * (r - self.rate)
+        self._t_prev = now
+        self.mean = dt if self.count == 0 else self.mean + self.alpha * (dt - self.mean)
+        self.last, self.max = dt, max(self.max, dt)
+        self.count += 1
+        self.hist.observe(dt)
+
+    def error(self):
+        """Records one failed item."""
+        self.errors += 1
+        REGISTRY.counter("trolley_stage_errors_total", "Failed items per stage", stage=self.name).inc()
+
+    def as_dict(self):
+        """Returns the counters as a plain dict with latencies in milliseconds."""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "fps": round(self.rate, 1),
+            "last_ms": round(self.last * 1e3, 1),
+            "mean_ms": round(self.mean * 1e3, 1),
+            "max_ms": round(self.max * 1e3, 1),
+        }
+
+
+@dataclass
+class Packet:
+    """One frame travelling through the pipeline together with its detection result and timestamps."""
+
+    index: int  # capture frame index
+    frame: Any  # BGR image as read from the camera
+    t_capture: float  # perf_counter() when the frame was read
+    result: Any = None  # model output, None until the inference stage ran
+    t_infer: float = 0.0  # perf_counter() when inference finished
+    fresh: bool = True  # False if the motion gate skipped this frame and `result` is the previous detection
+
+
+class TrolleyPipeline:
+    """Runs camera capture and model inference on background threads and hands results to the render loop."""
+
+    def __init__(self, cap, infer, maxsize=1, retry_delay=0.01, gate=None):
+        """
+        Initializes the pipeline.
+
+        Args:
+            cap: object with an OpenCV-style `read() -> (ok, frame)` method.
+            infer: callable mapping a frame to a detection result, e.g. a YOLOv5 AutoShape model.
+            maxsize: depth of each inter-stage queue; 1 always processes the freshest frame.
+            retry_delay: seconds to back off after a failed camera read.
+            gate: optional callable `gate(frame) -> bool` (e.g. MotionGate); frames it rejects reuse the last result.
+        """
+        self.cap = cap
+        self.infer = infer
+        self.gate = gate
+        self.last_result = None
+        self.retry_delay = retry_delay
+        self.frames = DropOldestQueue(maxsize)  # capture -> inference
+        self.results = DropOldestQueue(maxsize)  # inference -> render
+        self.stats = {k: StageStats(k) for k in ("capture", "inference", "render", "latency")}
+        self.running = False
+        self._threads = []
+        REGISTRY.collector(self._collect)
+
+    def _collect(self):
+        """Samples queue depths, drops and the motion-gate skip ratio into gauges before a metrics export."""
+        for name, q in (("frames", self.frames), ("results", self.results)):
+            REGISTRY.gauge("trolley_queue_depth", "Items waiting between stages", queue=name).set(len(q))
+            REGISTRY.gauge("trolley_queue_dropped", "Items dropped by drop-oldest queues", queue=name).set(q.dropped)
+        if hasattr(self.gate, "skip_ratio"):
+            REGISTRY.gauge("trolley_gate_skip_ratio", "Share of frames skipped as static").set(self.gate.skip_ratio)
+
+    def start(self):
+        """Starts the capture and inference threads; returns self for chaining."""
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="trolley-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="trolley-inference", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        """Signals both worker threads to exit and waits up to `timeout` seconds for each."""
+        self.running = False
+        self.frames.close()
+        self.results.close()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _capture_loop(self):
+        """Reads frames as fast as the camera delivers them and publishes the newest one."""
+        s, index = self.stats["capture"], 0
+        while self.running:
+            t0 = time.perf_counter()
+            ok, frame = self.cap.read()
+            if not ok or frame is None:
+                s.error()
+                time.sleep(self.retry_delay)
+                continue
+            t1 = time.perf_counter()
+            s.update(t1 - t0)
+            self.frames.put(Packet(index, frame, t1))
+            index += 1
+
+    def _inference_loop(self):
+        """Runs the model on the newest captured frame and publishes the result."""
+        s = self.stats["inference"]
+        while self.running:
+            packet = self.frames.get(timeout=0.1)
+            if packet is None:
+                continue
+            if self.gate is not None and not self.gate(packet.frame) and self.last_result is not None:
+                packet.result, packet.fresh, packet.t_infer = self.last_result, False, time.perf_counter()
+                self.results.put(packet)
+                continue
+            t0 = time.perf_counter()
+            try:
+                packet.result = self.infer(packet.frame)
+            except Exception as e:
+                s.error()
+                LOGGER.warning(f"[Pipeline] inference error: {e}")
+                continue
+            packet.t_infer = time.perf_counter()
+            s.update(packet.t_infer - t0)
+            REGISTRY.observe_detections(packet.result)
+            self.last_result = packet.result
+            self.results.put(packet)
+
+    def poll(self):
+        """Returns the newest finished Packet or None without blocking; call once per render frame."""
+        packet = self.results.get_nowait()
+        if packet is not None:
+            self.stats["latency"].update(time.perf_counter() - packet.t_capture)  # capture-to-render age
+        return packet
+
+    def tick(self, dt):
+        """Records the duration `dt` (s) of one render-loop iteration."""
+        self.stats["render"].update(dt)
+
+    def summary(self):
+        """Returns a dict of per-stage counters plus current queue depths and drop counts."""
+        d = {k: v.as_dict() for k, v in self.stats.items()}
+        d["queues"] = {
+            "frames": {"depth": len(self.frames), "dropped": self.frames.dropped},
+            "results": {"depth": len(self.results), "dropped": self.results.dropped},
+        }
+        if hasattr(self.gate, "as_dict"):
+            d["gate"] = self.gate.as_dict()
+        return d
+
+    def status_line(self):
+        """Returns a one-line human readable summary suitable for an on-screen overlay."""
+        st = self.stats
+        return (
+            f"cam {st['capture'].rate:.0f}fps | det {st['inference'].rate:.1f}fps "
+            f"{st['inference'].mean * 1e3:.0f}ms | ui {st['render'].rate:.0f}fps | "
+            f"lag {st['latency'].mean * 1e3:.0f}ms | drop {self.frames.dropped}"
+            + (f" | skip {self.gate.skip_ratio:.0%}" if hasattr(self.gate, "skip_ratio") else "")
+        )
@@ -0,0 +1,138 @@
+"""
+Cached, off-thread QR code rendering for smart-trolley checkout.
+
+`generate_qr()` built the QR with `qrcode.make`, saved it to checkout_qr.png and read it back with `cv2.imread`, inside
+the video loop and on every trigger, including the frequent false positives of the checkout gesture. `QrCheckout`
+encodes the receipt on a worker thread and rasterizes the module matrix straight into a NumPy image, with no PIL and
+no disk. Images are cached by a hash of the cart, and a repeated trigger for the same cart within the debounce window
+is ignored.
+
+Usage:
+    qr = QrCheckout().start()
+    if qr.request(ledger.lines(), ledger.total):  # returns False for debounced repeats
+        speak("Here is your QR code.")
+    image = qr.poll()  # BGR ndarray once ready, else None
+    if image is not None:
+        cv2.imshow("Scan to Pay", image)
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+LOGGER = logging.getLogger("smart_trolley")
+
+
+def receipt_text(lines, total, currency="₹"):
+    """Returns the checkout payload encoded in the QR code."""
+    data = "\n".join(f"{name}: {qty} x {currency}{price:g}" for name, qty, price, *_ in lines)
+    return f"Smart Trolley Checkout:\n{data}\nTotal: {currency}{total:g}\nPay at counter or scan UPI."
+
+
+def render_qr(text, box_size=8, border=4):
+    """Returns `text` as a QR code BGR uint8 image, rasterized directly from the module matrix."""
+    import qrcode
+
+    qr = qrcode.QRCode(box_size=box_size, border=border)
+    qr.add_data(text)
+    qr.make(fit=True)
+    m = np.asarray(qr.get_matrix(), dtype=bool)  # includes the border
+    im = np.where(m, 0, 255).astype(np.uint8).repeat(box_size, 0).repeat(box_size, 1)
+    return np.repeat(im[..., None], 3, axis=2)
+
+
+class QrCheckout:
+    """Worker-thread QR renderer with a per-cart LRU cache and trigger debouncing."""
+
+    def __init__(self, debounce=5.0, cache_size=8, box_size=8, currency="₹"):
+        """
+        Initializes the renderer.
+
+        Args:
+            debounce (float): seconds during which a repeated request for the same cart is ignored.
+            cache_size (int): rendered QR images kept, keyed by cart hash.
+            box_size (int): pixels per QR module.
+            currency (str): currency symbol used in the payload.
+        """
+        self.debounce, self.cache_size, self.box_size, self.currency = debounce, cache_size, box_size, currency
+        self.requested = self.debounced = self.rendered = self.hits = 0  # counters
+        self._cache = OrderedDict()  # cart hash -> image
+        self._last_key, self._t_last = None, 0.0
+        self._job = None  # (key, text) waiting for the worker
+        self._ready = None  # image waiting for poll()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the worker thread; returns self for chaining."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="trolley-qr", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the worker thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    @staticmethod
+    def key(lines, total):
+        """Returns a stable hash of the cart contents."""
+        items = ";".join(f"{name}:{qty}:{price:g}" for name, qty, price, *_ in lines)
+        return hashlib.blake2b(f"{items}|{total:.2f}".encode(), digest_size=8).hexdigest()
+
+    def request(self, lines, total):
+        """
+        Asks for the QR of the cart given as [(name, qty, price, ...)] lines and its total. Never blocks.
+
+        Returns False if the same cart was requested less than `debounce` seconds ago, else True.
+        """
+        key, now = self.key(lines, total), time.monotonic()
+        if key == self._last_key and now - self._t_last < self.debounce:
+            self.debounced += 1
+            return False
+        self._last_key, self._t_last = key, now
+        self.requested += 1
+        with self._cond:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                self._ready = image
+            else:
+                self._job = key, receipt_text(lines, total, self.currency)
+                self._cond.notify()
+        return True
+
+    def poll(self):
+        """Returns the requested QR image once it is ready (only once per request), else None."""
+        with self._cond:
+            image, self._ready = self._ready, None
+        return image
+
+    def _run(self):
+        """Worker loop: renders the latest requested cart and caches the image."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._job is not None or not self._running)
+                if not self._running:
+                    break
+                (key, text), self._job = self._job, None
+            try:
+                image = render_qr(text, self.box_size)
+            except Exception as e:
+                LOGGER.warning(f"[QR] rendering failed: {e}")
+                continue
+            self.rendered += 1
+            with self._cond:
+                self._cache[key] = image
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                if self._job is None:  # a newer cart request supersedes this image
+                    self._ready = image
@@ -0,0 +1,207 @@
+"""
+Headless replay harness for benchmarking the smart-trolley loop on recorded sessions.
+
+Feeds a recorded video or a folder of images through the same detection -> cart -> speech path the trolley apps use,
+with audio, pygame and cv2.imshow stubbed out, and reports end-to-end FPS, per-stage latency percentiles and the final
+cart. Time-based hysteresis runs on the recording's own clock (frame index / fps), so results are repeatable and the
+final cart can be checked against an expected one in CI.
+
+Usage:
+    $ python trolley_replay.py --source session.mp4 --weights yolov5n.pt
+    $ python trolley_replay.py --source frames/ --fps 15 --tracker track --expect expected_cart.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from trolley_cart import CartTracker
+from trolley_motion import MotionGate
+from trolley_roi import RoiDetector
+from trolley_speech import PRIORITY_ALERT, PRIORITY_NORMAL, SpeechQueue
+from trolley_tracker import TrackedCart
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # repository root, contains hubconf.py
+IMG_FORMATS = {".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"}
+
+
+class ReplaySource:
+    """OpenCV-style `read()` over a video file or an image folder, with the recording's frame rate."""
+
+    def __init__(self, source, fps=None, loop=False):
+        """Opens `source` (video path or image directory); `fps` overrides the rate stored in the video."""
+        self.source, self.loop = Path(source), loop
+        if self.source.is_dir():
+            self.files = sorted(p for p in self.source.iterdir() if p.suffix.lower() in IMG_FORMATS)
+            assert self.files, f"no images found in {self.source}"
+            self.cap, self.fps = None, fps or 30.0
+        else:
+            self.files, self.cap = None, cv2.VideoCapture(str(self.source))
+            assert self.cap.isOpened(), f"failed to open {self.source}"
+            self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.index = 0
+
+    def read(self):
+        """Returns (ok, frame) like cv2.VideoCapture.read()."""
+        if self.files is not None:
+            if self.index >= len(self.files):
+                if not self.loop:
+                    return False, None
+                self.index = 0
+            frame = cv2.imread(str(self.files[self.index]))
+        else:
+            ok, frame = self.cap.read()
+            if not ok and self.loop:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self.cap.read()
+            if not ok:
+                return False, None
+        self.index += 1
+        return frame is not None, frame
+
+    def release(self):
+        """Releases the underlying video capture, if any."""
+        if self.cap is not None:
+            self.cap.release()
+
+
+class RecordingEngine:
+    """pyttsx3 stand-in that records sentences instead of playing audio."""
+
+    def __init__(self):
+        """Initializes an empty transcript."""
+        self.transcript = []
+
+    def say(self, text):
+        """Records `text`."""
+        self.transcript.append(text)
+
+    def runAndWait(self):
+        """Returns immediately; nothing is played."""
+
+
+def percentiles(x, q=(50, 90, 99)):
+    """Returns a dict of latency percentiles in milliseconds for a list of durations in seconds."""
+    x = np.asarray(x) * 1e3
+    return {f"p{k}": round(float(np.percentile(x, k)), 2) for k in q} if len(x) else {}
+
+
+def run(
+    source,  # video file or image directory
+    weights=ROOT / "yolov5n.pt",  # model path loaded through the local hubconf.py
+    model=None,  # preloaded AutoShape model, overrides weights
+    fps=None,  # recording frame rate, default from video or 30
+    items=None,  # class names that can go in the cart, default all
+    tracker="label",  # cart counting: 'label' (CartTracker) or 'track' (TrackedCart)
+    rois=None,  # basket ROIs passed to RoiDetector
+    size=640,  # inference size
+    gate=False,  # enable MotionGate
+    max_frames=0,  # stop after this many frames, 0 = all
+    expect=None,  # JSON file with the expected final cart
+    report=None,  # optional JSON report path
+):
+    """Replays `source` through detection, cart and speech and returns a report dict."""
+    if model is None:
+        import torch
+
+        model = torch.hub.load(str(ROOT), "custom", path=str(weights), source="local", verbose=False)
+    detector = RoiDetector(model, rois=rois, size=size)
+    cart = CartTracker(model.names, items=items, conf=0.5)
+    if tracker == "track":
+        cart = TrackedCart(cart)
+    motion = MotionGate() if gate else None
+    engine = RecordingEngine()
+    speech = SpeechQueue(engine_factory=lambda: engine).start()
+    src = ReplaySource(source, fps)
+
+    stages = {k: [] for k in ("read", "gate", "preprocess", "inference", "nms", "cart", "speech", "frame")}
+    pred, n = np.zeros((0, 6), dtype=np.float32), 0
+    t_start = time.perf_counter()
+    while not max_frames or n < max_frames:
+        t0 = time.perf_counter()
+        ok, frame = src.read()
+        if not ok:
+            break
+        now = n / src.fps  # recording clock
+        t1 = time.perf_counter()
+        run_model = motion is None or motion(frame, now=now)
+        t2 = time.perf_counter()
+        if run_model:
+            results = detector(frame)
+            pred = results.pred[0].cpu().numpy()
+            for k, t in zip(("preprocess", "inference", "nms"), results.t):
+                stages[k].append(t / 1e3)
+        t3 = time.perf_counter()
+        events = cart.update(pred, now=now)
+        t4 = time.perf_counter()
+        for _, name, delta in events:
+            if delta > 0:
+                speech.announce(name, "added to cart", PRIORITY_NORMAL)
+            else:
+                speech.announce(name, "removed from cart", PRIORITY_ALERT)
+        t5 = time.perf_counter()
+        for k, dt in zip(("read", "gate", "cart", "speech", "frame"), (t1 - t0, t2 - t1, t4 - t3, t5 - t4, t5 - t0)):
+            stages[k].append(dt)
+        n += 1
+    elapsed = time.perf_counter() - t_start
+    src.release()
+    speech.stop()
+
+    r = {
+        "source": str(source),
+        "frames": n,
+        "fps": round(n / max(elapsed, 1e-9), 2),
+        "stages_ms": {k: percentiles(v) for k, v in stages.items() if v},
+        "gate": motion.as_dict() if motion else None,
+        "cart": dict(sorted(cart.cart.items())),
+        "speech": {"spoken": speech.spoken, "merged": speech.merged, "dropped": speech.dropped},
+        "transcript": engine.transcript,
+    }
+    if expect:
+        expected = json.loads(Path(expect).read_text())
+        r["expected"], r["match"] = expected, r["cart"] == dict(sorted(expected.items()))
+    if report:
+        Path(report).write_text(json.dumps(r, indent=2))
+    return r
+
+
+def parse_opt():
+    """Parses command line arguments for the replay harness."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", type=str, required=True, help="recorded video file or image directory")
+    parser.add_argument("--weights", type=str, default=ROOT / "yolov5n.pt", help="model path")
+    parser.add_argument("--fps", type=float, default=None, help="recording frame rate, default from video or 30")
+    parser.add_argument("--items", nargs="+", type=str, default=None, help="cart item class names, default all")
+    parser.add_argument("--tracker", type=str, default="label", choices=("label", "track"), help="cart counting")
+    parser.add_argument("--rois", type=float, nargs=4, action="append", default=None, help="basket ROI x1 y1 x2 y2")
+    parser.add_argument("--size", type=int, default=640, help="inference size")
+    parser.add_argument("--gate", action="store_true", help="enable motion-gated inference")
+    parser.add_argument("--max-frames", type=int, default=0, help="stop after N frames, 0 = all")
+    parser.add_argument("--expect", type=str, default=None, help="JSON file with the expected final cart")
+    parser.add_argument("--report", type=str, default=None, help="write the JSON report to this file")
+    return parser.parse_args()
+
+
+def main(opt):
+    """Runs the replay, prints a summary and exits non-zero if the final cart does not match --expect."""
+    r = run(**vars(opt))
+    print(f"{r['frames']} frames at {r['fps']} FPS end-to-end")
+    for k, v in r["stages_ms"].items():
+        print(f"  {k:<10} " + "  ".join(f"{q} {ms:7.2f}ms" for q, ms in v.items()))
+    if r["gate"]:
+        print(f"  gate       skipped {r['gate']['skipped']}/{r['gate']['frames']} frames")
+    print(f"cart: {r['cart']}")
+    if "match" in r:
+        print(f"expected: {r['expected']} -> {'OK' if r['match'] else 'MISMATCH'}")
+        sys.exit(0 if r["match"] else 1)
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    main(opt)
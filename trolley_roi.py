@@ -0,0 +1,76 @@
+"""
+Region-of-interest detection for the smart-trolley camera.
+
+The trolley camera sees the whole aisle but only the basket matters. `RoiDetector` crops one or more configurable
+regions out of each frame, runs them through a YOLOv5 AutoShape model as a single batch at a small inference size, and
+maps the boxes back to full-frame coordinates. Inferring a 320 px basket crop instead of a letterboxed 640 px full frame
+cuts detector time roughly 4x without losing resolution where it matters.
+
+Usage:
+    detect = RoiDetector(model, rois=[(0.25, 0.4, 0.75, 1.0)], size=320)  # fractions of the frame
+    results = detect(frame)  # Detections in full-frame coordinates
+"""
+
+import logging
+
+import torch
+import torchvision
+
+LOGGER = logging.getLogger("smart_trolley")
+
+
+class RoiDetector:
+    """Runs an AutoShape model on frame crops and returns full-frame Detections."""
+
+    def __init__(self, model, rois=None, size=320, iou=0.5):
+        """
+        Initializes the detector.
+
+        Args:
+            model: YOLOv5 AutoShape model, e.g. from torch.hub.load().
+            rois (list | None): (x1, y1, x2, y2) regions, in pixels or, if all values are <= 1, in frame fractions.
+                None runs on the full frame.
+            size (int): inference size passed to the model for the crops.
+            iou (float): NMS IoU used to merge duplicate boxes where ROIs overlap.
+        """
+        self.model = model
+        self.rois = [tuple(r) for r in rois] if rois else None
+        self.size, self.iou = size, iou
+        self._boxes = {}  # frame shape -> pixel ROIs
+
+    def boxes(self, shape):
+        """
+        Returns the ROIs as clipped integer pixel boxes for frames of `shape` (h, w), cached per shape.
+
+        Falls back to the full frame if no ROI overlaps frames of this shape, so the model never gets an empty batch.
+        """
+        h, w = shape[:2]
+        if (h, w) not in self._boxes:
+            out = []
+            for r in self.rois or [(0, 0, 1, 1)]:
+                if max(r) <= 1:  # fractions
+                    r = (r[0] * w, r[1] * h, r[2] * w, r[3] * h)
+                x1, y1 = max(int(r[0]), 0), max(int(r[1]), 0)
+                x2, y2 = min(int(r[2]), w), min(int(r[3]), h)
+                if x2 > x1 and y2 > y1:
+                    out.append((x1, y1, x2, y2))
+            if not out:
+                LOGGER.warning(f"[ROI] no ROI of {self.rois} lies inside {w}x{h} frames, detecting on the full frame")
+                out.append((0, 0, w, h))
+            self._boxes[(h, w)] = out
+        return self._boxes[(h, w)]
+
+    def __call__(self, frame):
+        """Detects objects inside the ROIs of `frame` and returns a single-image Detections in frame coordinates."""
+        rois = self.boxes(frame.shape)
+        results = self.model([frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rois], size=self.size)
+        preds = []
+        for p, (x1, y1, _, _) in zip(results.pred, rois):
+            p = p.clone()
+            p[:, [0, 2]] += x1
+            p[:, [1, 3]] += y1
+            preds.append(p)
+        pred = torch.cat(preds)
+        if len(rois) > 1 and len(pred):  # the same object may be seen in overlapping ROIs
+            pred = pred[torchvision.ops.batched_nms(pred[:, :4], pred[:, 4], pred[:, 5].long(), self.iou)]
+        return type(results)([frame], [pred], [results.files[0]], results.times, results.names, results.s)
@@ -0,0 +1,294 @@
+"""
+Shared YOLOv5 inference service for several trolleys on one edge box.
+
+Running one process per camera, each with its own `torch.hub.load(...)` model, multiplies RAM and never batches. The
+server loads a single AutoShape model (wrapping DetectMultiBackend, via trolley_startup.load_model), accepts frames from
+any number of trolley clients over a local socket, and dynamically batches requests that arrive within `max_latency`
+milliseconds of each other into one forward pass. Each client gets back its own detections.
+
+`InferenceClient` is a drop-in replacement for the AutoShape model in the trolley apps: calling it with a frame returns
+an object with the `pred`, `names`, `files`, `times` and `t` attributes the apps and RoiDetector use.
+
+Frames and results travel as pickles, so a peer that knows the authkey can run code in the other process. The key is
+read from TROLLEY_INFERENCE_KEY or a per-deployment key file (TROLLEY_INFERENCE_KEY_FILE, default
+~/.smart_trolley/inference.key) that the server generates on its first start, and the server only listens on loopback
+unless --allow-remote is given.
+
+Usage:
+    $ python trolley_server.py --weights yolov5n.pt --port 6000 --max-batch 8 --max-latency 10
+    $ TROLLEY_INFERENCE_SERVER=localhost:6000 python main3.py
+"""
+
+import argparse
+import ipaddress
+import logging
+import os
+import queue
+import secrets
+import socket
+import threading
+import time
+from collections import defaultdict
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+import numpy as np
+
+LOGGER = logging.getLogger("smart_trolley")
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # repository root, contains hubconf.py
+KEY_FILE = Path(os.getenv("TROLLEY_INFERENCE_KEY_FILE", Path.home() / ".smart_trolley" / "inference.key"))
+
+
+def load_authkey(create=False):
+    """
+    Returns the shared secret from TROLLEY_INFERENCE_KEY, else from KEY_FILE.
+
+    With `create`, a missing KEY_FILE is generated with a random key readable only by the current user. Raises
+    RuntimeError if no key is configured, since a guessable key would let any peer send pickles to the other side.
+    """
+    key = os.getenv("TROLLEY_INFERENCE_KEY", "")
+    if key:
+        return key.encode()
+    if KEY_FILE.exists():
+        return KEY_FILE.read_bytes().strip()
+    if not create:
+        raise RuntimeError(f"no inference key, set TROLLEY_INFERENCE_KEY or copy the server's {KEY_FILE}")
+    KEY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    key = secrets.token_hex(32).encode()
+    fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    LOGGER.info(f"[Server] generated inference key {KEY_FILE}")
+    return key
+
+
+def is_loopback(host):
+    """Returns True if `host` resolves only to loopback addresses."""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback for info in infos)
+
+
+class RemoteDetections:
+    """Minimal stand-in for common.Detections holding results received from the inference server."""
+
+    def __init__(self, ims, pred, files, times=(0, 0, 0), names=None, shape=None):
+        """Initializes with the same signature as common.Detections; `times` are per-image milliseconds."""
+        self.ims, self.pred, self.files, self.names = ims, pred, files, names
+        self.times = times
+        self.t = tuple(times)  # (pre-process, inference, NMS) ms per image
+        self.n = len(pred)
+        self.s = tuple(shape) if shape is not None else ()
+
+    def __len__(self):
+        """Returns the number of images."""
+        return self.n
+
+
+class InferenceClient:
+    """Synchronous, thread-safe client of the inference server; callable like an AutoShape model."""
+
+    conf = None  # optional client-side confidence filter on top of the server's threshold
+
+    def __init__(self, address=("localhost", 6000), authkey=None, as_tensor=True):
+        """Connects to the server at `address`; `as_tensor` returns predictions as torch tensors like AutoShape."""
+        self.conn = Client(tuple(address), authkey=authkey or load_authkey())
+        self.conn.send(("hello",))
+        _, self.names, self.stride = self.conn.recv()
+        self.as_tensor = as_tensor
+        self._lock = threading.Lock()
+        self._id = 0
+
+    @classmethod
+    def from_env(cls, var="TROLLEY_INFERENCE_SERVER"):
+        """Returns a client for the 'host:port' in environment variable `var`, or None if it is not set."""
+        address = os.getenv(var)
+        if not address:
+            return None
+        host, port = address.rsplit(":", 1)
+        return cls((host, int(port)))
+
+    def __call__(self, ims, size=640):
+        """Sends one frame or a list of frames for inference and returns a RemoteDetections."""
+        ims = list(ims) if isinstance(ims, (list, tuple)) else [ims]
+        with self._lock:
+            ids = []
+            for im in ims:  # pipelined: all frames of a call can land in the same server batch
+                self._id += 1
+                ids.append(self._id)
+                self.conn.send(("infer", self._id, np.ascontiguousarray(im), size))
+            replies = {}
+            while len(replies) < len(ids):
+                kind, rid, *payload = self.conn.recv()
+                if kind == "error":
+                    raise RuntimeError(f"inference server error: {payload[0]}")
+                replies[rid] = payload
+        pred = [replies[i][0] for i in ids]
+        if self.conf is not None:
+            pred = [p[p[:, 4] >= self.conf] for p in pred]
+        if self.as_tensor:
+            import torch
+
+            pred = [torch.from_numpy(p) for p in pred]
+        times = np.mean([replies[i][1] for i in ids], 0)
+        return RemoteDetections(ims, pred, [f"image{i}.jpg" for i in range(len(ims))], times, self.names)
+
+    def close(self):
+        """Closes the connection."""
+        self.conn.close()
+
+
+class _Request:
+    """One frame waiting to be batched, plus the connection to answer on."""
+
+    __slots__ = ("id", "frame", "size", "t", "reply")
+
+    def __init__(self, rid, frame, size, reply):
+        """Initializes the request with its arrival time."""
+        self.id, self.frame, self.size, self.reply, self.t = rid, frame, size, reply, time.monotonic()
+
+
+class InferenceServer:
+    """Accepts trolley clients on a local socket and answers their frames with dynamically batched inference."""
+
+    def __init__(self, model, address=("localhost", 6000), authkey=None, max_batch=8, max_latency=10.0):
+        """
+        Initializes the server.
+
+        Args:
+            model: YOLOv5 AutoShape model.
+            address (tuple): (host, port) to listen on; keep it on localhost.
+            authkey (bytes | None): shared secret clients must present; None uses `load_authkey(create=True)`.
+            max_batch (int): maximum frames per forward pass.
+            max_latency (float): milliseconds the first frame of a batch may wait for more frames.
+        """
+        self.model, self.address, self.authkey = model, tuple(address), authkey or load_authkey(create=True)
+        self.max_batch, self.max_latency = max_batch, max_latency / 1e3
+        self.requests = queue.Queue()
+        self.clients = self.served = self.batches = 0  # counters
+        self.batch_sizes = defaultdict(int)  # histogram of batch sizes
+        self._running = False
+
+    def serve_forever(self):
+        """Starts the batching thread and accepts clients until interrupted."""
+        self._running = True
+        threading.Thread(target=self._batch_loop, name="trolley-batcher", daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            LOGGER.info(f"[Server] listening on {self.address[0]}:{self.address[1]}")
+            while self._running:
+                conn = listener.accept()
+                self.clients += 1
+                threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+
+    def _client_loop(self, conn):
+        """Receives requests from one client and queues them for batching."""
+        lock = threading.Lock()
+
+        def reply(msg):
+            with lock:
+                conn.send(msg)
+
+        try:
+            while self._running:
+                msg = conn.recv()
+                if msg[0] == "hello":
+                    reply(("names", self.model.names, int(self.model.stride)))
+                elif msg[0] == "infer":
+                    self.requests.put(_Request(msg[1], msg[2], msg[3], reply))
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.clients -= 1
+            conn.close()
+
+    def _next_batch(self):
+        """Blocks for a first request, then gathers more until max_batch or its max_latency deadline."""
+        try:
+            batch = [self.requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = batch[0].t + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        """Runs batched inference and answers each request on its own connection."""
+        while self._running:
+            groups = defaultdict(list)
+            for r in self._next_batch():
+                groups[r.size].append(r)  # one forward pass per inference size
+            for size, group in groups.items():
+                try:
+                    results = self.model([r.frame for r in group], size=size)
+                except Exception as e:
+                    for r in group:
+                        r.reply(("error", r.id, str(e)))
+                    continue
+                self.batches += 1
+                self.batch_sizes[len(group)] += 1
+                for r, p in zip(group, results.pred):
+                    try:
+                        r.reply(("result", r.id, p.cpu().numpy(), results.t))
+                    except (EOFError, OSError):
+                        pass  # client went away
+                self.served += len(group)
+
+    def stop(self):
+        """Stops batching; the accept loop exits after the next connection."""
+        self._running = False
+
+    def as_dict(self):
+        """Returns the server counters as a plain dict."""
+        return {
+            "clients": self.clients,
+            "served": self.served,
+            "batches": self.batches,
+            "mean_batch": round(self.served / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+
+def run(
+    weights=ROOT / "yolov5n.pt",
+    host="localhost",
+    port=6000,
+    max_batch=8,
+    max_latency=10.0,
+    device="",
+    allow_remote=False,
+):
+    """Loads the model once like the trolley apps do and serves it; a non-loopback `host` needs `allow_remote`."""
+    if not allow_remote and not is_loopback(host):
+        raise ValueError(f"refusing to listen on non-loopback host '{host}', pass --allow-remote to expose the server")
+    from trolley_startup import load_model
+
+    model = load_model(weights, device=device or None)
+    InferenceServer(model, (host, port), max_batch=max_batch, max_latency=max_latency).serve_forever()
+
+
+def parse_opt():
+    """Parses command line arguments for the inference server."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=ROOT / "yolov5n.pt", help="model path")
+    parser.add_argument("--host", type=str, default="localhost", help="address to listen on")
+    parser.add_argument("--allow-remote", action="store_true", help="allow a --host reachable from other machines")
+    parser.add_argument("--port", type=int, default=6000, help="port to listen on")
+    parser.add_argument("--max-batch", type=int, default=8, help="maximum frames per forward pass")
+    parser.add_argument("--max-latency", type=float, default=10.0, help="max ms a frame waits for a batch to fill")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    opt = parse_opt()
+    run(**vars(opt))
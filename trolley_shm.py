@@ -0,0 +1,302 @@
+"""
+Zero-copy frame transport between camera and inference processes through shared memory.
+
+Pickling a 1280x720x3 frame through `multiprocessing.Queue` costs more than preprocessing it. `SharedFrameRing` keeps a
+ring of fixed-size frame slots in one `multiprocessing.shared_memory` block. A single writer (the camera process) copies
+each frame into the next slot. Any number of readers attached by name get the newest frame as a NumPy view of the
+slot, without copying or unpickling. They can pass the view straight to `AutoShape.forward`, or use the `shm://<name>`
+source of detect.py.
+
+Index/lock protocol (single writer, lock-free readers): the header holds the number of frames written and, per slot,
+the sequence number of the frame it contains. The writer marks a slot as being written (-seq), copies the frame,
+publishes +seq in the slot and finally advances the head. A reader takes the slot of the head and checks its sequence
+before use; `valid(seq)` tells whether the writer has since lapped the ring and overwritten the view. Make `slots`
+large enough to cover the reader's latency (8 slots at 30 FPS leave ~230 ms).
+
+Usage:
+    ring = SharedFrameRing("trolley_cam", shape=(720, 1280, 3), create=True)  # camera process
+    ring.write(frame)
+
+    ring = SharedFrameRing("trolley_cam")  # inference process
+    ok, frame = ring.read()  # newest unseen frame as a view of shared memory
+    results = model(frame[..., ::-1])
+
+    $ python trolley_shm.py --frames 300 --shape 720 1280 3 --fps 30  # benchmark against pickled queues
+"""
+
+import argparse
+import logging
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+LOGGER = logging.getLogger("smart_trolley")
+
+MAGIC = 0x54524F4C  # 'TROL'
+HEAD, CLOSED, SLOTS, H, W, C = range(1, 7)  # header fields after MAGIC
+HEADER = 8  # fixed header int64 fields
+
+
+class SharedFrameRing:
+    """Ring buffer of uint8 frame slots in shared memory with a single writer and lock-free readers."""
+
+    def __init__(self, name=None, slots=8, shape=(720, 1280, 3), create=False, poll=0.001):
+        """
+        Creates or attaches to a ring.
+
+        Args:
+            name (str | None): shared memory block name; None lets the OS pick one (create only).
+            slots (int): number of frame slots (create only).
+            shape (tuple): (h, w, c) of every frame (create only; readers read it from the header).
+            create (bool): create the block (writer) or attach to an existing one (reader).
+            poll (float): seconds between head checks while a reader waits for a new frame.
+        """
+        self.poll, self.owner = poll, create
+        if create:
+            h, w, c = shape
+            frame_bytes = h * w * c
+            size = (HEADER + 2 * slots) * 8 + slots * frame_bytes
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            header = np.ndarray(HEADER, np.int64, self.shm.buf)
+            header[:] = 0
+            header[[SLOTS, H, W, C]] = slots, h, w, c
+            header[0] = MAGIC
+        else:
+            self.shm = _attach(name)
+            header = np.ndarray(HEADER, np.int64, self.shm.buf)
+            if header[0] != MAGIC:
+                raise ValueError(f"shared memory block '{name}' is not a SharedFrameRing")
+        self.name = self.shm.name
+        self.header = header
+        self.slots, h, w, c = (int(x) for x in header[[SLOTS, H, W, C]])
+        self.shape = (h, w, c)
+        self.slot_seq = np.ndarray(self.slots, np.int64, self.shm.buf, HEADER * 8)  # frame seq held by each slot
+        self.slot_t = np.ndarray(self.slots, np.int64, self.shm.buf, (HEADER + self.slots) * 8)  # write time (ns)
+        offset = (HEADER + 2 * self.slots) * 8
+        self.frames = np.ndarray((self.slots, h, w, c), np.uint8, self.shm.buf, offset)
+        self.last = 0  # seq of the last frame returned by read() in this process
+        self.written = self.stale = 0  # counters
+
+    @property
+    def head(self):
+        """Returns the number of frames written so far (the seq of the newest frame)."""
+        return int(self.header[HEAD])
+
+    @property
+    def closed(self):
+        """Returns True once the writer has closed the ring."""
+        return bool(self.header[CLOSED])
+
+    def write(self, frame):
+        """Copies `frame` into the next slot and publishes it; returns its sequence number."""
+        if frame.shape != self.shape:
+            raise ValueError(f"frame shape {frame.shape} does not match ring shape {self.shape}")
+        seq = self.head + 1
+        slot = (seq - 1) % self.slots
+        self.slot_seq[slot] = -seq  # being written, readers must not use it
+        np.copyto(self.frames[slot], frame, casting="unsafe")
+        self.slot_t[slot] = time.time_ns()
+        self.slot_seq[slot] = seq
+        self.header[HEAD] = seq
+        self.written += 1
+        return seq
+
+    def valid(self, seq):
+        """Returns True if frame `seq` is still intact in its slot, i.e. the writer has not overwritten it."""
+        return seq > 0 and self.slot_seq[(seq - 1) % self.slots] == seq
+
+    def latest(self, after=0):
+        """Returns (seq, view) of the newest frame if newer than `after`, else (0, None). Never blocks."""
+        seq = self.head
+        if seq <= after or not self.valid(seq):
+            return 0, None
+        return seq, self.frames[(seq - 1) % self.slots]
+
+    def age(self, seq):
+        """Returns seconds since frame `seq` was written."""
+        return (time.time_ns() - int(self.slot_t[(seq - 1) % self.slots])) / 1e9
+
+    def wait(self, after=0, timeout=1.0):
+        """Returns (seq, view) of the newest frame newer than `after`, waiting up to `timeout` s; else (0, None)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            seq, frame = self.latest(after)
+            if seq:
+                return seq, frame
+            if self.closed or time.monotonic() > deadline:
+                return 0, None
+            time.sleep(self.poll)
+
+    def read(self, timeout=1.0):
+        """Returns (True, view) with a frame newer than the last one read, or (False, None), like cv2.VideoCapture."""
+        seq, frame = self.wait(self.last, timeout)
+        if not seq:
+            self.stale += 1
+            return False, None
+        self.last = seq
+        return True, frame
+
+    def isOpened(self):
+        """Returns True while the writer has not closed the ring, mirroring cv2.VideoCapture.isOpened()."""
+        return not self.closed
+
+    def close(self):
+        """Detaches from the block; the writer also marks the ring closed and the creator frees it."""
+        if self.owner or self.written:
+            self.header[CLOSED] = 1
+        self.header, self.slot_seq, self.slot_t, self.frames = self.header.copy(), None, None, None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # views handed out by read() are still alive; the mapping goes away with them
+        if self.owner:
+            self.shm.unlink()
+
+    release = close  # cv2.VideoCapture-style alias
+
+    def as_dict(self):
+        """Returns the ring state as a plain dict."""
+        return {"name": self.name, "slots": self.slots, "head": self.head, "written": self.written, "stale": self.stale}
+
+
+def _attach(name):
+    """Attaches to an existing block without letting this process's resource tracker unlink it on exit."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if mp.parent_process() is None:  # unrelated process with its own tracker; children share the creator's
+        try:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")  # only the creator owns the block (bpo-39959)
+        except Exception:
+            pass
+    return shm
+
+
+class LoadSharedFrames:
+    """detect.py dataset reading the newest frames of a SharedFrameRing, e.g. `--source shm://trolley_cam`."""
+
+    def __init__(self, name, img_size=640, stride=32, auto=True, timeout=5.0):
+        """Attaches to ring `name` (with or without the 'shm://' prefix) and sets letterbox parameters."""
+        self.ring = SharedFrameRing(name.split("://")[-1])
+        self.img_size, self.stride, self.auto, self.timeout = img_size, stride, auto, timeout
+        self.mode = "stream"
+        self.frame = 0
+
+    def __iter__(self):
+        """Returns the iterator itself."""
+        return self
+
+    def __next__(self):
+        """Returns (path, letterboxed CHW RGB image, BGR view of the frame, None, log string) for the newest frame."""
+        from utils.augmentations import letterbox
+
+        while True:
+            ok, im0 = self.ring.read(self.timeout)
+            if not ok:
+                raise StopIteration  # writer closed or stalled
+            seq = self.ring.last
+            im = letterbox(im0, self.img_size, stride=self.stride, auto=self.auto)[0]  # reads the view, copies
+            if self.ring.valid(seq):  # not overwritten while we read it
+                break
+        self.frame = seq
+        im = np.ascontiguousarray(im.transpose((2, 0, 1))[::-1])  # HWC to CHW, BGR to RGB
+        return f"shm_{self.ring.name}", im, im0, None, f"shm {self.ring.name} #{seq}: "
+
+    def __len__(self):
+        """Returns the batch size, one frame per read."""
+        return 1
+
+
+def _queue_producer(q, n, shape, fps):
+    """Benchmark producer: puts `n` timestamped frames on a multiprocessing queue."""
+    frame = np.random.randint(0, 255, shape, dtype=np.uint8)
+    for i in range(n):
+        t = time.perf_counter()
+        q.put((time.time_ns(), frame))
+        time.sleep(max(0.0, 1 / fps - (time.perf_counter() - t)) if fps else 0)
+    q.put(None)
+
+
+def _ring_producer(name, n, fps):
+    """Benchmark producer: writes `n` frames into the shared ring."""
+    ring = SharedFrameRing(name)
+    frame = np.random.randint(0, 255, ring.shape, dtype=np.uint8)
+    for i in range(n):
+        t = time.perf_counter()
+        ring.write(frame)
+        time.sleep(max(0.0, 1 / fps - (time.perf_counter() - t)) if fps else 0)
+    ring.close()
+
+
+def _report(name, latency, received, n, t):
+    """Logs one benchmark line and returns (received frames, mean latency in ms)."""
+    lat = np.array(latency) * 1e3
+    LOGGER.info(
+        f"{name:<14} received {received}/{n} frames in {t:.2f}s ({received / t:.0f} FPS), "
+        f"latency mean {lat.mean():.2f}ms p95 {np.percentile(lat, 95):.2f}ms"
+    )
+    return received, lat.mean()
+
+
+def benchmark(frames=300, shape=(720, 1280, 3), slots=8, fps=30):
+    """
+    Compares frame transport through a pickled multiprocessing.Queue and a SharedFrameRing between processes.
+
+    The queue delivers every frame while the ring only hands out the newest one, so latencies are only compared when
+    both delivered every frame, i.e. at a camera-like `fps` the consumer keeps up with. With fps=0 (as fast as
+    possible) the ring skips frames and its lower latency is reported next to the frames it dropped.
+    """
+    ctx = mp.get_context("spawn")
+    shape = tuple(shape)
+
+    q = ctx.Queue(maxsize=2)
+    p = ctx.Process(target=_queue_producer, args=(q, frames, shape, fps), daemon=True)
+    t0, latency = time.perf_counter(), []
+    p.start()
+    while (item := q.get()) is not None:
+        t, frame = item
+        _ = frame.mean(dtype=np.float32) if len(latency) % 30 == 0 else None  # touch the data occasionally
+        latency.append((time.time_ns() - t) / 1e9)
+    queue_result = _report("pickled queue", latency, len(latency), frames, time.perf_counter() - t0)
+    p.join()
+
+    ring = SharedFrameRing(slots=slots, shape=shape, create=True)
+    p = ctx.Process(target=_ring_producer, args=(ring.name, frames, fps), daemon=True)
+    t0, latency = time.perf_counter(), []
+    p.start()
+    while True:
+        ok, frame = ring.read(timeout=5.0)
+        if not ok:
+            break
+        _ = frame.mean(dtype=np.float32) if len(latency) % 30 == 0 else None
+        latency.append(ring.age(ring.last))
+    del frame
+    p.join()
+    ring_result = _report("shared ring", latency, len(latency), frames, time.perf_counter() - t0)
+    ring.close()
+    (nq, lq), (nr, lr) = queue_result, ring_result
+    if nq == nr == frames:
+        LOGGER.info(f"both delivered every frame: shared ring latency {lq / lr:.1f}x lower than the pickled queue")
+    else:
+        LOGGER.info(f"not like-for-like: the ring delivered {nr}/{frames} frames and the queue {nq}/{frames}")
+
+
+def parse_opt():
+    """Parses command line arguments for the transport benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300, help="frames to send")
+    parser.add_argument("--shape", type=int, nargs=3, default=[720, 1280, 3], help="frame h w c")
+    parser.add_argument("--slots", type=int, default=8, help="ring slots")
+    parser.add_argument("--fps", type=float, default=30, help="producer frame rate, 0 for as fast as possible")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    opt = parse_opt()
+    benchmark(**vars(opt))
@@ -0,0 +1,192 @@
+"""
+Non-blocking text-to-speech for the smart-trolley apps.
+
+A single worker thread owns the pyttsx3 engine (pyttsx3 is not thread-safe, so the engine is created and driven from
+that thread only) and speaks messages from a small priority queue. Callers never wait on audio: `say()` returns
+immediately. Pending messages with the same key are merged, so five "chips added" events queued while the engine is busy
+are spoken once as "5 chips added", and repeated identical sentences are dropped.
+
+Usage:
+    speech = SpeechQueue(rate=160).start()
+    speech.say("Welcome to Smart Trolley!")
+    speech.announce("chips", "added to cart")
+    speech.stop()  # waits for pending messages to be spoken
+"""
+
+import itertools
+import logging
+import threading
+import time
+
+from trolley_metrics import REGISTRY
+
+LOGGER = logging.getLogger("smart_trolley")
+
+PRIORITY_ALERT = 0  # removals, checkout, errors
+PRIORITY_NORMAL = 1  # cart additions, assistant replies
+PRIORITY_CHATTER = 2  # tips, suggestions; dropped first when the queue is full or stale
+
+
+class _Message:
+    """Pending utterance; `count` grows as duplicates are merged into it."""
+
+    __slots__ = ("priority", "seq", "t", "key", "text", "item", "action", "prefix", "count")
+
+    def __init__(self, priority, seq, key, text=None, item=None, action=None, prefix=""):
+        """Initializes a message either from literal `text` or from an `item`/`action` pair that can be counted."""
+        self.priority, self.seq, self.t, self.key = priority, seq, time.monotonic(), key
+        self.text, self.item, self.action, self.prefix = text, item, action, prefix
+        self.count = 1
+
+    def render(self):
+        """Returns the sentence to speak, e.g. 'chips added to cart' or '5 chips added to cart'."""
+        if self.text is not None:
+            return self.text
+        n = f"{self.count} " if self.count > 1 else ""
+        return f"{self.prefix}{n}{self.item} {self.action}"
+
+
+class SpeechQueue:
+    """Single speech worker with a merging priority queue; `say()` and `announce()` never block the caller."""
+
+    def __init__(self, rate=160, voice=None, max_pending=16, max_age=10.0, echo=False, engine_factory=None):
+        """
+        Initializes the speech queue.
+
+        Args:
+            rate (int): pyttsx3 speaking rate in words per minute.
+            voice (str | None): optional pyttsx3 voice id.
+            max_pending (int): maximum queued messages; the least important, oldest one is dropped on overflow.
+            max_age (float): seconds after which a queued PRIORITY_CHATTER message is no longer worth saying.
+            echo (bool): also print every spoken message as '[Assistant]: ...'.
+            engine_factory (callable | None): returns an object with pyttsx3's `say()`/`runAndWait()` interface;
+                defaults to `pyttsx3.init()`. Called on the worker thread.
+        """
+        self.rate, self.voice = rate, voice
+        self.max_pending, self.max_age, self.echo = max_pending, max_age, echo
+        self.engine_factory = engine_factory
+        self.pending = {}  # key -> _Message
+        self.spoken = self.merged = self.dropped = 0  # counters
+        self.speaking = None  # text currently being spoken
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        pending = REGISTRY.gauge("trolley_speech_pending", "Messages waiting to be spoken")
+        REGISTRY.collector(lambda: pending.set(len(self.pending)))
+
+    def start(self):
+        """Starts the worker thread; returns self for chaining."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="trolley-speech", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, flush=True, timeout=15.0):
+        """Stops the worker, first waiting up to `timeout` seconds for pending messages if `flush` is True."""
+        if flush:
+            self.join(timeout)
+        with self._cond:
+            self._running = False
+            self.pending.clear()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def join(self, timeout=None):
+        """Blocks until every queued message has been spoken or `timeout` seconds passed; returns True if idle."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.pending and self.speaking is None, timeout)
+
+    def say(self, text, priority=PRIORITY_NORMAL, key=None):
+        """Queues `text`; an identical pending message (or one with the same `key`) is replaced, not repeated."""
+        key = key or ("text", text)
+        with self._cond:
+            m = self.pending.get(key)
+            if m is not None:
+                m.text, m.priority = text, min(m.priority, priority)
+                self.merged += 1
+            else:
+                self._push(_Message(priority, next(self._seq), key, text=text))
+
+    def announce(self, item, action, priority=PRIORITY_NORMAL, prefix=""):
+        """Queues '<prefix><item> <action>', merging pending duplicates into '<prefix><n> <item> <action>'."""
+        key = ("event", prefix, item, action)
+        with self._cond:
+            m = self.pending.get(key)
+            if m is not None:
+                m.count += 1
+                m.priority = min(m.priority, priority)
+                self.merged += 1
+            else:
+                self._push(_Message(priority, next(self._seq), key, item=item, action=action, prefix=prefix))
+
+    def _push(self, m):
+        """Adds message `m` to the queue, evicting the least important oldest message on overflow. Holds the lock."""
+        if len(self.pending) >= self.max_pending:
+            victim = max(self.pending.values(), key=lambda x: (x.priority, -x.seq))
+            if victim.priority < m.priority:
+                self.dropped += 1  # new message is the least important one
+                return
+            del self.pending[victim.key]
+            self.dropped += 1
+        self.pending[m.key] = m
+        self._cond.notify()
+
+    def _pop(self):
+        """Waits for and removes the most urgent message, discarding stale chatter. Returns None on shutdown."""
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                stale = [
+                    k for k, m in self.pending.items() if m.priority >= PRIORITY_CHATTER and now - m.t > self.max_age
+                ]
+                for k in stale:
+                    del self.pending[k]
+                self.dropped += len(stale)
+                if self.pending:
+                    m = min(self.pending.values(), key=lambda x: (x.priority, x.seq))
+                    del self.pending[m.key]
+                    self.speaking = m.render()
+                    return self.speaking
+                self._cond.notify_all()  # wake join() waiters: queue drained
+                self._cond.wait(0.5)
+        return None
+
+    def _make_engine(self):
+        """Creates the TTS engine on the worker thread."""
+        if self.engine_factory is not None:
+            return self.engine_factory()
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        engine.setProperty("rate", self.rate)
+        if self.voice:
+            engine.setProperty("voice", self.voice)
+        return engine
+
+    def _run(self):
+        """Worker loop: speaks queued messages one at a time until stopped."""
+        try:
+            engine = self._make_engine()
+        except Exception as e:
+            LOGGER.warning(f"[Speech] TTS engine unavailable, messages will only be printed: {e}")
+            engine, self.echo = None, True
+        while True:
+            text = self._pop()
+            if text is None:
+                break
+            if self.echo:
+                print("[Assistant]:", text)
+            try:
+                if engine is not None:
+                    with REGISTRY.time("tts"):
+                        engine.say(text)
+                        engine.runAndWait()
+            except Exception as e:
+                REGISTRY.counter("trolley_stage_errors_total", "Failed items per stage", stage="tts").inc()
+                LOGGER.warning(f"[Speech] failed to speak '{text}': {e}")
+            with self._cond:
+                self.spoken += 1
+                self.speaking = None
+                self._cond.notify_all()
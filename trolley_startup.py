@@ -0,0 +1,185 @@
+"""
+Fast start-up helpers for the smart-trolley apps: offline model loading and a start-up time breakdown.
+
+`torch.hub.load('ultralytics/yolov5', ...)` contacts GitHub, re-imports the cached hub repo and runs a requirements
+check on every start. `load_model()` wraps local weights in this tree's AutoShape (common.py, with its batched
+letterbox and `submit()`/`result()` API) directly, without network. This flat tree ships common.py but not the YOLOv5
+`models`/`utils` packages it and the pickled weights import, so `yolov5_path()` takes them from a YOLOv5 checkout on
+sys.path or from the torch hub cache, downloading the code once if needed. `load_model()` can also pick up a
+pre-serialized TorchScript export next to the weights. It falls back to `torch.hub.load` only when the weights or the
+YOLOv5 code are missing and offline mode is off. `StartupTimer` records how long each start-up stage took, and the CLI
+reports per-module import costs measured in fresh interpreters.
+
+Usage:
+    startup = StartupTimer()  # first thing in the app, before heavy imports
+    import torch, cv2
+    startup.mark("imports")
+    model = load_model("yolov5n.pt")
+    startup.mark("model")
+    print(startup.report())
+
+    $ python trolley_startup.py --modules torch cv2 pygame pyttsx3 speech_recognition deepface qrcode
+    $ python export.py --weights yolov5n.pt --include torchscript  # then TROLLEY_TORCHSCRIPT=1
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+LOGGER = logging.getLogger("smart_trolley")
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # repository root, contains hubconf.py and the weights
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+YOLOV5_REPO = "ultralytics/yolov5"  # GitHub hub repo providing the `models`/`utils` packages
+OPTIONAL_MODULES = ("torch", "torchvision", "cv2", "pygame", "pyttsx3", "speech_recognition", "deepface", "qrcode")
+
+
+class StartupTimer:
+    """Wall-clock breakdown of application start-up stages."""
+
+    def __init__(self):
+        """Starts timing now."""
+        self.t0 = self.t = time.perf_counter()
+        self.stages = []  # (name, seconds)
+
+    def mark(self, name):
+        """Ends the current stage as `name`; returns its duration in seconds."""
+        t = time.perf_counter()
+        self.stages.append((name, t - self.t))
+        self.t = t
+        return self.stages[-1][1]
+
+    @property
+    def total(self):
+        """Returns the seconds since the timer started."""
+        return time.perf_counter() - self.t0
+
+    def report(self):
+        """Returns and logs a one-line summary of the stages."""
+        s = ", ".join(f"{name} {dt:.2f}s" for name, dt in self.stages)
+        s = f"[Startup] {s}, total {self.total:.2f}s"
+        LOGGER.info(s)
+        return s
+
+
+def resolve_weights(weights, torchscript=None):
+    """Returns the local weights path to load: `weights` under ROOT, or its .torchscript export if requested."""
+    torchscript = os.getenv("TROLLEY_TORCHSCRIPT", "0") == "1" if torchscript is None else torchscript
+    w = Path(weights)
+    w = w if w.is_absolute() or w.exists() else ROOT / w
+    if torchscript:
+        ts = w.with_suffix(".torchscript")
+        if ts.exists():
+            return ts
+        LOGGER.warning(f"[Startup] {ts.name} not found, run: python export.py --weights {w.name} --include torchscript")
+    return w
+
+
+def yolov5_path(offline=False):
+    """
+    Makes the YOLOv5 `models` and `utils` packages importable and returns the directory providing them.
+
+    A YOLOv5 checkout already on sys.path is used as is, else the torch hub cache of YOLOV5_REPO, downloaded first
+    unless `offline`. Raises ImportError if neither is available.
+    """
+    try:
+        import models.experimental
+        import utils.torch_utils
+
+        return Path(utils.torch_utils.__file__).parents[1]
+    except ImportError:
+        for m in ("models", "utils"):  # drop unrelated or partial packages of the same name
+            sys.modules.pop(m, None)
+    import torch
+
+    repo = Path(torch.hub.get_dir()) / f"{YOLOV5_REPO.replace('/', '_')}_master"
+    if not repo.exists():
+        if offline:
+            raise ImportError(f"YOLOv5 models/utils packages not found and offline mode is on, expected {repo}")
+        LOGGER.warning(f"[Startup] downloading the YOLOv5 code of {YOLOV5_REPO} to {repo}, once")
+        torch.hub.list(YOLOV5_REPO)  # fills the hub cache
+    if str(repo) not in sys.path:
+        sys.path.append(str(repo))  # after ROOT, so this tree's modules keep precedence
+    return repo
+
+
+def load_model(weights="yolov5n.pt", device=None, torchscript=None, offline=None, fuse=True):
+    """
+    Loads this tree's AutoShape YOLOv5 model from local weights without touching the network.
+
+    Args:
+        weights (str | Path): .pt weights, absolute or relative to the repository root.
+        device (str | None): cuda device, i.e. 0 or cpu; None picks the best available.
+        torchscript (bool | None): load `<weights>.torchscript` if present; None reads TROLLEY_TORCHSCRIPT=1.
+        offline (bool | None): never fall back to the GitHub hub; None reads TROLLEY_OFFLINE=1.
+        fuse (bool): fuse Conv+BN layers of PyTorch weights.
+
+    Returns:
+        (AutoShape): common.AutoShape around DetectMultiBackend, or the hub's AutoShape when falling back to it.
+    """
+    offline = os.getenv("TROLLEY_OFFLINE", "0") == "1" if offline is None else offline
+    w = resolve_weights(weights, torchscript)
+    if not w.exists():
+        if offline:
+            raise FileNotFoundError(f"{w} not found and offline mode is on, copy the weights next to hubconf.py")
+        import torch
+
+        LOGGER.warning(f"[Startup] {w.name} not found locally, loading it through the GitHub hub")
+        return torch.hub.load(YOLOV5_REPO, "custom", path=str(weights))  # downloads official weights
+
+    try:
+        yolov5_path(offline)
+        from common import AutoShape, DetectMultiBackend
+        from utils.torch_utils import select_device
+    except ImportError as e:
+        if offline:
+            raise
+        import torch
+
+        LOGGER.warning(f"[Startup] local YOLOv5 modules unavailable ({e}), loading {w.name} through the GitHub hub")
+        return torch.hub.load(YOLOV5_REPO, "custom", path=str(w))
+
+    # Same model hubconf.custom() builds, minus its per-start requirements check
+    model = AutoShape(DetectMultiBackend(w, device=select_device(device or ""), fuse=fuse))
+    return model.to(model.model.device)
+
+
+def import_times(modules=OPTIONAL_MODULES):
+    """Returns {module: seconds} to import each module in a fresh interpreter, None if it is not installed."""
+    times = {}
+    for m in modules:
+        code = f"import time; t = time.perf_counter(); import {m}; print(time.perf_counter() - t)"
+        r = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        times[m] = float(r.stdout.strip().splitlines()[-1]) if r.returncode == 0 and r.stdout.strip() else None
+    return times
+
+
+def run(modules=OPTIONAL_MODULES, weights=None, torchscript=False):
+    """Prints per-module import times and, if `weights` is given, the model load time."""
+    for m, t in import_times(modules).items():
+        print(f"{m:<20} {'not installed' if t is None else f'{t:6.2f}s'}")
+    if weights:
+        t = time.perf_counter()
+        load_model(weights, torchscript=torchscript, offline=True)
+        print(f"{'load_model':<20} {time.perf_counter() - t:6.2f}s  ({resolve_weights(weights, torchscript).name})")
+
+
+def parse_opt():
+    """Parses command line arguments for the start-up profile."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=list(OPTIONAL_MODULES), help="modules to time")
+    parser.add_argument("--weights", type=str, default=None, help="also time loading these local weights")
+    parser.add_argument("--torchscript", action="store_true", help="time the .torchscript export instead")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    run(**vars(opt))
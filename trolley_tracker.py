@@ -0,0 +1,295 @@
+"""
+Lightweight SORT/ByteTrack-style multi-object tracker for the smart-trolley apps.
+
+Counting labels ("a bottle is visible") cannot tell two bottles from one, and re-adds an item that is simply held in
+view. `ObjectTracker` gives every physical object a stable track ID by associating NMS output frame to frame with a
+vectorized constant-velocity Kalman filter and IoU matching (high-confidence detections first, then low-confidence ones
+to keep tracks alive through blur). `BasketCounter` turns tracks into cart events that fire once per object entering or
+leaving the basket region, and `TrackedCart` plugs both into a `CartTracker`.
+
+Usage:
+    tracker = TrackedCart(CartTracker(model.names, items=prices), region=(200, 300, 1080, 720))
+    for cls, name, delta in tracker.update(results.pred[0]):
+        ...
+"""
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from trolley_cart import to_numpy
+
+
+def box_iou(a, b):
+    """Returns the (n, m) IoU matrix between xyxy boxes `a` (n, 4) and `b` (m, 4)."""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.clip(rb - lt, 0, None).prod(2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None] - inter + 1e-7)
+
+
+def xyxy2cxcywh(x):
+    """Converts (n, 4) xyxy boxes to center-x, center-y, width, height."""
+    return np.concatenate(((x[:, :2] + x[:, 2:4]) / 2, x[:, 2:4] - x[:, :2]), 1)
+
+
+def cxcywh2xyxy(x):
+    """Converts (n, 4) center-x, center-y, width, height boxes to xyxy."""
+    return np.concatenate((x[:, :2] - x[:, 2:4] / 2, x[:, :2] + x[:, 2:4] / 2), 1)
+
+
+def batch_diag(v):
+    """Returns (n, k, k) diagonal matrices from (n, k) diagonals."""
+    m = np.zeros((*v.shape, v.shape[-1]))
+    i = np.arange(v.shape[-1])
+    m[:, i, i] = v
+    return m
+
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter over (cx, cy, w, h) box states, batched across all tracks."""
+
+    std_pos = 1 / 20  # position noise relative to box size
+    std_vel = 1 / 160  # velocity noise relative to box size
+
+    def __init__(self):
+        """Builds the constant transition (F) and observation (H) matrices."""
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)  # x' = x + v
+        self.H = np.eye(4, 8)
+
+    def _std(self, wh, k_pos, k_vel):
+        """Returns (n, 8) per-state standard deviations scaled by box width/height."""
+        whwh = np.concatenate((wh, wh), 1)
+        return np.concatenate((k_pos * self.std_pos * whwh, k_vel * self.std_vel * whwh), 1)
+
+    def initiate(self, z):
+        """Returns mean (n, 8) and covariance (n, 8, 8) for new tracks from (n, 4) cxcywh measurements."""
+        x = np.concatenate((z, np.zeros_like(z)), 1)
+        P = batch_diag(np.square(self._std(z[:, 2:4], 2, 10)))
+        return x, P
+
+    def predict(self, x, P):
+        """Propagates states one frame ahead."""
+        Q = batch_diag(np.square(self._std(x[:, 2:4], 1, 1)))
+        return x @ self.F.T, self.F @ P @ self.F.T + Q
+
+    def update(self, x, P, z):
+        """Corrects states (n, 8) with matched (n, 4) cxcywh measurements."""
+        R = batch_diag(np.square(self.std_pos * np.concatenate((z[:, 2:4], z[:, 2:4]), 1)))
+        PHt = P @ self.H.T  # (n, 8, 4)
+        S = self.H @ PHt + R  # (n, 4, 4)
+        K = PHt @ np.linalg.inv(S)  # (n, 8, 4)
+        x = x + (K @ (z - x @ self.H.T)[..., None])[..., 0]
+        P = P - K @ self.H @ P
+        return x, P
+
+
+class ObjectTracker:
+    """ByteTrack-style tracker assigning stable IDs to NMS detections; all per-frame maths is vectorized NumPy."""
+
+    def __init__(self, high_thres=0.5, low_thres=0.1, iou_thres=0.3, low_iou_thres=0.5, min_hits=3, max_age=30):
+        """
+        Initializes the tracker.
+
+        Args:
+            high_thres (float): detections at or above this confidence can start and update tracks.
+            low_thres (float): detections between low_thres and high_thres only update existing tracks.
+            iou_thres (float): minimum IoU to match a high-confidence detection to a track.
+            low_iou_thres (float): minimum IoU for the second, low-confidence association pass.
+            min_hits (int): matched frames before a track is confirmed and reported.
+            max_age (int): frames a track survives without a match before it is deleted.
+        """
+        self.high_thres, self.low_thres = high_thres, low_thres
+        self.iou_thres, self.low_iou_thres = iou_thres, low_iou_thres
+        self.min_hits, self.max_age = min_hits, max_age
+        self.kf = KalmanBoxFilter()
+        self.next_id = 1
+        self.x = np.zeros((0, 8))  # Kalman means
+        self.P = np.zeros((0, 8, 8))  # Kalman covariances
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.cls = np.zeros(0, dtype=np.int64)
+        self.conf = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int64)  # total matched frames
+        self.lost = np.zeros(0, dtype=np.int64)  # frames since last match
+        self.removed = []  # (track_id, cls) deleted by the last update()
+
+    def __len__(self):
+        """Returns the number of live tracks, confirmed or not."""
+        return len(self.ids)
+
+    @staticmethod
+    def _associate(tboxes, tcls, dboxes, dcls, thres):
+        """Returns matched (track_idx, det_idx) arrays maximizing total IoU among same-class pairs above `thres`."""
+        if not len(tboxes) or not len(dboxes):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        iou = box_iou(tboxes, dboxes) * (tcls[:, None] == dcls[None])
+        ti, di = linear_sum_assignment(-iou)
+        keep = iou[ti, di] >= thres
+        return ti[keep], di[keep]
+
+    def update(self, pred):
+        """
+        Advances all tracks by one frame of (n, 6) xyxy, conf, cls detections.
+
+        Returns a (k, 7) array of confirmed tracks matched this frame: x1, y1, x2, y2, track_id, conf, cls.
+        """
+        d = to_numpy(pred)
+        d = d[d[:, 4] >= self.low_thres]
+        dz, dcls = xyxy2cxcywh(d[:, :4]), d[:, 5].astype(np.int64)
+
+        if len(self.ids):
+            self.x, self.P = self.kf.predict(self.x, self.P)
+        tboxes = cxcywh2xyxy(self.x[:, :4])
+
+        # First pass: high-confidence detections against all tracks
+        high = np.flatnonzero(d[:, 4] >= self.high_thres)
+        ti, di = self._associate(tboxes, self.cls, d[high, :4], dcls[high], self.iou_thres)
+        ti, di = list(ti), list(high[di])
+
+        # Second pass: low-confidence detections against still unmatched tracks
+        rest = np.setdiff1d(np.arange(len(self.ids)), ti)
+        low = np.flatnonzero(d[:, 4] < self.high_thres)
+        ti2, di2 = self._associate(tboxes[rest], self.cls[rest], d[low, :4], dcls[low], self.low_iou_thres)
+        ti = np.array(ti + list(rest[ti2]), dtype=np.int64)
+        di = np.array(di + list(low[di2]), dtype=np.int64)
+
+        # Update matched tracks, age the others
+        if len(ti):
+            self.x[ti], self.P[ti] = self.kf.update(self.x[ti], self.P[ti], dz[di])
+            self.conf[ti] = d[di, 4]
+            self.hits[ti] += 1
+        self.lost += 1
+        self.lost[ti] = 0
+
+        # Start tracks from unmatched high-confidence detections
+        new = np.setdiff1d(high, di)
+        if len(new):
+            x, P = self.kf.initiate(dz[new])
+            n = len(new)
+            self.x, self.P = np.concatenate((self.x, x)), np.concatenate((self.P, P))
+            self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + n)))
+            self.cls = np.concatenate((self.cls, dcls[new]))
+            self.conf = np.concatenate((self.conf, d[new, 4]))
+            self.hits = np.concatenate((self.hits, np.ones(n, dtype=np.int64)))
+            self.lost = np.concatenate((self.lost, np.zeros(n, dtype=np.int64)))
+            self.next_id += n
+
+        # Delete stale tracks
+        dead = self.lost > self.max_age
+        self.removed = list(zip(self.ids[dead].tolist(), self.cls[dead].tolist()))
+        if dead.any():
+            alive = ~dead
+            self.x, self.P, self.ids, self.cls = self.x[alive], self.P[alive], self.ids[alive], self.cls[alive]
+            self.conf, self.hits, self.lost = self.conf[alive], self.hits[alive], self.lost[alive]
+
+        out = (self.lost == 0) & (self.hits >= self.min_hits)
+        return np.concatenate(
+            (cxcywh2xyxy(self.x[out, :4]), self.ids[out, None], self.conf[out, None], self.cls[out, None]), 1
+        )
+
+
+class BasketCounter:
+    """Turns confirmed tracks into add/remove events that fire once per object entering or leaving a region."""
+
+    def __init__(self, region=None, exit_frames=15):
+        """
+        Initializes the counter.
+
+        Args:
+            region (tuple | None): basket area as pixel xyxy; None counts objects anywhere in the frame.
+            exit_frames (int): consecutive frames a counted object must be seen outside the region to be removed.
+        """
+        self.region = None if region is None else np.asarray(region, dtype=np.float32)
+        self.exit_frames = exit_frames
+        self.counted = {}  # track_id -> cls, or -1 for objects that must not generate events
+        self.outside = {}  # track_id -> consecutive frames seen outside the region
+        self.adopt = {}  # cls -> objects already in the cart (e.g. recovered) to count silently when first seen
+
+    def inside(self, boxes):
+        """Returns a boolean mask of boxes whose center lies inside the region."""
+        if self.region is None:
+            return np.ones(len(boxes), dtype=bool)
+        c = (boxes[:, :2] + boxes[:, 2:4]) / 2
+        return ((c >= self.region[:2]) & (c <= self.region[2:])).all(1)
+
+    def update(self, tracks, removed=()):
+        """
+        Consumes one frame of tracker output.
+
+        Args:
+            tracks (np.ndarray): (k, 7) confirmed tracks from `ObjectTracker.update()`.
+            removed (iterable): (track_id, cls) pairs deleted by the tracker this frame.
+
+        Returns a list of (track_id, cls, delta) events.
+        """
+        events = []
+        for (tid, c), inside in zip(tracks[:, 4:7:2].astype(np.int64).tolist(), self.inside(tracks).tolist()):
+            if inside:
+                self.outside.pop(tid, None)
+                if tid not in self.counted:
+                    self.counted[tid] = c
+                    if self.adopt.get(c, 0) > 0:
+                        self.adopt[c] -= 1  # already in the cart, only its removal is an event
+                    else:
+                        events.append((tid, c, 1))
+            elif tid in self.counted:
+                self.outside[tid] = self.outside.get(tid, 0) + 1
+                if self.outside[tid] >= self.exit_frames:
+                    events.append(self._forget(tid))
+        for tid, _ in removed:
+            if tid in self.counted:
+                events.append(self._forget(tid))
+        return [e for e in events if e[1] >= 0]
+
+    def _forget(self, tid):
+        """Stops counting track `tid` and returns its removal event."""
+        self.outside.pop(tid, None)
+        return tid, self.counted.pop(tid), -1
+
+    def reset(self, tracks=()):
+        """Forgets all counted objects; tracks still in view are ignored until they disappear (e.g. after checkout)."""
+        self.counted = {int(tid): -1 for tid in np.asarray(tracks).reshape(-1, 7)[:, 4]}
+        self.outside.clear()
+        self.adopt.clear()
+
+
+class TrackedCart:
+    """Drop-in replacement for `CartTracker.update()` that counts physical objects instead of labels."""
+
+    def __init__(self, base, region=None, exit_frames=15, **kwargs):
+        """Wraps CartTracker `base`; `region`/`exit_frames` go to BasketCounter, other kwargs to ObjectTracker."""
+        self.base = base
+        self.objects = ObjectTracker(**{"high_thres": base.conf, **kwargs})
+        self.counter = BasketCounter(region, exit_frames)
+        self.tracks = np.zeros((0, 7))  # confirmed tracks of the last frame, for drawing
+
+    @property
+    def cart(self):
+        """Returns the live name -> qty dict of the wrapped CartTracker."""
+        return self.base.cart
+
+    @property
+    def ids(self):
+        """Returns the name -> class id mapping of the wrapped CartTracker."""
+        return self.base.ids
+
+    def update(self, pred, now=None):
+        """Tracks one frame of predictions and returns (class_id, name, delta) cart events like CartTracker."""
+        p = to_numpy(pred)
+        c = p[:, 5].astype(np.int64)
+        p = p[(c >= 0) & (c < len(self.base.tracked))]
+        p = p[self.base.tracked[p[:, 5].astype(np.int64)]]  # only catalog items
+        self.tracks = self.objects.update(p)
+        return [self.base.change(c, d) for _, c, d in self.counter.update(self.tracks, self.objects.removed)]
+
+    def restore(self, qty):
+        """Puts recovered per-class quantities back in the cart; matching objects are adopted, not re-added."""
+        self.base.restore(qty)
+        self.counter.adopt = {int(i): int(qty[i]) for i in np.flatnonzero(qty)}
+
+    def clear(self):
+        """Empties the cart without re-adding the objects that are currently in view."""
+        self.base.clear()
+        self.counter.reset(self.tracks)
@@ -0,0 +1,160 @@
+"""
+Cached, dirty-rect pygame rendering for the smart-trolley cart screen.
+
+Re-scaling every icon and re-rendering every line of text each frame, then filling and flipping the whole window, costs
+CPU that low-power trolley hardware needs for inference. `CartView` scales icons once at load time, keeps rendered
+text surfaces in an LRU cache keyed by (text, colour, font), and redraws only the screen regions whose content changed,
+passing just those rectangles to `pygame.display.update()`.
+
+Usage:
+    view = CartView(screen, font, load_icons(product_images), tips=fun_tips)
+    view.draw(cart, prices, total, greeting=greeting, status=pipeline.status_line())
+"""
+
+import time
+from collections import OrderedDict
+
+import pygame
+
+
+def load_icons(paths, size=(60, 60)):
+    """Loads and pre-scales icons once; returns {name: Surface or None} for missing files."""
+    icons = {}
+    for name, path in paths.items():
+        try:
+            icons[name] = pygame.transform.smoothscale(pygame.image.load(path).convert_alpha(), size)
+        except (pygame.error, FileNotFoundError):
+            icons[name] = None
+    return icons
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (text, colour, font)."""
+
+    def __init__(self, maxsize=256):
+        """Initializes an empty cache holding at most `maxsize` surfaces."""
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._cache = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        """Returns the cached surface for `text`, rendering it with `font` on a miss."""
+        key = (text, tuple(color), id(font), antialias)
+        s = self._cache.get(key)
+        if s is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return s
+        self.misses += 1
+        s = self._cache[key] = font.render(text, antialias, color)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return s
+
+
+class CartView:
+    """Cart screen made of fixed regions that are only repainted, and pushed to the display, when they change."""
+
+    def __init__(
+        self,
+        screen,
+        font,
+        icons=None,
+        small_font=None,
+        tips=(),
+        tip_interval=8.0,
+        status_interval=0.5,
+        bg=(30, 30, 30),
+        currency="$",
+    ):
+        """
+        Initializes the view.
+
+        Args:
+            screen (pygame.Surface): display surface.
+            font (pygame.font.Font): main font for greeting, cart lines and total.
+            icons (dict | None): pre-scaled icons from `load_icons()`.
+            small_font (pygame.font.Font | None): font for the status line, defaults to `font`.
+            tips (sequence): tips shown at the bottom, rotated every `tip_interval` seconds.
+            status_interval (float): minimum seconds between status line repaints.
+            bg (tuple): background colour.
+            currency (str): currency symbol put in front of amounts.
+        """
+        self.screen, self.font, self.small_font = screen, font, small_font or font
+        self.icons = icons or {}
+        self.tips, self.tip_interval = list(tips), tip_interval
+        self.status_interval, self._status, self._t_status = status_interval, "", 0.0
+        self.bg, self.currency = bg, currency
+        self.text = TextCache()
+        self.w, self.h = screen.get_size()
+        self.regions = {
+            "greeting": pygame.Rect(0, 0, 480, 55),
+            "total": pygame.Rect(480, 0, self.w - 480, 55),
+            "cart": pygame.Rect(0, 55, self.w, 460),
+            "tip": pygame.Rect(0, 515, self.w, 55),
+            "status": pygame.Rect(0, 570, self.w, self.h - 570),
+        }
+        self._state = {}  # region -> content signature last drawn
+        self._t0 = time.monotonic()
+        self.frames = self.repaints = 0  # counters
+
+    def invalidate(self):
+        """Forces a full repaint on the next draw, e.g. after a full-screen overlay."""
+        self._state.clear()
+
+    def _text(self, text, pos, color, font=None):
+        """Blits cached `text` at `pos`."""
+        self.screen.blit(self.text.render(font or self.font, text, color), pos)
+
+    def _region(self, key, signature, paint, dirty):
+        """Repaints region `key` with `paint()` if `signature` changed since the last draw."""
+        if self._state.get(key) == signature:
+            return
+        rect = self.regions[key]
+        self.screen.fill(self.bg, rect)
+        self.screen.set_clip(rect)
+        paint(rect)
+        self.screen.set_clip(None)
+        self._state[key] = signature
+        dirty.append(rect)
+        self.repaints += 1
+
+    def draw(self, cart, prices, total, greeting="", status=""):
+        """Repaints changed regions and updates only those parts of the display; returns the dirty rects."""
+        dirty = []
+        self.frames += 1
+        if not self._state:  # first frame or invalidated
+            self.screen.fill(self.bg)
+            dirty.append(self.screen.get_rect())
+
+        self._region("greeting", greeting, lambda r: self._text(greeting, (20, 10), (255, 255, 0)), dirty)
+        total_str = f"Total: {self.currency}{total:.2f}"
+        self._region("total", total_str, lambda r: self._text(total_str, (500, 20), (0, 255, 0)), dirty)
+
+        items = tuple(cart.items())
+
+        def paint_cart(r):
+            y = r.y + 5
+            for label, count in items:
+                icon = self.icons.get(label)
+                if icon:
+                    self.screen.blit(icon, (20, y))
+                line = f"{label} x{count} - {self.currency}{prices[label] * count:.2f}"
+                self._text(line, (100, y + 10), (255, 255, 255))
+                y += 80
+
+        self._region("cart", items, paint_cart, dirty)
+
+        if self.tips:
+            tip = self.tips[int((time.monotonic() - self._t0) // self.tip_interval) % len(self.tips)]
+            self._region("tip", tip, lambda r: self._text(tip, (20, 520), (200, 200, 255)), dirty)
+        now = time.monotonic()
+        if status and now - self._t_status >= self.status_interval:
+            self._status, self._t_status = status, now
+        if self._status:
+            s = self._status
+            self._region("status", s, lambda r: self._text(s, (20, 575), (150, 150, 150), self.small_font), dirty)
+
+        if dirty:
+            pygame.display.update(dirty)
+        return dirty